@@ -7,7 +7,6 @@ import bz2
 import glob
 import numpy as np
 from datetime import timedelta
-import fnmatch
 
 import BCO.tools.convert
 from BCO.tools import tools
@@ -39,17 +38,23 @@ class Ceilometer(__Device):
         instrument: Short description of the instrument.
 
     """
-    def __init__(self, start, end):
+    def __init__(self, start, end, workers=1, executor="thread", store=None, prefetch=0):
         """
         Sets up some variables and loads static parameters from the netcdf file.
 
         Args:
             start: start of the timeframe.
             end: end of the timeframe.
+            workers: Number of files which are read in parallel by the getters. Default is 1.
+            executor: "thread" or "process": whether the files are read by threads or processes.
+            store: Optional BCO.tools.store.Store (or its directory), which is read instead of the files.
+            prefetch: Number of files which are downloaded, decompressed and opened in the background while the
+                      getters read the current one. Default is 0 (no prefetching).
         """
 
         self.start = self._checkInputTime(start) + timedelta(hours=0)
         self.end = self._checkInputTime(end) + timedelta(hours=0)
+        self._setWorkers(workers, executor, prefetch)
 
 
         self._instrument = BCO.config["CEILOMETER"]["INSTRUMENT"] # String used for retrieving the filepath from settings.ini
@@ -57,6 +62,7 @@ class Ceilometer(__Device):
         self._path_addition = BCO.config[self._instrument]["PATH_ADDITION"]
         self._path_addition = None if self._path_addition == "None" else self._path_addition # convert str to None
         self._ftp_files = []
+        self._setStore(store)
         self.path = self._getPath()
 
         # Attributes:
@@ -83,109 +89,47 @@ class Ceilometer(__Device):
         self.resolution = self._getAttrFromNC("resolution")
         self.instrument = self._getAttrFromNC("instrument")
 
-    def _getArrayFromNc(self, value):
+    def _getDates(self):
         """
-        Retrieving the 'value' from the netCDF-Dataset reading just the desired timeframe.
-
-        Args:
-            value: String which is a valid key for the Dataset.variables[key].
+        Dates of the files covering the timeframe.
 
         Returns:
-            Numpy array with the values of the desired key and the inititated time-window.
-
-        Example:
-            What behind the scenes happens for an example-key 'VEL' is something like:
-
-            >>> nc = Dataset(input_file)
-            >>> _var = nc.variables["VEL"][self.start:self.end].copy()
-
-            Just that in this function we are looping over all files and in the end concatinating them.
+            Generator of datetime.datetime objects, one per month.
         """
         # This method overrides the standard method in device_module, because data is stored monthly and not daily
+        return tools.daterange(self.start.date(), self.end.date(), step="month")
 
-        var_list = []
-        skippedDates = []
-        for _date in tools.daterange(self.start.date(), self.end.date(), step="month"):
-            if not self._path_addition:
-                _nameStr = tools.getFileName(self._instrument, _date, use_ftp=BCO.USE_FTP_ACCESS,
-                                             filelist=self._ftp_files).split("/")[-1]
-            else:
-                _nameStr = "/".join(tools.getFileName(self._instrument, _date, use_ftp=BCO.USE_FTP_ACCESS,
-                                                      filelist=self._ftp_files).split("/")[-2:])
-
-            if BCO.USE_FTP_ACCESS:
-                for _f in self._ftp_files:
-                    if fnmatch.fnmatch(_f,"*"+_nameStr.split("/")[-1]):
-                        _file = _f
-                        break
-            else:
-                _file = glob.glob(self.path + _nameStr)[0]
-
-            nc = self._getNc(_date)
-
-            # print(_date)
-            _start, _end = self._getStartEnd(_date, nc)
-            if _end != 0:
-                varFromDate = nc.variables[value][_start:_end].copy()
-            else:
-                varFromDate = nc.variables[value][_start:].copy()
-            var_list.append(varFromDate)
-
-            nc.close()
-
-        _var = var_list[0]
-        if len(var_list) > 1:
-            for item in var_list[1:]:
-                _var = np.concatenate((_var, item))
-
-        if skippedDates:
-            self._FileNotAvail(skippedDates)
-
-        return _var
 
-
-    def _getStartEnd(self, _date, nc):
+    def _getTimeBounds(self):
         """
-        Find the index of the start-date and end-date argument in the netCDF-file. If the time-stamp is not in the
-        actual netCDF-file then return the beginning and end of that file.
-        Args:
-            _date: datetime.datetime-object to compare self.start and self.end with.
-            nc: the netCDF-Dataset
+        Beginning and end of the timeframe in seconds since 1970. The day of the end is included completely.
 
         Returns:
-            _start: index of the _date in the actual netCDF-file. If not index in the netCDF-file then return 0
-                    (beginning of the file)
-            _end: index of the _date in the actual netCDF-file. If not index in the netCDF-file then return -1
-                    (end of the file)
+            Tuple (start, end).
         """
-        # This method overrides the standard method in device_module, because data is stored monthly and not daily
-
-        _start = 0
-        _end = 0
-        if _date.month == self.start.month:
-            _start = np.argmin(np.abs(np.subtract(nc.variables["time"][:], BCO.tools.convert.time2num(self.start, utc=False))))
-            # print("start", _start)
-        if _date.month == self.end.month:
-            _end = np.argmin(np.abs(np.subtract(nc.variables["time"][:], BCO.tools.convert.time2num(self.end + timedelta(days=1), utc=False))))
-            # print("end ", _end)
-
-        return _start, _end
+        # This method overrides the standard method in device_module, because the time is not converted to UTC
+        return (BCO.tools.convert.time2num(self.start, utc=False),
+                BCO.tools.convert.time2num(self.end + timedelta(days=1), utc=False))
 
+    @staticmethod
+    def _getFileKey(date):
+        # This method overrides the standard method in device_module, because data is stored monthly and not daily
+        return date.year, date.month
 
-    def getTime(self):
+    def _convertTime(self, time, kind="datetime"):
         """
-        Loads the time steps over the desired timeframe from all netCDF-files and returns them as one array.
+        Converts the time from the netCDF-files (seconds since 1970) to datetime.datetime objects.
 
-        Returns:
-            A numpy array containing datetime.datetime objects
-
-        Example:
-            Getting the time-stamps from an an already initiated Radiation object 'rad':
+        Args:
+            time: numpy array of seconds since 1970.
+            kind: "datetime", "datetime64" or "epoch" (see getTime()).
 
-            >>> rad.getTime()
+        Returns:
+            A numpy array containing datetime.datetime objects (or datetime64 / seconds since 1970, see kind)
         """
-
-        time = self._getArrayFromNc('time')
+        # This method overrides the standard method in device_module, because the time is not converted to UTC
+        if kind != "datetime":
+            return super(Ceilometer, self)._convertTime(time, kind=kind)
 
         time = BCO.tools.convert.num2time(time)  # converting seconds since 1970 to datetime objects
 
@@ -223,8 +167,7 @@ class Ceilometer(__Device):
             print("method must be one of: %s"%",".join(methods))
             print(self.cbh_info)
 
-        cbh = np.asarray(self._getArrayFromNc(methods[method]))
-        cbh[np.where(cbh < -990)] = np.nan
+        cbh = self._getArrayFromNc(methods[method], fill="nan", fill_below=-990)
         return cbh
 
 
@@ -239,8 +182,7 @@ class Ceilometer(__Device):
             Numpy array containing the rain flag.
         """
 
-        rf = self._getArrayFromNc("flag_rain").astype(float)
-        rf[np.where(rf < -990)] = np.nan
+        rf = self._getArrayFromNc("flag_rain", dtype=float, fill="nan", fill_below=-990)
         return rf
 
     def getInstrumentStatusFlag(self):
@@ -254,8 +196,7 @@ class Ceilometer(__Device):
             Numpy array containing the status flag.
         """
 
-        status = self._getArrayFromNc("flag_ceilo_status").astype(float)
-        status[np.where(status < -990)] = np.nan
+        status = self._getArrayFromNc("flag_ceilo_status", dtype=float, fill="nan", fill_below=-990)
         return status
 
     def getJenoptikOutputFlag(self):
@@ -269,8 +210,7 @@ class Ceilometer(__Device):
             Numpy array containing the status flag.
         """
 
-        status = self._getArrayFromNc("flag_jenoptik_output").astype(float)
-        status[np.where(status < -990)] = np.nan
+        status = self._getArrayFromNc("flag_jenoptik_output", dtype=float, fill="nan", fill_below=-990)
         return status
 
 
@@ -285,6 +225,5 @@ class Ceilometer(__Device):
             Numpy array containing the status flag.
         """
 
-        status = self._getArrayFromNc("flag_mrr_status").astype(float)
-        status[np.where(status < -990)] = np.nan
+        status = self._getArrayFromNc("flag_mrr_status", dtype=float, fill="nan", fill_below=-990)
         return status
\ No newline at end of file
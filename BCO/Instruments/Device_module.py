@@ -8,10 +8,17 @@ from pytz import timezone,utc
 from ftplib import FTP
 
 import BCO.tools.convert
+import BCO.tools.tzconvert
 from BCO.tools import tools
+from BCO.tools.pool import DatasetPool
+from BCO.tools.lazy import LazyArray
+from BCO.tools.store import Store
+from BCO.tools.classic import ClassicDataset
 import BCO
 import glob
 import tempfile
+import weakref
+import threading
 import re
 import fnmatch
 import configparser
@@ -91,33 +98,168 @@ class __Device(object):
         return _timeObj
 
 
+    def _setWorkers(self, workers, executor, prefetch=0):
+        """
+        Checks and stores the options for reading the files in parallel.
+
+        Args:
+            workers: Integer: Number of files which are read in parallel.
+            executor: String: "thread" or "process".
+            prefetch: Integer: Number of files which are prepared in the background (see _iterPrefetched()).
+        """
+        if executor not in ["thread", "process"]:
+            raise ValueError("executor needs to be either 'thread' or 'process', not %s." % executor)
+        if prefetch < 0:
+            raise ValueError("prefetch needs to be at least 0, not %s." % prefetch)
+
+        self._workers = max(1, int(workers))
+        self._executor = executor
+        self._prefetch = int(prefetch)
+
+
+    def _iterPrefetched(self, items):
+        """
+        Iterates over dates (or the tuples of a read plan), while the files of the next dates are prepared in the
+        background (see BCO.tools.tools.prefetch()): they are looked up (and downloaded with FTP-access) in
+        parallel and then decompressed and opened into the pool of Datasets. The number of files prepared ahead
+        is set by the prefetch-argument of the constructor. It is limited to MAX_OPEN_FILES - 1, so the pool keeps
+        the current file open.
+
+        Args:
+            items: List of datetime.date objects or of tuples (date, start, stop).
+
+        Yields:
+            The items in their order.
+        """
+        items = list(items)
+        depth = 0
+        if getattr(self, "_store", None) is None:
+            depth = min(getattr(self, "_prefetch", 0), self._getPool().maxsize - 1)
+        dates = [item[0] if isinstance(item, tuple) else item for item in items]
+
+        # created here, as several threads fill them:
+        if not hasattr(self, "_resolved_files"):
+            self._resolved_files = {}
+        if getattr(self, "_remote_files", None) is None:
+            self._remote_files = {}
+
+        def _fetch(i):
+            self._getFile(dates[i])
+
+        def _open(i):
+            self._getNc(dates[i])
+
+        for i in tools.prefetch(_open, range(len(items)), depth, fetch=_fetch):
+            yield items[i]
+
+
+    def _getReadLock(self, nc):
+        """
+        Get the lock which needs to be held while reading from a Dataset. While files are opened in the background
+        (see _iterPrefetched()), calls to the netCDF-library need tools.netcdf_lock. ClassicDatasets and stores do
+        not use the netCDF-library.
+
+        Returns:
+            tools.netcdf_lock or a new (unshared) lock.
+        """
+        if getattr(self, "_prefetch", 0) and not isinstance(nc, ClassicDataset) and \
+                getattr(self, "_store", None) is None:
+            return tools.netcdf_lock
+        return threading.Lock()
+
+
+    def _setStore(self, store):
+        """
+        Sets the store (see BCO.tools.store) which is read instead of the netCDF-files.
+
+        Args:
+            store: BCO.tools.store.Store instance, the directory of a store or None.
+
+        Raises:
+            ValueError: if the store belongs to another instrument or data version.
+        """
+        if store is not None:
+            if not hasattr(store, "dataset"):
+                store = Store(store)
+            if store.instrument != self._instrument:
+                raise ValueError("The store %s belongs to %s, not %s." % (store.directory, store.instrument,
+                                                                          self._instrument))
+            if store.data_version != BCO.config[self._instrument]["DATA_VERSION"]:
+                raise ValueError("The store %s contains the data version %s, not %s." % (
+                    store.directory, store.data_version, BCO.config[self._instrument]["DATA_VERSION"]))
+
+        self._store = store
+
+
     def _getStartEnd(self, _date, nc):
         """
-        Find the index of the start-date and end-date argument in the netCDF-file. If the time-stamp is not in the
-        actual netCDF-file then return the beginning and end of that file.
+        Find the indices of the timeframe in the netCDF-file. The time-stamps of the file are read only once
+        (see _getTimeAxis()) and the indices are found by bisection: start is the first time-stamp at or after
+        self.start, end the first one at or after the end of the timeframe (exclusive). Files in between the first and
+        the last file of the timeframe are read completely.
+
         Args:
             _date: datetime.datetime-object to compare self.start and self.end with.
             nc: the netCDF-Dataset
 
         Returns:
-            _start: index of the _date in the actual netCDF-file. If not index in the netCDF-file then return 0
-                    (beginning of the file)
-            _end: index of the _date in the actual netCDF-file. If not index in the netCDF-file then return -1
-                    (end of the file)
+            _start: index of the first time-stamp of the timeframe in the netCDF-file.
+            _end: index after the last time-stamp of the timeframe in the netCDF-file.
         """
+        time, ordered = self._getTimeAxis(_date, nc)
+        start, end = self._getTimeBounds()
 
         _start = 0
-        _end = 0
-        if _date == self.start.date():
-            _start = np.argmin(np.abs(np.subtract(nc.variables["time"][:], BCO.tools.convert.time2num(self.start, utc=True))))
-            # print("start", _start)
-        if _date == self.end.date():
-            _end = np.argmin(np.abs(np.subtract(nc.variables["time"][:], BCO.tools.convert.time2num(self.end, utc=True))))
-            # print("end ", _end)
+        _end = len(time)
+        if self._getFileKey(_date) == self._getFileKey(self.start):
+            _start = _searchTime(time, start, ordered)
+        if end is not None and self._getFileKey(_date) == self._getFileKey(self.end):
+            _end = max(_searchTime(time, end, ordered), _start)
 
         return _start, _end
 
 
+    def _getTimeAxis(self, _date, nc):
+        """
+        Get the time-stamps of a file. They are read once per instance and then kept.
+
+        Returns:
+            Tuple (time, ordered) with a float array of the seconds since 1970 and True, if they are sorted.
+        """
+        if getattr(self, "_time_axes", None) is None:
+            self._time_axes = {}
+
+        if _date not in self._time_axes:
+            with self._getReadLock(nc):
+                time = np.ma.filled(np.ma.asarray(nc.variables["time"][:], dtype=np.float64), np.nan)
+            ordered = not np.any(np.diff(time) < 0) and not np.isnan(time).any()
+            self._time_axes[_date] = (time, ordered)
+        return self._time_axes[_date]
+
+
+    def _getTimeBounds(self):
+        """
+        Beginning and end of the timeframe in seconds since 1970, as they are stored in the files. An end at midnight
+        includes the whole day of the end.
+
+        Returns:
+            Tuple (start, end). end is None if the last file is read completely.
+        """
+        start = BCO.tools.convert.time2num(self.start, utc=True)
+        if self.end.time() == datetime.time(0):
+            return start, None
+        return start, BCO.tools.convert.time2num(self.end, utc=True)
+
+
+    @staticmethod
+    def _getFileKey(date):
+        """
+        Identifies the file a date belongs to. Instruments storing their data in daily files can use this method,
+        others (e.g. monthly files) need to override it.
+        """
+        return date.year, date.month, date.day
+
+
     def _FileNotAvail(self, skipped):
         print("For the following days of the chosen timewindow no files exists:")
         for element in skipped:
@@ -126,109 +268,465 @@ class __Device(object):
 
 
     def _local2UTC(self, time):
-        if sys.version_info >= (3,6):
-            f1 = lambda x : x.astimezone(self.__de_tz).astimezone(utc)
-            return np.asarray(list(map(f1, time)))
-        else:
-            f1 = lambda x: self.__de_tz.localize(x).replace(tzinfo=self.__utc_tz)
-            return np.asarray(list(map(f1, time)))
+        """
+        Converts naive datetime.datetime objects of the local time of the computer to timezone aware UTC.
+        """
+        return BCO.tools.tzconvert.num2datetime(BCO.tools.convert.time2num(time), tz=self.__utc_tz)
 
     def _downloadFromFTP(self,file,ftp_client=None):
         """
-        Downloads the file from the mpi-zmaw server and saves it on the local machine.
+        Downloads the file from the mpi-zmaw server into the shared download cache (see
+        BCO.tools.tools.getDownloadCache()), if it is not there yet. The files stay referenced by the instance until
+        close().
 
         Args:
-            file: Filename and path as listed on the FTP-server. Allowed to contain Wildcards.
+            file: Filename and path as listed on the FTP-server or a list of them. Allowed to contain Wildcards.
+            ftp_client: Not used anymore, the connections are taken from the pool of FTP-connections.
 
         Returns:
-            Path to the local directory of the downloaded file.
+            List with the local paths of the downloaded files.
         """
 
-        tmpdir = tempfile.gettempdir()
+        files = [file] if isinstance(file, str) else file
+        paths = tools.getDownloadCache().fetch(files)
+        self._ftp_files.extend(paths)
 
-        _close_ftp_client = False
-        if ftp_client == None:
-            ftp_client = FTP(BCO.FTP_SERVER)
-            ftp_client.login(user=BCO.FTP_USER, passwd=BCO.FTP_PASSWD)
-            _close_ftp_client = True
-        # print(ftp_path + file)
-        file_to_retrieve = ftp_client.nlst(file)[0]
-        try:
-            __save_file = os.path.split(file_to_retrieve)[-1]
-        except:
-            __save_file = file_to_retrieve
+        return paths
 
-        if not os.path.isfile(os.path.join(tmpdir, __save_file)): # check if the file is already there:
-            print("Downloading %s"%__save_file)
-            ftp_client.retrbinary('RETR ' + file_to_retrieve, open(os.path.join(tmpdir, __save_file), 'wb').write)
-        else:
-            # print("File already in temporary folder: %s"%__save_file)
-            pass
-        self._ftp_files.append(os.path.join(tmpdir, __save_file))
 
-        if _close_ftp_client:
-            ftp_client.close()
-        return tmpdir +"/"
+    def _fetchFiles(self, dates):
+        """
+        Downloads the files of some dates from the FTP-server, if they are not downloaded yet. All of them are
+        downloaded at once over several connections. Dates without a file on the server are left out.
 
+        Args:
+            dates: List of datetime.date objects.
+        """
+        if not hasattr(self, "_resolved_files"):
+            self._resolved_files = {}
+
+        missing = {}
+        for _date in dates:
+            _key = _date.strftime("%Y%m%d")
+            if _key in self._resolved_files:
+                continue
+            try:
+                missing[_key] = self._getRemoteFile(_date)
+            except IOError:
+                continue
 
-    def _getArrayFromNc(self, value):
+        if not missing:
+            return
+
+        files = sorted(set(missing.values()))  # e.g. monthly files are shared by several dates
+        paths = dict(zip(files, self._downloadFromFTP(files)))
+        for _key, _name in missing.items():
+            self._resolved_files[_key] = paths[_name]
+
+
+    def _getRemoteFile(self, date):
         """
-        Retrieving the 'value' from the netCDF-Dataset reading just the desired timeframe.
+        Get the path of the file of a date on the FTP-server. The name is matched in the cached directory listing
+        (see BCO.tools.listing), nothing is downloaded.
 
         Args:
-            value: String which is a valid key for the Dataset.variables[key].
+            date: datetime.date object.
 
         Returns:
-            Numpy array with the values of the desired key and the inititated time-window.
+            String with the path on the FTP-server.
 
-        Example:
-            What behind the scenes happens for an example-key 'VEL' is something like:
+        Raises:
+            IOError: if there is no file for that date.
+        """
+        if getattr(self, "_remote_files", None) is None:
+            self._remote_files = {}
 
-            >>> nc = Dataset(input_file)
-            >>> _var = nc.variables["VEL"][self.start:self.end].copy()
+        _key = date.strftime("%Y%m%d")
+        if _key not in self._remote_files:
+            try:
+                self._remote_files[_key] = tools.getFileName(self._instrument, date, use_ftp=True)
+            except AssertionError:
+                self._remote_files[_key] = None
+
+        if self._remote_files[_key] is None:
+            raise IOError("No file found for %s on %s." % (self._instrument, date.strftime("%Y-%m-%d")))
+        return self._remote_files[_key]
 
-            Just that in this function we are looping over all files and in the end concatinating them.
+
+    def _findFile(self, date):
         """
-        var_list = []
-        skippedDates = []
-        for _date in tools.daterange(self.start.date(), self.end.date()):
-            _file = self._getFile(_date)
+        Checks that there is a file for a date, like _getFile(). Files on the FTP-server are only looked up, not
+        downloaded.
+
+        Returns:
+            String with the path of the file (on the FTP-server with FTP-access).
+
+        Raises:
+            IOError: if there is no file for that date.
+        """
+        if BCO.USE_FTP_ACCESS and getattr(self, "_store", None) is None:
+            return self._getRemoteFile(date)
+        return self._getFile(date)
+
+
+    def _getDates(self):
+        """
+        Dates of the files covering the timeframe. Instruments storing their data in daily files can use this
+        method, others (e.g. monthly files) need to override it.
+
+        Returns:
+            Generator of datetime.date objects, one per file.
+        """
+        return tools.daterange(self.start.date(), self.end.date())
+
+
+    def _getReadPlan(self):
+        """
+        Determines which part of which file belongs to the timeframe. This is done only once per instance, as the
+        timeframe does not change.
+
+        Returns:
+            List of tuples (date, start, stop), where start and stop are the indices of the timeframe along the
+            time-dimension of the file of that date. Dates without a file are stored in self._skipped_dates.
+        """
+        if getattr(self, "_read_plan", None) is not None:
+            return self._read_plan
+
+        if BCO.USE_FTP_ACCESS and getattr(self, "_store", None) is None and not getattr(self, "_prefetch", 0):
+            self._fetchFiles(list(self._getDates()))  # all files of the timeframe at once, in parallel
 
+        plan = []
+        skippedDates = []
+        for _date in self._iterPrefetched(self._getDates()):
             try:
                 nc = self._getNc(_date)
+            except (IOError, IndexError):
+                skippedDates.append(_date)
+                continue
 
-                # print(_date)
-                _start, _end = self._getStartEnd(_date, nc)
-                # print(_start,_end)
-                if _end != 0:
-                    varFromDate = nc.variables[value][_start:_end].copy()
-                else:
-                    varFromDate = nc.variables[value][_start:].copy()
-                var_list.append(varFromDate)
-                nc.close()
+            _start, _end = self._getStartEnd(_date, nc)
+            plan.append((_date, int(_start), int(_end)))
 
-            except KeyError:
-                nc.close()
-                raise_
+        self._read_plan = plan
+        self._skipped_dates = skippedDates
+        return plan
 
 
-            except IOError as exc:
-                raise_from(DatabaseError('failed to open'), exc)
-                skippedDates.append(_date)
+    def getVariables(self, values, out=None, gates=None, dtype=None, fill="mask", fill_below=None):
+        """
+        Retrieving several variables from the netCDF-Datasets at once, reading just the desired timeframe.
+        Every file is opened (and decompressed) only once per call and the time-indices are only computed once per
+        instance, which is much faster than calling the single getters one after another.
+
+        The output arrays are allocated once in their final size and every file is written directly into them.
+        Variables without a time-dimension (e.g. 'range') are read from the first file only.
+
+        If the instance was initiated with workers > 1, the files are read in parallel (see _readParallel()).
+
+        Args:
+            values: List of strings which are valid keys for the Dataset.variables[key].
+            out: Optional dictionary with keys from 'values' and preallocated arrays of the right shape, which
+                 will be filled instead of allocating new ones.
+            gates: Optional slice of the range-gates to read. Only used for variables with a range-dimension.
+            dtype: Optional numpy dtype of the output arrays. Default is the dtype of the variable (for fill="nan"
+                   integers become float64).
+            fill: How missing values (_FillValue, missing_value) are returned:
+                  "mask": as masked array (default),
+                  "nan": as nan in a plain numpy array. The values are read without masking and replaced in place
+                  in the output array, which avoids the temporary arrays of the masking,
+                  "raw": plain numpy array with the values as they are stored in the file.
+            fill_below: Optional number. With fill="nan", values below it are set to nan as well (e.g. -990 for
+                        the -999 used as missing value by some variables without _FillValue).
+
+        Returns:
+            Dictionary with the keys from 'values' and numpy arrays containing the data of the inititated
+            time-window.
+
+        Example:
+            Getting the reflectivity and the doppler velocity of an already initiated radar object 'coral':
+
+            >>> data = coral.getVariables(["Zf", "VEL"])
+            >>> data["Zf"]
+            array([[...]], dtype=float32)
+
+            Reading just the lowest 2 km:
+
+            >>> data = coral.getVariables(["Zf", "VEL"], gates=coral.getGates(height=(0, 2000)))
+
+            Getting the reflectivity as float64 with nan instead of a masked array:
+
+            >>> data = coral.getVariables(["Zf"], dtype=np.float64, fill="nan")
+        """
+        if fill not in ["mask", "nan", "raw"]:
+            raise ValueError("fill needs to be one of 'mask', 'nan' or 'raw', not %s." % fill)
+        if fill == "nan" and dtype is not None and np.dtype(dtype).kind != "f":
+            raise ValueError("fill='nan' needs a floating point dtype, not %s." % np.dtype(dtype))
+
+        plan = self._getReadPlan()
+        if out is None:
+            out = {}
+
+        if self._skipped_dates:
+            self._FileNotAvail(self._skipped_dates)
+
+        variables = dict((value, None) for value in values)
+        if not plan:
+            return variables
+
+        if getattr(self, "_store", None) is not None and all(o is None for o in out.values()) and \
+                fill == "mask" and dtype is None:
+            return self._store.getVariables(values, plan, gates)  # views, nothing is copied
+
+        workers = getattr(self, "_workers", 1)
+        if getattr(self, "_store", None) is not None:
+            workers = 1  # the output is filled from the views into the store, there are no files to read
+        executor = getattr(self, "_executor", "thread")
+        n_time = sum(_end - _start for _date, _start, _end in plan)
+        shared = {}  # paths of the output arrays in shared memory (executor="process")
+
+        # allocate the output using the first file:
+        nc = self._getNc(plan[0][0])
+        for value in values:
+            var = nc.variables[value]
+
+            if var.dimensions[:1] != ("time",):
+                index = self._getIndex(var, None, gates)
+                if fill == "mask" and dtype is None:
+                    variables[value] = var[index].copy()
+                else:
+                    variables[value] = self._allocate(value, np.shape(var[index]), _getDtype(var, dtype, fill), fill=fill)
+                    _writeSlab(var, index, variables[value], Ellipsis, fill, fill_below)
                 continue
 
+            empty = var[self._getIndex(var, slice(0, 0), gates)]
+            shape = (n_time,) + empty.shape[1:]
+            _dtype = _getDtype(var, dtype, fill)
+            if workers > 1 and executor == "process" and out.get(value) is None:
+                variables[value], shared[value] = self._allocateShared(shape, _dtype, masked=fill == "mask")
+            else:
+                variables[value] = self._allocate(value, shape, _dtype, out.get(value), fill=fill)
+
+        time_values = [value for value in values if nc.variables[value].dimensions[:1] == ("time",)]
+        if workers > 1 and len(plan) > 1:
+            self._readParallel(plan, time_values, gates, variables, workers, executor, shared, fill, fill_below)
+            return variables
+
+        offset = 0
+        for _date, _start, _end in self._iterPrefetched(plan):
+            nc = self._getNc(_date)
+            with self._getReadLock(nc):
+                for value in time_values:
+                    var = nc.variables[value]
+                    _writeSlab(var, self._getIndex(var, slice(_start, _end), gates), variables[value],
+                               slice(offset, offset + _end - _start), fill, fill_below)
+            offset += _end - _start
+
+        return variables
+
+
+    def _readParallel(self, plan, values, gates, variables, workers, executor, shared=None, fill="mask",
+                      fill_below=None):
+        """
+        Reads the files of the timeframe in parallel and writes them into the (preallocated) output arrays.
+
+        With executor="thread" the files are read by threads. The decompression of .nc.bz2 files runs in
+        parallel, the calls to the netCDF-library are serialized, as it is not thread-safe.
+        With executor="process" the files are read by separate processes, which write directly into the output
+        arrays in shared memory, so the data does not need to be pickled.
+
+        Args:
+            plan: Read plan from _getReadPlan().
+            values: List of variables with a time-dimension.
+            gates: Optional slice of the range-gates to read.
+            variables: Dictionary with the output arrays.
+            workers: Integer: Number of threads or processes.
+            executor: String: "thread" or "process".
+            shared: Dictionary with the paths (data-file, mask-file) of the output arrays in shared memory. Needed
+                    for executor="process".
+            fill: "mask", "nan" or "raw" (see getVariables()).
+            fill_below: Optional number, see getVariables().
+        """
+        from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
+        offsets = np.cumsum([0] + [_end - _start for _date, _start, _end in plan])
+        if executor == "process":
+            Executor = ProcessPoolExecutor
+            targets = dict((value, shared[value] + (variables[value].shape, variables[value].dtype.str))
+                           for value in values)
+        else:
+            Executor = ThreadPoolExecutor
+
+        failed = {}
+        with Executor(max_workers=workers) as pool:
+            futures = {}
+            for (_date, _start, _end), offset in zip(plan, offsets):
+                _file = self._getCachedFile(_date)
+                if executor == "process":
+                    future = pool.submit(_readIntoShared, _file, _start, _end, gates, targets, int(offset), fill,
+                                         fill_below)
+                else:
+                    future = pool.submit(_readInto, _file, _start, _end, gates, variables, int(offset), fill,
+                                         fill_below)
+                futures[future] = _date
 
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as exc:
+                    failed[futures[future]] = exc
 
-        _var = var_list[0]
-        if len(var_list) > 1:
-            for item in var_list[1:]:
-                _var = np.concatenate((_var, item))
+        if failed:
+            print("Reading failed for the following days of the chosen timewindow:")
+            for _date in sorted(failed):
+                print("%s: %s" % (_date, failed[_date]))
+            raise failed[sorted(failed)[0]]
 
-        if skippedDates:
-            self._FileNotAvail(skippedDates)
 
-        return _var
+    @staticmethod
+    def _getIndex(var, time_key, gates):
+        """
+        Builds the index for reading a hyperslab of a netCDF-variable.
+
+        Args:
+            var: netCDF4.Variable
+            time_key: Index along the time-dimension (ignored if the variable has none).
+            gates: Index along the range-dimension or None for all range-gates.
+
+        Returns:
+            Tuple which can be used as index for the variable.
+        """
+        index = []
+        for dim in var.dimensions:
+            if dim == "time":
+                index.append(time_key)
+            elif dim == "range" and gates is not None:
+                index.append(gates)
+            else:
+                index.append(slice(None))
+        return tuple(index)
+
+
+    def getGates(self, height=None, gates=None):
+        """
+        Converts a height-interval into a slice of the range-gates, which can be used to read only a part of the
+        range-gates from the files.
+
+        Args:
+            height: Tuple (min, max) in meters. All range-gates between min and max (inclusive) are selected.
+            gates: Slice of the range-gates. If given, it is returned unchanged.
+
+        Returns:
+            Slice of the range-gates or None, if neither height nor gates are given.
+
+        Example:
+            Getting the range-gates of the lowest 3 km of an already initiated radar object 'coral':
+
+            >>> coral.getGates(height=(0, 3000))
+            slice(0, 95, None)
+        """
+        if gates is not None or height is None:
+            return gates
+
+        _range = np.asarray(self._getValueFromNc("range"))
+        selected = np.nonzero((_range >= height[0]) & (_range <= height[1]))[0]
+        if len(selected) == 0:
+            return slice(0, 0)
+        return slice(int(selected[0]), int(selected[-1]) + 1)
+
+
+    @staticmethod
+    def _allocate(value, shape, dtype, out=None, fill="mask"):
+        """
+        Allocates the output array for getVariables() or checks the one provided by the user.
+
+        Args:
+            value: Name of the variable (just for the error message).
+            shape: Tuple: shape of the whole timeframe.
+            dtype: numpy dtype of the data.
+            out: Optional preallocated array.
+            fill: "mask" for a masked array, otherwise a plain numpy array is allocated.
+
+        Returns:
+            Masked array (or numpy array) of the given shape or 'out'.
+        """
+        if out is None:
+            if fill == "mask":
+                return np.ma.masked_all(shape, dtype=dtype)
+            return np.empty(shape, dtype=dtype)
+
+        if out.shape != shape:
+            raise ValueError("The array provided for %s has the shape %s, but %s is needed." %
+                             (value, out.shape, shape))
+        return out
+
+
+    @staticmethod
+    def _allocateShared(shape, dtype, masked=True):
+        """
+        Allocates a masked array in shared memory, which can be filled by other processes. Data and mask are
+        memory-mapped files in /dev/shm (or the temporary directory, if there is no /dev/shm). The files are
+        removed, as soon as the array is not used anymore.
+
+        Args:
+            shape: Tuple: shape of the whole timeframe.
+            dtype: numpy dtype of the data.
+            masked: Boolean: If False, there is no mask and a plain np.memmap is returned.
+
+        Returns:
+            Tuple (masked array with np.memmap as data and mask, (path of the data-file, path of the mask-file)).
+            Without mask, the path of the mask-file is None.
+        """
+        tmpdir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+        arrays, paths = [], []
+        for _dtype in ([dtype, bool] if masked else [dtype]):
+            fd, path = tempfile.mkstemp(prefix="bco_", suffix=".dat", dir=tmpdir)
+            os.close(fd)
+            paths.append(path)
+            arrays.append(np.memmap(path, dtype=_dtype, mode="w+", shape=shape))
+            weakref.finalize(arrays[-1]._mmap, _removeFile, path)
+
+        if not masked:
+            return arrays[0], (paths[0], None)
+
+        arrays[1][:] = True
+        return np.ma.MaskedArray(arrays[0], mask=arrays[1], copy=False), tuple(paths)
+
+
+    def _getArrayFromNc(self, value, out=None, lazy=False, height=None, gates=None, dtype=None, fill="mask",
+                        fill_below=None):
+        """
+        Retrieving the 'value' from the netCDF-Dataset reading just the desired timeframe.
+
+        Args:
+            value: String which is a valid key for the Dataset.variables[key].
+            out: Optional preallocated array of the right shape which will be filled with the data.
+            lazy: Boolean: If True, a BCO.tools.lazy.LazyArray is returned, which only reads the data when it
+                  is sliced.
+            height: Optional tuple (min, max) in meters. Only the range-gates in between are read.
+            gates: Optional slice of the range-gates to read.
+            dtype: Optional numpy dtype of the output (see getVariables()).
+            fill: "mask", "nan" or "raw": how missing values are returned (see getVariables()).
+            fill_below: Optional number. With fill="nan", values below it are set to nan as well.
+
+        Returns:
+            Numpy array with the values of the desired key and the inititated time-window.
+
+        Example:
+            What behind the scenes happens for an example-key 'VEL' is something like:
+
+            >>> nc = Dataset(input_file)
+            >>> _var = nc.variables["VEL"][self.start:self.end].copy()
+
+            Just that in this function we are looping over all files and writing them into one array.
+            For loading more than one variable use getVariables().
+        """
+        gates = self.getGates(height, gates)
+        if lazy:
+            return LazyArray(self, value, gates=gates)
+
+        return self.getVariables([value], out={value: out}, gates=gates, dtype=dtype, fill=fill,
+                                 fill_below=fill_below)[value]
 
 
     def _getValueFromNc(self, value):
@@ -246,7 +744,6 @@ class __Device(object):
         _date = self.start.date()
         nc = self._getNc(_date)
         _var = nc.variables[value][:].copy()
-        nc.close()
 
         return _var
 
@@ -270,28 +767,19 @@ class __Device(object):
         nc_lines = str(nc).split("\n")
         for line in nc_lines:
             if value in line:
-                nc.close()
                 return ":".join(line.split(":")[1:]).lstrip()
 
 
     def close(self):
         """
-        Deletes all temporary stored files from the instance.
-
-        Warnings:
-            This method is only available when loading the data from the ftp server.
-            It will not be available when working with the data directly inside the mpi / zmaw network (as it
-            is not necessary there).
-
+        Closes all open files of the instance. When loading the data from the ftp server, the downloaded files
+        are released, so the download cache can remove them when it needs the space.
         """
-        if BCO.USE_FTP_ACCESS:
-            for file in self._ftp_files:
-                os.remove(file)
+        self._getPool().close()
 
+        if BCO.USE_FTP_ACCESS and self._ftp_files:
+            tools.getDownloadCache().release(self._ftp_files)
             self._ftp_files = []
-            print("Successfully deleted all temporary files")
-        else:
-            print("This method is just for use with ftp-access of the BCO Data")
 
 
     def _getPath(self):
@@ -302,13 +790,8 @@ class __Device(object):
 
         """
         if BCO.USE_FTP_ACCESS:
-            ftp_client = tools.getFTPClient(user=BCO.FTP_USER,passwd=BCO.FTP_PASSWD)
-            for _date in tools.daterange(self.start.date(), self.end.date()):
-                tmp_file = tools.getFileName(self._instrument,_date,use_ftp=BCO.USE_FTP_ACCESS,ftp_client=ftp_client)
-                __path = self._downloadFromFTP(file=tmp_file,ftp_client=ftp_client)
-
-            ftp_client.close()
-            return __path
+            # the files are downloaded into the download cache when they are needed (see _fetchFiles()):
+            return tools.getDownloadCache().directory + "/"
 
         else:
             tmp_path =  BCO.config[self._instrument]["PATH"]
@@ -316,43 +799,187 @@ class __Device(object):
 
 
     def _getFile(self,date):
+        """
+        Get the path of the local file of a date. Every file is only searched once per instance (or looked up in
+        the archive catalog, if one is set), afterwards the path is remembered. With FTP-access the file is
+        downloaded, if this was not done before.
 
-        if not self._path_addition:
-            _nameStr = tools.getFileName(self._instrument, date, use_ftp=BCO.USE_FTP_ACCESS,filelist=self._ftp_files).split("/")[-1]
-        else:
-            # print(self._instrument, date)
-            _nameStr = "/".join(tools.getFileName(self._instrument, date, use_ftp=BCO.USE_FTP_ACCESS,filelist=self._ftp_files).split("/")[-2:])
+        Args:
+            date: datetime.date object.
+
+        Returns:
+            String with the path of the file.
+
+        Raises:
+            IOError: if there is no file for that date.
+        """
+        if getattr(self, "_store", None) is not None:
+            self._store.dataset(date)  # raises an IOError, if the date is not in the store
+            return self._store.directory
+
+        if not hasattr(self, "_resolved_files"):
+            self._resolved_files = {}
+
+        _key = date.strftime("%Y%m%d")
+        if _key in self._resolved_files:
+            return self._resolved_files[_key]
 
         if BCO.USE_FTP_ACCESS:
-            for _f in self._ftp_files:
-                if fnmatch.fnmatch(_f, "*" + _nameStr.split("/")[-1]):
-                    _file = _f
-                    break
-        else:
-            _file = glob.glob(os.path.join(self.path, _nameStr))[0]
+            self._getRemoteFile(date)  # raises an IOError, if there is no file on the server
+            self._fetchFiles([date])
+            return self._resolved_files[_key]
+
+        try:
+            _file = tools.getFileName(self._instrument, date, use_ftp=False)
+        except AssertionError:
+            raise IOError("No file found for %s on %s." % (self._instrument, date.strftime("%Y-%m-%d")))
 
+        self._resolved_files[_key] = _file
         return _file
 
 
-    def getTime(self):
+    def getTime(self, kind="datetime"):
         """
         Loads the time steps over the desired timeframe from all netCDF-files and returns them as one array.
 
+        Args:
+            kind: "datetime" (default): numpy array of datetime.datetime objects (UTC).
+                  "datetime64": numpy array of dtype datetime64[ns] (UTC). Much faster and smaller.
+                  "epoch": numpy array of seconds since 1970 as float.
+
         Returns:
-            A numpy array containing datetime.datetime objects
+            A numpy array containing datetime.datetime objects (or datetime64 / seconds since 1970, see kind)
 
         Example:
             Getting the time-stamps from an an already initiated Radiation object 'rad':
 
             >>> rad.getTime()
+
+            Getting them as datetime64, which is much faster for long timeframes:
+
+            >>> rad.getTime(kind="datetime64")
+            array(['2018-01-01T00:00:00.000000000', ...], dtype='datetime64[ns]')
         """
 
         time = self._getArrayFromNc('time')
 
-        time = BCO.tools.convert.num2time(time)  # converting seconds since 1970 to datetime objects
-        time = self._local2UTC(time)
+        return self._convertTime(time, kind=kind)
+
+
+    def _convertTime(self, time, kind="datetime"):
+        """
+        Converts the time from the netCDF-files (seconds since 1970) to the datetime.datetime objects returned by
+        getTime().
 
-        return time
+        Args:
+            time: numpy array of seconds since 1970.
+            kind: "datetime", "datetime64" or "epoch" (see getTime()).
+
+        Returns:
+            A numpy array containing datetime.datetime objects (or datetime64 / seconds since 1970, see kind)
+        """
+        if kind == "epoch":
+            return np.ma.filled(np.ma.asarray(time, dtype=np.float64), np.nan)
+        if kind == "datetime64":
+            return BCO.tools.convert.num2datetime64(time)
+        if kind != "datetime":
+            raise ValueError("kind needs to be one of 'datetime', 'datetime64' or 'epoch', not %s." % kind)
+
+        # converting seconds since 1970 to datetime objects in UTC with the vectorized timezone conversion
+        return BCO.tools.tzconvert.num2datetime(time, tz=self.__utc_tz)
+
+
+    def iterChunks(self, value, chunk=None, height=None, gates=None):
+        """
+        Iterates over the desired timeframe in blocks instead of loading all of it at once. This way only one block
+        is in memory at a time, which makes it possible to process very long timeframes.
+
+        Args:
+            value: String which is a valid key for the Dataset.variables[key].
+            chunk: Length of the blocks, e.g. "10min", "1h", "1d" or a datetime.timedelta. The blocks are aligned to
+                   full multiples of the length (e.g. full hours). If None, every file is one block.
+            height: Optional tuple (min, max) in meters. Only the range-gates in between are read.
+            gates: Optional slice of the range-gates to read.
+
+        Yields:
+            Tuple (time, block) with the time-stamps of the block (same as getTime()) and the data of the block.
+
+        Example:
+            Calculating hourly means of the reflectivity of a whole year:
+
+            >>> coral = Radar(start="20170101", end="20171231", device="CORAL")
+            >>> for time, block in coral.iterChunks("Zf", chunk="1h"):
+            >>>     print(time[0], block.mean())
+        """
+        gates = self.getGates(height, gates)
+        plan = self._getReadPlan()
+        if self._skipped_dates:
+            self._FileNotAvail(self._skipped_dates)
+
+        seconds = tools.chunk2seconds(chunk)
+        pending = []  # pieces of the actual block, which might be spread over several files
+        pending_bin = None
+        for _date, _start, _end in self._iterPrefetched(plan):
+            nc = self._getNc(_date)
+            with self._getReadLock(nc):
+                if nc.variables[value].dimensions[:1] != ("time",):
+                    raise ValueError("%s has no time-dimension and can not be read in chunks." % value)
+
+            time = self._getTimeAxis(_date, nc)[0][_start:_end]
+
+            if seconds is None:
+                yield self._convertTime(time), self._readChunk(_date, value, slice(_start, _end), gates)
+                continue
+
+            bins = np.floor_divide(time, seconds)
+            edges = np.nonzero(np.diff(bins))[0] + 1
+            for a, b in zip(np.append(0, edges), np.append(edges, len(time))):
+                if pending and bins[a] != pending_bin:
+                    yield self._joinChunk(pending)
+                    pending = []
+                pending.append((time[a:b], self._readChunk(_date, value, slice(_start + a, _start + b), gates)))
+                pending_bin = bins[a]
+
+        if pending:
+            yield self._joinChunk(pending)
+
+
+    def _readChunk(self, _date, value, time_key, gates):
+        """
+        Reads a part of a variable from the file of one date for iterChunks(). The Dataset is taken from the pool
+        again for every read, because the pool may have closed it while iterChunks() was waiting at a yield.
+
+        Args:
+            _date: datetime.datetime object: date of the file.
+            value: String which is a valid key for the Dataset.variables[key].
+            time_key: Slice along the time-dimension.
+            gates: Optional slice of the range-gates to read.
+
+        Returns:
+            The data as masked array.
+        """
+        nc = self._getNc(_date)
+        with self._getReadLock(nc):
+            var = nc.variables[value]
+            return var[self._getIndex(var, time_key, gates)]
+
+
+    def _joinChunk(self, pieces):
+        """
+        Joins the pieces of one block of iterChunks().
+
+        Args:
+            pieces: List of tuples (time, data).
+
+        Returns:
+            Tuple (time, data).
+        """
+        time = np.concatenate([piece[0] for piece in pieces])
+        if len(pieces) == 1:
+            data = pieces[0][1]
+        else:
+            data = np.ma.concatenate([piece[1] for piece in pieces])
+        return self._convertTime(time), data
 
     def __str__(self):
         callables = {"Methods": [func+"()" for func in dir(self) if callable(getattr(self, func)) and func[0] is not "_"],
@@ -381,19 +1008,214 @@ class __Device(object):
 
 
 
+    def _getPool(self):
+        """
+        Get the pool of open Datasets of this instance. The size of the pool is set by MAX_OPEN_FILES in the
+        settings.ini.
+
+        Returns:
+            BCO.tools.pool.DatasetPool
+        """
+        if getattr(self, "_pool", None) is None:
+            self._pool = DatasetPool(maxsize=int(BCO.config[self._instrument]["MAX_OPEN_FILES"]))
+        return self._pool
+
+
     def _getNc(self,date):
         """
-        Only for development.
+        Get the open Dataset of the file of a date. The Datasets are kept open in a pool, so they can be reused
+        by the next getter. Do not close them, this is done by the pool and by close().
 
         Returns:
             Instance of open Dataset from nc-file.
 
         """
+        if getattr(self, "_store", None) is not None:
+            return self._store.dataset(date)
+
+        _file = self._getCachedFile(date)
+
+        return self._getPool().get(_file)
+
+
+    def _getCachedFile(self, date):
+        """
+        Get the path of the file of a date which is opened for reading. If a cache is set (see
+        BCO.settings.set_cache), compressed files are replaced by their decompressed copy in the cache.
+
+        Returns:
+            String with the path of the file.
+        """
         _file = self._getFile(date)
 
-        if "bz2" in _file[-5:]:
-            nc = tools.bz2Dataset(_file)
-        else:
-            nc = Dataset(_file)
+        if BCO.CACHE is not None and "bz2" in _file[-5:]:
+            return BCO.CACHE.get(_file)
+        return _file
+
+
+def _searchTime(time, value, ordered=True):
+    """
+    Get the index of the first time-stamp at or after value. Sorted time-stamps are searched by bisection,
+    others one by one.
+    """
+    if ordered:
+        return int(np.searchsorted(time, value, side="left"))
+    later = np.flatnonzero(time >= value)
+    return int(later[0]) if len(later) else len(time)
+
 
-        return nc
+def _readInto(_file, _start, _end, gates, variables, offset, fill="mask", fill_below=None):
+    """
+    Reads one file and writes the timeframe into the output arrays. Used by the threads of __Device._readParallel().
+    The files are already read in parallel, so a .bz2 file is decompressed on one core.
+    """
+    nc = DatasetPool._open(_file, workers=1)
+    lock = tools.netcdf_lock
+    if isinstance(nc, ClassicDataset):  # does not use the netCDF-library, so the threads do not need to wait
+        lock = threading.Lock()
+    try:
+        for value in variables:
+            var = nc.variables[value]
+            if var.dimensions[:1] != ("time",):
+                continue
+            with lock:
+                varFromDate = _readSlab(var, __Device._getIndex(var, slice(_start, _end), gates), fill)
+            _writeSlab(varFromDate, Ellipsis, variables[value], slice(offset, offset + _end - _start), fill,
+                       fill_below, var)
+    finally:
+        with lock:
+            nc.close()
+
+
+def _readIntoShared(_file, _start, _end, gates, targets, offset, fill="mask", fill_below=None):
+    """
+    Reads one file and writes the timeframe into the output arrays in shared memory. Used by the processes of
+    __Device._readParallel().
+
+    Args:
+        targets: Dictionary with (data-file, mask-file, shape, dtype) of the shared output array of every variable.
+                 The mask-file is None for fill="nan" and fill="raw".
+    """
+    nc = DatasetPool._open(_file, workers=1)
+    try:
+        for value, (data_file, mask_file, shape, dtype) in targets.items():
+            var = nc.variables[value]
+            index = __Device._getIndex(var, slice(_start, _end), gates)
+            time_slice = slice(offset, offset + _end - _start)
+
+            data = np.memmap(data_file, dtype=dtype, mode="r+", shape=tuple(shape))
+            if mask_file is None:
+                _writeSlab(var, index, data, time_slice, fill, fill_below)
+            else:
+                varFromDate = var[index]
+                mask = np.memmap(mask_file, dtype=bool, mode="r+", shape=tuple(shape))
+                data[time_slice] = np.ma.getdata(varFromDate)
+                mask[time_slice] = np.ma.getmaskarray(varFromDate)
+                mask.flush()
+                del mask
+            data.flush()
+            del data
+    finally:
+        nc.close()
+
+
+def _getDtype(var, dtype, fill):
+    """
+    Get the dtype of the output array of a variable. For fill="nan" integers become float64, as they can not
+    hold nan.
+    """
+    if dtype is not None:
+        return np.dtype(dtype)
+
+    _dtype = var[tuple(slice(0, 0) for dim in var.dimensions)].dtype.newbyteorder("=")  # netCDF-3 is big-endian
+    if fill == "nan" and _dtype.kind != "f":
+        return np.dtype(np.float64)
+    return _dtype
+
+
+def _readSlab(var, index, fill="mask"):
+    """
+    Reads a hyperslab of a variable. For fill="nan" and fill="raw" the values are read without masking (but
+    scale_factor and add_offset are still applied).
+    """
+    if fill == "mask":
+        return var[index]
+
+    if hasattr(var, "set_auto_mask"):
+        var.set_auto_mask(False)
+        try:
+            return var[index]
+        finally:
+            var.set_auto_mask(True)
+    if fill == "nan":
+        return var[index]  # e.g. a view into a store, its mask is applied by _writeSlab()
+    return np.ma.getdata(var[index])
+
+
+def _writeSlab(var, index, target, target_index, fill="mask", fill_below=None, source=None):
+    """
+    Reads a hyperslab of a variable and writes it into target[target_index]. For fill="nan" the missing values
+    are replaced by nan in place in the target.
+
+    Args:
+        var: Variable to read from (or an array which was already read).
+        index: Index of the hyperslab in var.
+        target: Output array.
+        target_index: Index in the output array.
+        fill: "mask", "nan" or "raw" (see __Device.getVariables()).
+        fill_below: Optional number. With fill="nan", values below are replaced by nan as well.
+        source: The netCDF-variable, if var is an array which was already read. Needed for the fill values.
+    """
+    if source is None:
+        source = var
+        var = _readSlab(var, index, fill)
+        index = Ellipsis
+
+    target[target_index] = var[index]
+    if fill != "nan":
+        return
+
+    slab = target[target_index]
+    if np.ma.isMaskedArray(var):
+        slab[np.ma.getmaskarray(var[index])] = np.nan
+    for value in _getFillValues(source):
+        slab[slab == value] = np.nan
+    if fill_below is not None:
+        slab[slab < fill_below] = np.nan
+
+
+def _getFillValues(var):
+    """
+    Get the values which mark missing data in a variable: the _FillValue (or the default fill value of the type)
+    and the missing_value. They are scaled like the data, if the variable has a scale_factor or add_offset.
+    """
+    from netCDF4 import default_fillvals
+
+    dtype = np.dtype(var.dtype)
+    if dtype.kind not in "iuf":
+        return []
+
+    attrs = var.ncattrs()
+    if "_FillValue" in attrs:
+        fills = [var.getncattr("_FillValue")]
+    else:
+        fills = [default_fillvals[dtype.str[1:]]]
+    if "missing_value" in attrs:
+        fills += list(np.atleast_1d(var.getncattr("missing_value")))
+
+    fills = np.array(fills).astype(dtype)
+    if "scale_factor" in attrs:
+        fills = fills * var.getncattr("scale_factor")
+    if "add_offset" in attrs:
+        fills = fills + var.getncattr("add_offset")
+    return list(fills)
+
+
+def _removeFile(path):
+    """
+    Removes a file, if it still exists.
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -34,6 +34,11 @@ class Radar(__Device):
             end: Either String or datetime.datetime-object indicating the end of the timewindow
             device: the device you want to use. Currently supported: CORAL, KATRIN
             version: The version of the dataset to use. Currently supported: 1,2,3  [note: 3 is in beta-phase]
+            workers: Number of files which are read in parallel by the getters. Default is 1.
+            executor: "thread" or "process": whether the files are read by threads or processes.
+            store: Optional BCO.tools.store.Store (or its directory), which is read instead of the files.
+            prefetch: Number of files which are downloaded, decompressed and opened in the background while the
+                      getters read the current one. Default is 0 (no prefetching).
 
     Example:
         The following example initiates a radar object for the CORAL with a timewindow form the 1st January 2017 to
@@ -78,19 +83,25 @@ class Radar(__Device):
             skipped: if loading longer timeseries, where days might be missing, you can find those missing timesteps here.
     """
 
-    def __init__(self, start, end, device="CORAL", version=2):
+    def __init__(self, start, end, device="CORAL", version=2, workers=1, executor="thread", store=None, prefetch=0):
         """
         Args:
             start: start of the timeframe ( for more info run Radar.help() )
             end: end of the timeframe ( for more info run Radar.help() )
             device: the device you want to use. Currently supported: CORAL, KATRIN
             version: The version of the dataset to use. Currently supported: 1,2,3  [note: 3 is in beta-phase]
+            workers: Number of files which are read in parallel by the getters. Default is 1.
+            executor: "thread" or "process": whether the files are read by threads or processes.
+            store: Optional BCO.tools.store.Store (or its directory), which is read instead of the files.
+            prefetch: Number of files which are downloaded, decompressed and opened in the background while the
+                      getters read the current one. Default is 0 (no prefetching).
         """
 
         self.device = device
         self.pathFlag = self.__getFlag()
         self.start = self._checkInputTime(start)
         self.end = self._checkInputTime(end)
+        self._setWorkers(workers, executor, prefetch)
         self.data_version = version
         self._instrument = BCO.config[device]["INSTRUMENT"] # String used for retrieving the filepath from settings.ini
         # print(self._instrument)
@@ -100,6 +111,7 @@ class Radar(__Device):
         self._path_addition = BCO.config[self._instrument]["PATH_ADDITION"]
         self._path_addition = None if self._path_addition == "None" else self._path_addition # convert str to None
         self._ftp_files = []
+        self._setStore(store)
         self.path = self._getPath()
 
 
@@ -147,8 +159,7 @@ class Radar(__Device):
 
         try:  # check if device was running on selected timeframe
             for _date in tools.daterange(self.start, self.end):
-                _nameStr = tools.getFileName(self.device,_date,use_ftp=BCO.USE_FTP_ACCESS,filelist=self._ftp_files).split("/")[-1]
-                _file = glob.glob(self.path + _nameStr)[0]
+                self._findFile(_date)  # only looked up, the files are downloaded when they are read
         except:
             print("The Device %s was not running on %s. Please adjust timeframe.\n"
                   "For more information about device uptimes visit\n"
@@ -167,12 +178,15 @@ class Radar(__Device):
         elif self.device == "KATRIN":
             return "KATRIN"
 
-    def getReflectivity(self, postprocessing="Zf"):
+    def getReflectivity(self, postprocessing="Zf", lazy=False, height=None, gates=None):
         """
         Loads the reflecitivity over the desired timeframe from multiple netCDF-files and returns them as one array.
 
         Args:
             postprocessing: see Radar.help() for more inforamation
+            lazy: Boolean: If True, a LazyArray is returned which only reads the data when it is sliced.
+            height: Tuple (min, max) in meters: only read the range-gates in between.
+            gates: Slice of the range-gates to read (instead of height).
 
         Returns:
             2-D numpy array with getReflectivity in dbz
@@ -182,10 +196,18 @@ class Radar(__Device):
             initiated radar object 'coral':
 
             >>> coral.getReflectivity(postprocessing="Zu")
+
+            Reading just the first hour of a long timeframe:
+
+            >>> coral.getReflectivity(lazy=True)[:360]
+
+            Reading just the lowest 3 km:
+
+            >>> coral.getReflectivity(height=(0, 3000))
         """
 
         if postprocessing in self.__getPostProcessingForVersion():
-            dbz = self._getArrayFromNc(value=postprocessing)
+            dbz = self._getArrayFromNc(value=postprocessing, lazy=lazy, height=height, gates=gates)
             return dbz
         else:
             print("ERROR: %s is not a valid postprocessing operator for data version %i." %
@@ -193,12 +215,15 @@ class Radar(__Device):
             print("Allowed operators are: %s" % (",".join(self.__getPostProcessingForVersion())))
             return None
 
-    def getVelocity(self, target="hydrometeors"):
+    def getVelocity(self, target="hydrometeors", lazy=False, height=None, gates=None):
         """
         Loads the doppler velocity from the netCDF-files and returns them as one array
 
         Args:
             target: String of which target the velocity you want to get from: 'hydrometeors' or 'all'.
+            lazy: Boolean: If True, a LazyArray is returned which only reads the data when it is sliced.
+            height: Tuple (min, max) in meters: only read the range-gates in between.
+            gates: Slice of the range-gates to read (instead of height).
 
         Returns:
             2-D numpy array with doppler velocity in m/s
@@ -218,7 +243,7 @@ class Radar(__Device):
             print("%s is not a valid target. Please use on of %s" % (target, ", ".join(targets.keys())))
             return None
 
-        velocity = self._getArrayFromNc(targets[target])
+        velocity = self._getArrayFromNc(targets[target], lazy=lazy, height=height, gates=gates)
 
         return velocity
 
@@ -246,12 +271,15 @@ class Radar(__Device):
         radarConstant = self._getArrayFromNc('RadarConst')
         return radarConstant
 
-    def getNoisePower(self, channel):
+    def getNoisePower(self, channel, lazy=False, height=None, gates=None):
         """
         Loads the HSdiv Noise Power in DSP of the desired channel from all netCDF-Files returns them as one array.
 
         Args:
             channel: String: can be either "Co" or "Cross".
+            lazy: Boolean: If True, a LazyArray is returned which only reads the data when it is sliced.
+            height: Tuple (min, max) in meters: only read the range-gates in between.
+            gates: Slice of the range-gates to read (instead of height).
 
         Returns:
             2D-numpy array containing the HSdiv Noise Power in DSP for all heigts and timesteps.
@@ -263,17 +291,20 @@ class Radar(__Device):
             print("%s is not a valid channel. Please use on of %s" % (channel, ", ".join(channels.keys())))
             return None
 
-        noise = self._getArrayFromNc(channels[channel])
+        noise = self._getArrayFromNc(channels[channel], lazy=lazy, height=height, gates=gates)
 
         return noise
 
-    def getLDR(self, target="hydrometeors"):
+    def getLDR(self, target="hydrometeors", lazy=False, height=None, gates=None):
         """
         Loads the linear depolarization ratio (LDR) in dbZ of the desired target from all netCDF-Files returns them as one
          array. Allowed targets are: "hydrometeors" or "all". The default is "hydrometeors".
 
         Args:
             target: String: can be either "hydrometeors" or "all"
+            lazy: Boolean: If True, a LazyArray is returned which only reads the data when it is sliced.
+            height: Tuple (min, max) in meters: only read the range-gates in between.
+            gates: Slice of the range-gates to read (instead of height).
 
         Returns:
             2D-numpy array containing LDR in dbZ for all heigts and timesteps.
@@ -287,17 +318,20 @@ class Radar(__Device):
             print("%s is not a valid target. Please use on of %s" % (target, ", ".join(targets.keys())))
             return None
 
-        ldr = self._getArrayFromNc(targets[target])
+        ldr = self._getArrayFromNc(targets[target], lazy=lazy, height=height, gates=gates)
 
         return ldr
 
-    def getRMS(self, target="hydrometeors"):
+    def getRMS(self, target="hydrometeors", lazy=False, height=None, gates=None):
         """
         Loads the Peak Width RMS in m/s of the desired target from all netCDF-Files returns them as one
          array. Allowed targets are: "hydrometeors" or "all". The default is "hydrometeors".
 
         Args:
             target: String: can be either "hydrometeors" or "all"
+            lazy: Boolean: If True, a LazyArray is returned which only reads the data when it is sliced.
+            height: Tuple (min, max) in meters: only read the range-gates in between.
+            gates: Slice of the range-gates to read (instead of height).
 
         Returns:
             2D-numpy array containing LDR in m/s for all heigts and timesteps.
@@ -311,17 +345,20 @@ class Radar(__Device):
             print("%s is not a valid target. Please use on of %s" % (target, ", ".join(targets.keys())))
             return None
 
-        rms = self._getArrayFromNc(targets[target])
+        rms = self._getArrayFromNc(targets[target], lazy=lazy, height=height, gates=gates)
 
         return rms
 
-    def getSNR(self, target="hydrometeors"):
+    def getSNR(self, target="hydrometeors", lazy=False, height=None, gates=None):
         """
         Loads the reflectivity SNR in dbZ of the desired target from all netCDF-Files and returns them as one
          array. Allowed targets are: "hydrometeors", "all" or "plank". The default is "hydrometeors".
 
         Args:
             target: String: can be either "hydrometeors","plank" or "all"
+            lazy: Boolean: If True, a LazyArray is returned which only reads the data when it is sliced.
+            height: Tuple (min, max) in meters: only read the range-gates in between.
+            gates: Slice of the range-gates to read (instead of height).
 
         Returns:
             2D-numpy array containing LDR in dbZ for all heigts and timesteps.
@@ -336,16 +373,20 @@ class Radar(__Device):
             print("%s is not a valid target. Please use on of %s" % (target, ", ".join(targets.keys())))
             return None
 
-        snr = self._getArrayFromNc(targets[target])
+        snr = self._getArrayFromNc(targets[target], lazy=lazy, height=height, gates=gates)
 
         return snr
 
-    def getRange(self):
+    def getRange(self, height=None, gates=None):
         """
         Loads the range-gates from the netCDF-file which contains the last entries of the desired timeframe.
         Note: just containing the range-gates from the first valid file of all used netCDF-files. If the range-gating
         changes over the input-timewindow, then you might run into issues.
 
+        Args:
+            height: Tuple (min, max) in meters: only read the range-gates in between.
+            gates: Slice of the range-gates to read (instead of height).
+
         Returns:
             A numpy array with height in meters
 
@@ -355,10 +396,11 @@ class Radar(__Device):
             >>> coral.getRange()
         """
 
-        range = self._getArrayFromNc("range")
+        range = self._getArrayFromNc("range", height=height, gates=gates)
 
         # in case of many days being loaded and their range might be concatenated they will be split here:
-        range = range[:np.nanargmax(range)+1]
+        if len(range) > 0:  # a height-interval outside of the range-gates selects none
+            range = range[:np.nanargmax(range)+1]
 
         return range
 
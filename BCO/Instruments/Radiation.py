@@ -59,17 +59,23 @@ class Radiation(__Device):
         410.29000854,  410.61999512], dtype=float32)
 
     """
-    def __init__(self, start, end):
+    def __init__(self, start, end, workers=1, executor="thread", store=None, prefetch=0):
         """
         Sets up some variables and loads static parameters from the netcdf file.
 
         Args:
             start: start of the timeframe.
             end: end of the timeframe.
+            workers: Number of files which are read in parallel by the getters. Default is 1.
+            executor: "thread" or "process": whether the files are read by threads or processes.
+            store: Optional BCO.tools.store.Store (or its directory), which is read instead of the files.
+            prefetch: Number of files which are downloaded, decompressed and opened in the background while the
+                      getters read the current one. Default is 0 (no prefetching).
         """
 
         self.start = self._checkInputTime(start) + timedelta(hours=0)
         self.end = self._checkInputTime(end) + timedelta(hours=0)
+        self._setWorkers(workers, executor, prefetch)
 
         self._instrument = BCO.config["RADIATION"]["INSTRUMENT"]
         self._name_str = BCO.config["RADIATION"]["NAME_SCHEME"]
@@ -77,6 +83,7 @@ class Radiation(__Device):
         self._path_addition = None if self._path_addition == "None" else self._path_addition # convert str to None
         # self._dateformat_str = BCO.config["RADIATION"]["DATE_FORMAT"]
         self._ftp_files = []
+        self._setStore(store)
 
         self.path = self._getPath()
 
@@ -104,12 +111,17 @@ class Radiation(__Device):
         self.lat = self._getValueFromNc("lat")
         self.lon = self._getValueFromNc("lon")
 
-    def getTime(self):
+    def getTime(self, kind="datetime"):
         """
         Loads the time steps over the desired timeframe from all netCDF-files and returns them as one array.
 
+        Args:
+            kind: "datetime" (default): numpy array of datetime.datetime objects (UTC).
+                  "datetime64": numpy array of dtype datetime64[ns] (UTC). Much faster and smaller.
+                  "epoch": numpy array of seconds since 1970 as float.
+
         Returns:
-            A numpy array containing datetime.datetime objects
+            A numpy array containing datetime.datetime objects (or datetime64 / seconds since 1970, see kind)
 
         Example:
             Getting the time-stamps from an an already initiated Radiation object 'rad':
@@ -119,10 +131,7 @@ class Radiation(__Device):
 
         time = self._getArrayFromNc('time')
 
-        time = BCO.tools.convert.num2time(time)  # converting seconds since 1970 to datetime objects
-        time = self._local2UTC(time)
-
-        return time
+        return self._convertTime(time, kind=kind)
 
     def getRadiation(self,scope,scattering=None):
         """
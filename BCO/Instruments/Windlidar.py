@@ -32,6 +32,11 @@ class Windlidar(__Device):
     Args:
         start: Either String or datetime.datetime-object indicating the start of the timefwindow
         end: Either String or datetime.datetime-object indicating the end of the timefwindow
+        workers: Number of files which are read in parallel by the getters. Default is 1.
+        executor: "thread" or "process": whether the files are read by threads or processes.
+        store: Optional BCO.tools.store.Store (or its directory), which is read instead of the files.
+        prefetch: Number of files which are downloaded, decompressed and opened in the background while the
+                  getters read the current one. Default is 0 (no prefetching).
 
     Attributes:
         title: Title of the netCDF file.
@@ -65,10 +70,11 @@ class Windlidar(__Device):
 
     """
 
-    def __init__(self, start, end):
+    def __init__(self, start, end, workers=1, executor="thread", store=None, prefetch=0):
 
         self.start = self._checkInputTime(start) + timedelta(hours=0)
         self.end = self._checkInputTime(end) + timedelta(hours=0)
+        self._setWorkers(workers, executor, prefetch)
 
         self.skipped = None  # needed to store skipped dates.
 
@@ -78,6 +84,7 @@ class Windlidar(__Device):
         self._path_addition = BCO.config[self._instrument]["PATH_ADDITION"]
         self._path_addition = None if self._path_addition == "None" else self._path_addition # convert str to None
         self._ftp_files = []
+        self._setStore(store)
 
         self.path = self._getPath()
         # print(self.path)
@@ -101,12 +108,17 @@ class Windlidar(__Device):
 
 
 
-    def getTime(self):
+    def getTime(self, kind="datetime"):
         """
         Loads the time steps over the desired timeframe from all netCDF-files and returns them as one array.
 
+        Args:
+            kind: "datetime" (default): numpy array of datetime.datetime objects (UTC).
+                  "datetime64": numpy array of dtype datetime64[ns] (UTC). Much faster and smaller.
+                  "epoch": numpy array of seconds since 1970 as float.
+
         Returns:
-            A numpy array containing datetime.datetime objects
+            A numpy array containing datetime.datetime objects (or datetime64 / seconds since 1970, see kind)
 
         Example:
             Getting the time-stamps from an an already initiated Windlidar object 'lidar':
@@ -116,17 +128,18 @@ class Windlidar(__Device):
 
         time = self._getArrayFromNc('time')
 
-        time = BCO.tools.convert.num2time(time)  # converting seconds since 1970 to datetime objects
-        time = self._local2UTC(time)
-
-        return time
+        return self._convertTime(time, kind=kind)
 
-    def getRange(self):
+    def getRange(self, height=None, gates=None):
         """
         Loads the range-gates from the netCDF-file which contains the last entries of the desired timeframe.
         Note: just containing the range-gates from the first valid file of all used netCDF-files. If the range-gating
         changes over the input-timewindow, then you might run into issues.
 
+        Args:
+            height: Tuple (min, max) in meters: only read the range-gates in between.
+            gates: Slice of the range-gates to read (instead of height).
+
         Returns:
             A numpy array with height in meters
 
@@ -136,20 +149,23 @@ class Windlidar(__Device):
             >>> lidar.getRange()
         """
 
-        range = self._getArrayFromNc("range")
+        range = self._getArrayFromNc("range", height=height, gates=gates)
 
         # in case of many days being loaded and their range might be concatenated they will be split here:
         # range = range[:np.nanargmax(range)+1]
 
         return range
 
-    def getIntensity(self, version="alpha"):
+    def getIntensity(self, version="alpha", lazy=False, height=None, gates=None):
         """
         Loads the volume attenuated backwards scattering from the "volume attenuated backwarts scattering function in
         air".
 
         Args:
             version: can be either "alpha" or "beta"
+            lazy: Boolean: If True, a LazyArray is returned which only reads the data when it is sliced.
+            height: Tuple (min, max) in meters: only read the range-gates in between.
+            gates: Slice of the range-gates to read (instead of height).
 
         Returns:
             A numpy array with the backscatter Intensity
@@ -157,30 +173,33 @@ class Windlidar(__Device):
 
 
         if version == "alpha":
-            intensity = self._getArrayFromNc("intensity")
+            intensity = self._getArrayFromNc("intensity", lazy=lazy, height=height, gates=gates)
         elif version == "beta":
-            intensity = self._getArrayFromNc("beta")
+            intensity = self._getArrayFromNc("beta", lazy=lazy, height=height, gates=gates)
         else:
             print("Not a valid version: %s"%version)
             return None
 
         return intensity
 
-    def getVelocity(self,version="corrected"):
+    def getVelocity(self,version="corrected", lazy=False, height=None, gates=None):
         """
         The radial velocity of of scatterers away from the instrument.
 
         Args:
             version: can be either corrected or uncorrected
+            lazy: Boolean: If True, a LazyArray is returned which only reads the data when it is sliced.
+            height: Tuple (min, max) in meters: only read the range-gates in between.
+            gates: Slice of the range-gates to read (instead of height).
 
         Returns:
             A numpy array with the velocity.
 
         """
         if version == "uncorrected":
-            vel = self._getArrayFromNc("dv")
+            vel = self._getArrayFromNc("dv", lazy=lazy, height=height, gates=gates)
         elif version == "corrected":
-            vel = self._getArrayFromNc("dv_corr")
+            vel = self._getArrayFromNc("dv_corr", lazy=lazy, height=height, gates=gates)
         else:
             print("Not a valid version: %s" % version)
             return None
@@ -192,17 +211,7 @@ class Windlidar(__Device):
         """
         Function to load the static attributes from the netCDF file.
         """
-        _date = self.start.date()
-
-        if BCO.USE_FTP_ACCESS:
-            _file = self._ftp_files[0]
-        else:
-            _file = tools.getFileName(self._instrument,_date, use_ftp=BCO.USE_FTP_ACCESS,filelist=self._ftp_files)
-
-        if "bz2" in _file[-5:]:
-            nc = tools.bz2Dataset(_file)
-        else:
-            nc = Dataset(_file)
+        nc = self._getNc(self.start.date())
         self.title = nc.title
         self.device = nc.devices
         self.systemID = nc.systemID
@@ -210,7 +219,6 @@ class Windlidar(__Device):
         self.focusRange = nc.focusRange
         self.temporalResolution = nc.resolution.split(";")[0]
         self.location = nc.location
-        nc.close()
 
         self.lat = self._getValueFromNc("lat")
         self.lon = self._getValueFromNc("lon")
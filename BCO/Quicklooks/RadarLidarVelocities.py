@@ -283,17 +283,19 @@ def plot_RadarLidarVelcities(datestr=None, output_path=""):
     coralTime = coral.getTime()
     lidarTime = lidar.getTime()
 
-    coralRange = coral.getRange()
-    lidarRange = lidar.getRange()
+    height = (0, 2000)  # the plot only shows the lowest 1500 m, so there is no need to read more
 
-    coralVel = coral.getVelocity()
-    lidarVel = lidar.getVelocity()
+    coralRange = coral.getRange(height=height)
+    lidarRange = lidar.getRange(height=height)
+
+    coralVel = coral.getVelocity(height=height)
+    lidarVel = lidar.getVelocity(height=height)
     lidarVel[:,:2] = np.nan
 
 
 
-    lidarInt = lidar.getIntensity()
-    coralRef = coral.getReflectivity()
+    lidarInt = lidar.getIntensity(height=height)
+    coralRef = coral.getReflectivity(height=height)
 
 
     # ================================
@@ -23,12 +23,38 @@ config.read(package_directory+"/settings.ini")
 
 
 # ----------------------------------------------------------
-# Setting global variables for FTP:
+# Setting global variables for FTP (the server can be given as "host" or "host:port"):
 
 FTP_USER = None
 FTP_PASSWD = None
 FTP_SERVER = config["DEFAULT"]["SERVER_NAME"]
 
+# ----------------------------------------------------------
+# Archive catalog (see BCO.tools.catalog), used instead of searching the filesystem if set:
+
+CATALOG = None
+
+# ----------------------------------------------------------
+# Cache for decompressed copies of .nc.bz2 files (see BCO.tools.cache), used if set:
+
+CACHE = None
+
+# ----------------------------------------------------------
+# Pool of FTP-connections shared by all file lookups and downloads (see BCO.tools.pool.FTPPool), created on first use:
+
+FTP_POOL = None
+
+# ----------------------------------------------------------
+# Cache of the directory listings of the FTP-server (see BCO.tools.listing.ListingCache), created on first use:
+
+FTP_LISTINGS = None
+
+# ----------------------------------------------------------
+# Persistent cache of the files downloaded from the FTP-server (see BCO.tools.download.DownloadCache), created on
+# first use:
+
+DOWNLOAD_CACHE = None
+
 # ----------------------------------------------------------
 # Setting the version:
 
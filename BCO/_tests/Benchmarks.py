@@ -0,0 +1,163 @@
+import os
+import bz2
+import time
+import tempfile
+import numpy as np
+
+
+class DecompressionBenchmark(object):
+    """
+    Compares the throughput of the serial bz2-decompression with BCO.tools.decompress.bz2Decompress().
+
+    Args:
+        bz2file: Path to a .bz2 file. If None, a file with 50 MB of synthetic radar-like data is created.
+        workers: List of the numbers of threads to test.
+        repeat: How often every decompression is timed. The fastest run is reported.
+    """
+
+    def __init__(self, bz2file=None, workers=None, repeat=3):
+        print("==========================================")
+        print("||>>>Benchmarking the bz2 decompression   ")
+        print("==========================================")
+
+        from BCO.tools.decompress import bz2Decompress
+
+        if workers is None:
+            workers = sorted(set([2, 4, os.cpu_count() or 1]))
+
+        tmpfile = None
+        if bz2file is None:
+            tmpfile = self.__createFile()
+            bz2file = tmpfile
+
+        try:
+            with open(bz2file, "rb") as f:
+                memory = bz2.decompress(f.read())
+            size = len(memory) / 1e6
+            print("File: %s (%.1f MB decompressed, %i cores)" % (bz2file, size, os.cpu_count() or 1))
+
+            serial = self.__time(lambda: bz2.BZ2File(bz2file).read(), repeat)
+            print("serial:     %6.2f s  %7.1f MB/s" % (serial, size / serial))
+
+            for n in workers:
+                assert bz2Decompress(bz2file, workers=n) == memory
+                parallel = self.__time(lambda: bz2Decompress(bz2file, workers=n), repeat)
+                print("%2i threads: %6.2f s  %7.1f MB/s  (speedup %.2f)" % (n, parallel, size / parallel,
+                                                                           serial / parallel))
+        finally:
+            if tmpfile is not None:
+                os.remove(tmpfile)
+
+        print("================================")
+        print("||>>> benchmark finished  <<<||")
+        print("================================")
+
+    @staticmethod
+    def __time(func, repeat):
+        times = []
+        for i in range(repeat):
+            t = time.time()
+            func()
+            times.append(time.time() - t)
+        return min(times)
+
+    @staticmethod
+    def __createFile():
+        data = np.random.RandomState(0).normal(size=(12500, 1000)).cumsum(axis=0).astype("float32")
+        fd, path = tempfile.mkstemp(suffix=".bz2")
+        with os.fdopen(fd, "wb") as f:
+            f.write(bz2.compress(data.tobytes()))
+        return path
+
+
+class FTPBenchmark(object):
+    """
+    Measures the FTP access path against a local stand-in of the FTP-server (see BCO._tests.FTPServer), which
+    answers with a delay and limits the rate of every transfer like a remote server. Every measurement starts cold:
+    without open connections, cached listings or downloaded files. Needs pyftpdlib.
+
+    Reported are the file lookups (logins and listings), the throughput of the DownloadManager with one and with
+    all connections of the pool, and the end-to-end load times of the instruments (constructor and one getter).
+
+    Args:
+        instruments: List of the instruments to load. Default is all of "CORAL", "WINDLIDAR", "CEILOMETER",
+                     "RADIATION" and "WEATHER".
+        days: Integer: Number of days which are loaded.
+        latency: Seconds which every reply of the server is delayed.
+        bandwidth: Maximum rate of every transfer in bytes per second.
+    """
+
+    _GETTERS = {"CORAL": ("Radar", lambda device: device.getReflectivity()),
+                "WINDLIDAR": ("Windlidar", lambda device: device.getVelocity()),
+                "CEILOMETER": ("Ceilometer", lambda device: device.getCBH()),
+                "RADIATION": ("Radiation", lambda device: device.getRadiation("SW", "global")),
+                "WEATHER": ("SfcWeather", lambda device: device.getTemperature())}
+
+    def __init__(self, instruments=None, days=3, latency=0.05, bandwidth=10e6):
+        print("==========================================")
+        print("||>>>Benchmarking the FTP access path     ")
+        print("==========================================")
+
+        import shutil
+        from datetime import datetime as dt
+        from datetime import timedelta
+        from BCO.tools import tools
+        from BCO.tools.download import DownloadManager
+        from BCO._tests.FTPServer import LocalFTPServer
+
+        if instruments is None:
+            instruments = sorted(self._GETTERS)
+        start = dt(2018, 3, 1)
+        end = start + timedelta(days=days - 1)
+
+        with LocalFTPServer(latency=latency, bandwidth=bandwidth) as server:
+            paths = server.populate(instruments, start, end)
+            print("Server: %i files, latency %.0f ms, %.1f MB/s per transfer" %
+                  (len(paths), latency * 1e3, (bandwidth or 0) / 1e6))
+
+            print("---- file lookups ----")
+            for instrument in instruments:
+                server.reset()
+                step = "month" if instrument == "CEILOMETER" else "day"
+                t = time.time()
+                for date in tools.daterange(start, end, step=step):
+                    tools.getFileName(instrument, date, use_ftp=True)
+                print("%-10s  %6.2f s  %2i logins  %3i listings" % (instrument, time.time() - t, server.logins,
+                                                                    self.__listings(server)))
+
+            print("---- downloads ----")
+            for connections in sorted(set([1, tools.getFTPPool().maxsize])):
+                server.reset()
+                folder = tempfile.mkdtemp(prefix="bco_benchmark_")
+                try:
+                    t = time.time()
+                    DownloadManager(connections=connections, verbose=False).download(paths, folder)
+                    self.__report("%i connections" % connections, time.time() - t, server)
+                finally:
+                    shutil.rmtree(folder, ignore_errors=True)
+
+            print("---- instruments ----")
+            import BCO.Instruments
+            for instrument in instruments:
+                name, getter = self._GETTERS[instrument]
+                server.reset()
+                t = time.time()
+                device = getattr(BCO.Instruments, name)(start, dt(end.year, end.month, end.day, 23, 59))
+                constructor = time.time() - t
+                getter(device)
+                self.__report("%s (constructor %.2f s)" % (name, constructor), time.time() - t, server)
+                device.close()
+
+        print("================================")
+        print("||>>> benchmark finished  <<<||")
+        print("================================")
+
+    @staticmethod
+    def __listings(server):
+        return sum(server.commands[cmd] for cmd in ["MLSD", "NLST", "LIST"])
+
+    @classmethod
+    def __report(cls, label, seconds, server):
+        print("%-32s %6.2f s  %2i logins  %3i listings  %3i files  %7.1f MB  %6.2f MB/s" %
+              (label, seconds, server.logins, cls.__listings(server), server.commands["RETR"],
+               server.bytes_sent / 1e6, server.bytes_sent / 1e6 / max(seconds, 1e-6)))
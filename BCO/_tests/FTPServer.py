@@ -0,0 +1,394 @@
+"""
+This module contains a local stand-in for the FTP-server, so the FTP access path can be tested and benchmarked
+without ftp-projects.zmaw.de. It needs pyftpdlib (pip install pyftpdlib).
+
+>>> from BCO._tests.FTPServer import LocalFTPServer
+
+"""
+
+import os
+import bz2
+import time
+import shutil
+import fnmatch
+import logging
+import calendar
+import tempfile
+import threading
+import posixpath
+import collections
+from datetime import datetime as dt
+
+import numpy as np
+
+import BCO
+from BCO.tools import tools
+
+# Synthetic content of the files of every instrument: seconds between the time-stamps, number of range-gates,
+# variables with (time, range), variables with (time,), scalar variables, global attributes and whether the files
+# are stored as .nc.bz2:
+_RADAR = {"step": 10, "gates": 50,
+          "profiles": ["Zf", "Ze", "Zg", "Zu", "VEL", "VELg", "LDR", "RMS", "SNR", "SNRg"],
+          "series": ["MeltHei", "RadarConst", "tpow"],
+          "scalars": ["lat", "lon", "azi", "elv", "northangle"],
+          "attributes": ["title"],
+          "bz2": False}
+
+_CONTENT = {"CORAL": _RADAR,
+            "KATRIN": _RADAR,
+            "WINDLIDAR": {"step": 10, "gates": 60,
+                          "profiles": ["intensity", "beta", "dv", "dv_corr"],
+                          "series": [],
+                          "scalars": ["lat", "lon", "pitch", "azi", "ele", "roll"],
+                          "attributes": ["title", "devices", "systemID", "scanType", "focusRange", "location",
+                                         "resolution"],
+                          "bz2": True},
+            "RADIATION": {"step": 1, "gates": 0,
+                          "profiles": [],
+                          "series": ["LWdown_diffuse", "SWdown_direct", "SWdown_diffuse", "SWdown_global"],
+                          "scalars": ["lat", "lon"],
+                          "attributes": ["title", "devices", "resolution", "location"],
+                          "bz2": False},
+            "WEATHER": {"step": 10, "gates": 0,
+                        "profiles": [],
+                        "series": ["SDQ", "DIR", "MNV", "VEL", "MXV", "T", "RH", "P", "RI"],
+                        "scalars": ["lat", "lon"],
+                        "attributes": ["title", "devices", "resolution", "location", "position", "height"],
+                        "bz2": False},
+            "CEILOMETER": {"step": 15, "gates": 0,
+                           "profiles": [],
+                           "series": ["cbh_1", "cbh_2s_1", "cbh_jenoptik_1", "flag_rain", "flag_ceilo_status",
+                                      "flag_jenoptik_output", "flag_mrr_status"],
+                           "scalars": [],
+                           "attributes": ["title", "location", "details_rain", "details_cbh", "resolution",
+                                          "instrument"],
+                           "bz2": False}}
+
+
+class LocalFTPServer(object):
+    """
+    FTP-server on the local machine, which serves a synthetic archive laid out like the real server: the files are
+    placed by the FTP_PATH, DATA_VERSION, PATH_ADDITION and NAME_SCHEME entries of settings.ini. The server can be
+    slowed down like a remote one, and it counts what the clients do.
+
+    use() (or the with-statement) points the package to the server, restore() switches back to the old settings.
+    While the server is used, the files are downloaded into an empty download cache of its own.
+
+    Args:
+        root: Directory which is served. Default is a new temporary directory, which is removed by stop().
+        latency: Seconds which every reply of the server is delayed. Default is 0.
+        bandwidth: Maximum rate of every file transfer in bytes per second. Default is None (no limit).
+        port: Port of the server. Default is 0, a free port.
+        user: Username for the login. Default is "bco".
+        passwd: Password for the login. Default is "bco".
+        disabled: List of FTP-commands which the server rejects as not implemented, like some real servers do
+                  (e.g. ["SIZE", "MDTM"]). Default is none.
+
+    Attributes:
+        logins: Integer: Number of logins.
+        commands: collections.Counter of the FTP-commands (e.g. "RETR", "MLSD").
+        bytes_sent: Integer: Size of all files sent to the clients.
+
+    Example:
+        Loading two days of Windlidar data over a slow connection:
+
+        >>> from BCO._tests.FTPServer import LocalFTPServer
+        >>> with LocalFTPServer(latency=0.05, bandwidth=5e6) as server:
+        >>>     server.populate(["WINDLIDAR"], dt(2018, 3, 1), dt(2018, 3, 2))
+        >>>     lidar = Windlidar("20180301", "20180302")
+        >>>     velocity = lidar.getVelocity()
+        >>>     print(server.logins, server.commands["RETR"], server.bytes_sent)
+    """
+
+    def __init__(self, root=None, latency=0., bandwidth=None, port=0, user="bco", passwd="bco", disabled=None):
+        self.root = root
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.port = port
+        self.user = user
+        self.passwd = passwd
+        self.disabled = set(disabled or [])
+        self.logins = 0
+        self.commands = collections.Counter()
+        self.bytes_sent = 0
+
+        self._server = None
+        self._thread = None
+        self._remove_root = False
+        self._settings = None
+        self._cache = None
+        self._lock = threading.Lock()
+
+    @property
+    def address(self):
+        """
+        Address of the server in the form of BCO.FTP_SERVER ("host:port").
+        """
+        return "127.0.0.1:%i" % self.port
+
+    def start(self):
+        """
+        Starts the server in a background thread.
+        """
+        try:
+            from pyftpdlib.authorizers import DummyAuthorizer
+            from pyftpdlib.servers import ThreadedFTPServer
+        except ImportError:
+            raise ImportError("The local FTP-server needs pyftpdlib: pip install pyftpdlib")
+
+        if self.root is None:
+            self.root = tempfile.mkdtemp(prefix="bco_ftp_")
+            self._remove_root = True
+
+        authorizer = DummyAuthorizer()
+        authorizer.add_user(self.user, self.passwd, self.root, perm="elr")
+
+        logger = logging.getLogger("pyftpdlib")  # no line per command
+        if not logger.handlers:
+            logger.addHandler(logging.NullHandler())
+        logger.setLevel(logging.WARNING)
+
+        handler = _makeHandler(self)
+        handler.authorizer = authorizer
+        self._server = ThreadedFTPServer(("127.0.0.1", self.port), handler)
+        self.port = self._server.address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"timeout": 0.1})
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the server and removes the temporary archive.
+        """
+        if self._server is not None:
+            self._server.close_all()
+            self._thread.join()
+            self._server = None
+        if self._remove_root and self.root is not None:
+            shutil.rmtree(self.root, ignore_errors=True)
+            self.root = None
+        if self._cache is not None:
+            shutil.rmtree(self._cache.directory, ignore_errors=True)
+            self._cache = None
+
+    def use(self):
+        """
+        Points the package to this server: FTP-access is switched on, server and login are set and the connections
+        of the shared pool, the cached listings and the downloaded files are dropped.
+        """
+        from BCO.tools.download import DownloadCache
+
+        if self._settings is None:
+            self._settings = (BCO.USE_FTP_ACCESS, BCO.FTP_SERVER, BCO.FTP_USER, BCO.FTP_PASSWD, BCO.FTP_LISTINGS,
+                              BCO.DOWNLOAD_CACHE)
+        if self._cache is None:
+            self._cache = DownloadCache(tempfile.mkdtemp(prefix="bco_downloads_"), maxsize=None)
+        BCO.DOWNLOAD_CACHE = self._cache
+        BCO.USE_FTP_ACCESS = True
+        BCO.FTP_SERVER = self.address
+        BCO.FTP_USER = self.user
+        BCO.FTP_PASSWD = self.passwd
+        self.reset()
+
+    def reset(self):
+        """
+        Closes the idle connections of the shared pool, forgets the cached listings, removes the downloaded files
+        (which are not in use) and sets the counters to 0, so the next measurement starts cold.
+        """
+        if BCO.FTP_POOL is not None:
+            BCO.FTP_POOL.close()
+        BCO.FTP_LISTINGS = None
+        if self._cache is not None:
+            self._cache.clear()
+        with self._lock:
+            self.logins = 0
+            self.commands = collections.Counter()
+            self.bytes_sent = 0
+
+    def restore(self):
+        """
+        Switches back to the settings from before use().
+        """
+        if self._settings is None:
+            return
+        if BCO.FTP_POOL is not None:
+            BCO.FTP_POOL.close()
+        (BCO.USE_FTP_ACCESS, BCO.FTP_SERVER, BCO.FTP_USER, BCO.FTP_PASSWD, BCO.FTP_LISTINGS,
+         BCO.DOWNLOAD_CACHE) = self._settings
+        self._settings = None
+
+    def __enter__(self):
+        if self._server is None:
+            self.start()
+        self.use()
+        return self
+
+    def __exit__(self, *args):
+        self.restore()
+        self.stop()
+
+    def populate(self, instruments, start, end):
+        """
+        Writes synthetic files of instruments for a timeframe into the archive. Daily files are written for every
+        day, the Ceilometer files for every month.
+
+        Args:
+            instruments: List of the instruments, e.g. ["CORAL", "WINDLIDAR"].
+            start: datetime.datetime object: first day.
+            end: datetime.datetime object: last day.
+
+        Returns:
+            List of the paths of the files on the server.
+        """
+        paths = []
+        for instrument in instruments:
+            step = "month" if instrument == "CEILOMETER" else "day"
+            for date in tools.daterange(start, end, step=step):
+                path = getServerPath(instrument, date)
+                local = os.path.join(self.root, *path.strip("/").split("/"))
+                if not os.path.isdir(os.path.dirname(local)):
+                    os.makedirs(os.path.dirname(local))
+                _writeFile(local, instrument, date)
+                paths.append(path)
+        return paths
+
+
+def getServerPath(instrument, date):
+    """
+    Get the path of the synthetic file of an instrument on the server. It matches the pattern which
+    BCO.tools.tools.getFileName() searches for: the wildcards of the NAME_SCHEME are left out, except for a trailing
+    one after ".nc", which becomes ".bz2" for compressed files.
+
+    Args:
+        instrument: String: one of "CORAL", "KATRIN", "CEILOMETER", "RADIATION", "WEATHER", "WINDLIDAR".
+        date: datetime.datetime object.
+
+    Returns:
+        String with the path on the server.
+    """
+    config = BCO.config[instrument]
+    path = config["FTP_PATH"]
+    if config["DATA_VERSION"] != "None":
+        path += config["DATA_VERSION"]
+    if config["PATH_ADDITION"] != "None":
+        path += date.strftime(config["PATH_ADDITION"])
+
+    name = date.strftime(config["NAME_SCHEME"])
+    if name.endswith(".nc*"):
+        name = name[:-1] + (".bz2" if _CONTENT[instrument]["bz2"] else "")
+    return path + name.replace("*", "")
+
+
+def _writeFile(path, instrument, date):
+    """
+    Writes a synthetic netCDF-file of an instrument. Daily files cover the day of date, Ceilometer files the month.
+    """
+    from netCDF4 import Dataset
+
+    content = _CONTENT[instrument]
+    start = dt(date.year, date.month, date.day if instrument != "CEILOMETER" else 1)
+    if instrument == "CEILOMETER":
+        seconds = calendar.monthrange(start.year, start.month)[1] * 86400
+    else:
+        seconds = 86400
+    n = seconds // content["step"]
+    time = calendar.timegm(start.timetuple()) + np.arange(n, dtype=np.float64) * content["step"]
+    rng = np.random.RandomState(start.toordinal())
+
+    target = path[:-4] if path.endswith(".bz2") else path
+    with tools.netcdf_lock:
+        nc = Dataset(target, "w")
+        try:
+            nc.createDimension("time", None)
+            nc.createVariable("time", "f8", ("time",))[:] = time
+            if content["gates"]:
+                nc.createDimension("range", content["gates"])
+                nc.createVariable("range", "f4", ("range",))[:] = 155. + 30. * np.arange(content["gates"])
+
+            for name in content["profiles"]:
+                data = np.sin(np.arange(n)[:, None] / 500. + np.arange(content["gates"])[None, :] / 10.)
+                data = (data * 20. + rng.normal(scale=0.1, size=data.shape)).astype("f4")
+                data[::7, 3] = -999.
+                nc.createVariable(name, "f4", ("time", "range"), fill_value=-999.)[:] = data
+            for name in content["series"]:
+                data = (np.cos(np.arange(n) / 300.) * 100.).astype("f4")
+                data[::5] = -999.
+                nc.createVariable(name, "f4", ("time",), fill_value=-999.)[:] = data
+            for name in content["scalars"]:
+                nc.createVariable(name, "f4")[:] = 13.16
+            for name in content["attributes"]:
+                nc.setncattr(name, "%s of the synthetic %s" % (name, instrument))
+        finally:
+            nc.close()
+
+    if target != path:
+        with open(target, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(bz2.compress(data))
+        os.remove(target)
+
+
+def _makeHandler(server):
+    """
+    Creates the FTP-handler of pyftpdlib for a LocalFTPServer: it delays the replies, throttles the transfers,
+    counts the commands and supports wildcards in NLST like the real server.
+    """
+    from pyftpdlib.handlers import FTPHandler, DTPHandler
+
+    class _DTPHandler(DTPHandler):
+        # pyftpdlib's ThrottledDTPHandler only pauses after a whole second of data, so files smaller than the limit
+        # would not be slowed down at all. Every block books its transfer time instead:
+        _next = 0.
+
+        def use_sendfile(self):
+            return False
+
+        def send(self, data):
+            sent = DTPHandler.send(self, data)
+            now = time.time()
+            self._next = max(self._next, now) + sent / float(server.bandwidth)
+            if self._next > now and self.connected:
+                self.del_channel()
+                self.ioloop.call_later(self._next - now, self._wakeUp, _errback=self.handle_error)
+            return sent
+
+        def _wakeUp(self):
+            if self.connected:
+                self.add_channel(events=self.ioloop.WRITE)
+
+    class _Handler(FTPHandler):
+        dtp_handler = _DTPHandler if server.bandwidth else DTPHandler
+
+        def process_command(self, cmd, *args, **kwargs):
+            with server._lock:
+                server.commands[cmd] += 1
+            if server.latency:
+                time.sleep(server.latency)
+            if cmd in server.disabled:
+                return self.respond("502 Command not implemented.")
+            return FTPHandler.process_command(self, cmd, *args, **kwargs)
+
+        def on_login(self, username):
+            with server._lock:
+                server.logins += 1
+
+        def on_file_sent(self, file):
+            with server._lock:
+                server.bytes_sent += os.path.getsize(file)
+
+        def ftp_NLST(self, path):
+            virtual = self.fs.fs2ftp(path)
+            if not any(char in virtual for char in "*?["):
+                return FTPHandler.ftp_NLST(self, path)
+
+            directory, pattern = posixpath.split(virtual)
+            real = self.fs.ftp2fs(directory)
+            names = sorted(fnmatch.filter(os.listdir(real), pattern)) if os.path.isdir(real) else []
+            if not names:
+                return self.respond("550 No files found.")
+            data = "".join(posixpath.join(directory, name) + "\r\n" for name in names)
+            return self.push_dtp_data(data.encode("utf8"), cmd="NLST")
+
+    return _Handler
@@ -1,4 +1,53 @@
 from datetime import datetime as dt
+import contextlib
+import numpy as np
+
+@contextlib.contextmanager
+def _localArchive(instruments, start, end):
+    """
+    Writes synthetic files of instruments for a timeframe into a temporary folder and points the PATHs of the
+    settings.ini to it. The FTP-access, the catalog and the cache are switched off meanwhile.
+
+    Yields:
+        String: the temporary folder.
+    """
+    import os
+    import shutil
+    import tempfile
+    import BCO
+    from BCO.tools import tools
+    from BCO._tests.FTPServer import getServerPath, _writeFile
+
+    folder = tempfile.mkdtemp(prefix="bco_test_")
+    settings = (BCO.USE_FTP_ACCESS, BCO.CATALOG, BCO.CACHE,
+                dict((instrument, BCO.config[instrument]["PATH"]) for instrument in instruments))
+    try:
+        BCO.USE_FTP_ACCESS, BCO.CATALOG, BCO.CACHE = False, None, None
+        for instrument in instruments:
+            BCO.config[instrument]["PATH"] = os.path.join(folder, instrument) + "/"
+            step = "month" if instrument == "CEILOMETER" else "day"
+            for date in tools.daterange(start, end, step=step):
+                path = getServerPath(instrument, date)[len(BCO.config[instrument]["FTP_PATH"]):]
+                local = os.path.join(folder, instrument, *path.split("/"))
+                if not os.path.isdir(os.path.dirname(local)):
+                    os.makedirs(os.path.dirname(local))
+                _writeFile(local, instrument, date)
+        yield folder
+    finally:
+        BCO.USE_FTP_ACCESS, BCO.CATALOG, BCO.CACHE = settings[:3]
+        for instrument, path in settings[3].items():
+            BCO.config[instrument]["PATH"] = path
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def _assertSame(a, b):
+    """
+    Asserts that two (masked) arrays have the same shape, values and mask.
+    """
+    assert np.shape(a) == np.shape(b), (np.shape(a), np.shape(b))
+    assert np.ma.allequal(a, b)
+    assert np.array_equal(np.ma.getmaskarray(a), np.ma.getmaskarray(b))
+
 
 class ConverterTesting(object):
     def __init__(self):
@@ -23,7 +72,947 @@ class ConverterTesting(object):
         assert val2 == val_in
         del val_in,val1,val2
 
+        val_in = np.array([1514764800.0, 1514764810.5])
+        val1 = convert.num2datetime64(val_in)
+        assert val1[1] == np.datetime64("2018-01-01T00:00:10.5")
+        val2 = convert.datetime642num(val1)
+        assert np.array_equal(val2, val_in)
+        del val_in,val1,val2
+
+        from BCO.tools import tzconvert
+
+        # switch to summertime in Germany on 25 March 2018, 01:00 UTC:
+        val_in = np.array([1521937800.0, 1521941400.0])
+        val1 = tzconvert.utcoffset(val_in, tz="Europe/Berlin")
+        assert np.array_equal(val1, [3600, 7200])
+        val2 = tzconvert.local2utc(tzconvert.utc2local(val_in))
+        assert np.array_equal(val2, val_in)
+        del val_in,val1,val2
+
+        # the transitions are the same as the ones of datetime.fromtimestamp(), with and without tzinfo:
+        import datetime
+        import pytz
+        val_in = np.append(np.arange(1509238800.0 - 7200, 1509238800.0 + 7200, 599.5),  # back to wintertime 2017
+                           np.random.RandomState(0).uniform(1483228800, 1546300800, 1000))  # 2017 - 2018
+        for tz in ["Europe/Berlin", "America/Barbados", "UTC"]:
+            tzinfo = pytz.timezone(tz)
+            val1 = tzconvert.num2datetime(val_in, tz=tz)
+            val2 = [datetime.datetime.fromtimestamp(x, tzinfo) for x in val_in]
+            assert list(val1) == val2 and [x.tzname() for x in val1] == [x.tzname() for x in val2]
+            val1 = tzconvert.num2datetime(val_in, tz=tz, aware=False)
+            assert list(val1) == [x.replace(tzinfo=None) for x in val2]
+            val1 = tzconvert.utcoffset(val_in, tz=tz)
+            assert np.array_equal(val1, [x.utcoffset().total_seconds() for x in val2])
+        del val_in,val1,val2
+
+        print("=====================================")
+        print("||>>> test finished succesfully <<<||")
+        print("=====================================")
+
+
+
+class FTPTesting(object):
+    """
+    Tests the FTP access path (getFileName, getFTPClient, download_from_zmaw_ftp, the download cache and the
+    downloads of the instruments) against a local stand-in of the FTP-server (see BCO._tests.FTPServer). Needs pyftpdlib.
+    """
+    def __init__(self):
+        print("==========================================")
+        print("||>>>Testing the FTP access path          ")
+        print("==========================================")
+
+        import os
+        import shutil
+        import tempfile
+        from BCO.tools import tools
+        from BCO.tools.download import DownloadCache, DownloadManager
+        from BCO.Instruments import Windlidar, Ceilometer
+        from BCO._tests.FTPServer import LocalFTPServer, getServerPath
+
+        start, end = dt(2018,3,1), dt(2018,3,2)
+
+        with LocalFTPServer(latency=0.01) as server:
+            paths = server.populate(["WINDLIDAR", "CEILOMETER"], start, end)
+
+            # the names are resolved from one listing per directory:
+            val = tools.getFileName("WINDLIDAR", start, use_ftp=True)
+            assert val == getServerPath("WINDLIDAR", start)
+            assert val in paths
+            val = tools.getFileName("CEILOMETER", end, use_ftp=True)
+            assert val == getServerPath("CEILOMETER", start)
+            assert server.commands["MLSD"] == 2
+            del val
+
+            ftp = tools.getFTPClient()
+            assert os.path.split(paths[0])[-1] in [os.path.split(name)[-1] for name in
+                                                   ftp.nlst(os.path.dirname(paths[0]))]
+            ftp.quit()
+            del ftp
+
+            # the files are downloaded once, the second call finds complete copies:
+            folder = tempfile.mkdtemp(prefix="bco_test_")
+            try:
+                tools.download_from_zmaw_ftp("WINDLIDAR", start, end, output_folder=folder)
+                val = sorted(os.listdir(folder))
+                assert val == sorted(os.path.split(path)[-1] for path in paths if "WindLidar" in path)
+                sent = server.bytes_sent
+                tools.download_from_zmaw_ftp("WINDLIDAR", start, end, output_folder=folder)
+                assert server.bytes_sent == sent
+                del val, sent
+            finally:
+                shutil.rmtree(folder, ignore_errors=True)
+
+            # the instruments download their files over one login:
+            server.reset()
+            lidar = Windlidar(start, dt(2018,3,2,23,59))
+            val = lidar.getVelocity()
+            assert val.shape[1] == 60
+            assert server.logins == 1
+            assert server.commands["RETR"] == 2
+
+            # a second instance uses the same copies, which stay until both are closed:
+            other = Windlidar(start, dt(2018,3,2,23,59))
+            assert server.commands["RETR"] == 2
+            lidar.close()
+            assert all(os.path.isfile(path) for path in other._ftp_files)
+            other.close()
+            del lidar, other, val
+
+            ceilo = Ceilometer(start, dt(2018,3,2,23,59))
+            val = ceilo.getCBH()
+            assert len(val) == len(ceilo.getTime())
+            ceilo.close()
+            del ceilo, val
+
+            # copies without references are evicted, when the cache is too large:
+            cache = DownloadCache(tempfile.mkdtemp(prefix="bco_test_"), maxsize=1, verbose=False)
+            try:
+                first, second = cache.fetch(paths[:1]), cache.fetch(paths[1:2])
+                assert os.path.isfile(first[0]) and os.path.isfile(second[0])
+                cache.release(first)
+                assert not os.path.isfile(first[0]) and os.path.isfile(second[0])
+                sent = server.bytes_sent
+                assert cache.fetch(paths[1:2]) == second
+                assert server.bytes_sent == sent
+                del first, second, sent
+            finally:
+                shutil.rmtree(cache.directory, ignore_errors=True)
+                del cache
+
+        # a file which changed after it was listed, on a server without the SIZE command:
+        with LocalFTPServer(disabled=["SIZE"]) as server:
+            path = server.populate(["WINDLIDAR"], start, start)[0]
+            folder = tempfile.mkdtemp(prefix="bco_test_")
+            try:
+                manager = DownloadManager(verbose=False)
+                local = manager.download([path], folder)[0]
+                assert server.commands["SIZE"] == 0  # the size is taken from the listing
+
+                remote = os.path.join(server.root, *path.strip("/").split("/"))
+                with open(remote, "ab") as f:
+                    f.write(b"appended")
+                stat = os.stat(remote)
+                os.utime(remote, (stat.st_atime, stat.st_mtime + 10))
+                os.remove(local)
+                assert manager.download([path], folder) == [local]
+                assert server.commands["SIZE"] == 1
+                with open(local, "rb") as f, open(remote, "rb") as g:
+                    assert f.read() == g.read()
+                del manager, local, remote, stat
+            finally:
+                shutil.rmtree(folder, ignore_errors=True)
+
+        print("=====================================")
+        print("||>>> test finished succesfully <<<||")
+        print("=====================================")
+
+
+class MirrorTesting(object):
+    """
+    Mirrors a local stand-in of the FTP-server (see BCO._tests.FTPServer) with bco-mirror. Needs pyftpdlib.
+    """
+    def __init__(self):
+        print("==========================================")
+        print("||>>>Testing the mirror of the FTP-server ")
+        print("==========================================")
+
+        import io
+        import os
+        import shutil
+        import tempfile
+        import contextlib
+        from BCO.tools import mirror
+        from BCO._tests.FTPServer import LocalFTPServer
+
+        devices = ["WINDLIDAR", "CEILOMETER", "RADIATION"]
+        roots = mirror.getRoots(devices)
+        assert roots == ["/A_Cloud_base_heights/", "/K_Radiation/", "/L_Vertical_velocity/Version1.01/"]
+        assert mirror.getRoots(["CORAL"]) == ["/B_Reflectivity/Ka-Band/10s/"]  # cut before %Y%m/
+
+        folder = tempfile.mkdtemp(prefix="bco_test_")
+        try:
+            with LocalFTPServer() as server:
+                paths = server.populate(devices, dt(2018,3,1), dt(2018,3,2))
+                assert any(path.startswith("/K_Radiation/201803/") for path in paths)  # a level below the root
+
+                # a dry run only lists the files below the roots:
+                output = io.StringIO()
+                with contextlib.redirect_stdout(output):
+                    assert mirror.main([folder] + devices + ["--dry-run"]) == 0
+                listed = [line for line in output.getvalue().splitlines() if line.startswith("/")]
+                assert sorted(listed) == sorted(paths)
+                assert all(any(path.startswith(root) for root in roots) for path in listed)
+                assert os.listdir(folder) == [] and server.commands["RETR"] == 0
+
+                # the first run downloads the tree:
+                assert mirror.main([folder] + devices + ["-q"]) == 0
+                assert server.commands["RETR"] == len(paths)
+                for path in paths:
+                    local = os.path.join(folder, *path.strip("/").split("/"))
+                    with open(local, "rb") as f, open(os.path.join(server.root, *path.strip("/").split("/")),
+                                                      "rb") as g:
+                        assert f.read() == g.read()
+                assert os.path.isfile(os.path.join(folder, mirror.MANIFEST))
+
+                # a second run transfers nothing:
+                server.reset()
+                assert mirror.mirror(folder, devices, verbose=False) == []
+                assert server.bytes_sent == 0 and server.commands["RETR"] == 0
+
+                # only a changed file is transferred again:
+                changed = os.path.join(server.root, *paths[0].strip("/").split("/"))
+                with open(changed, "ab") as f:
+                    f.write(b"appended")
+                stat = os.stat(changed)
+                os.utime(changed, (stat.st_atime, stat.st_mtime + 10))
+                server.reset()
+                assert mirror.mirror(folder, devices, verbose=False) == [
+                    os.path.join(folder, *paths[0].strip("/").split("/"))]
+                assert server.bytes_sent == os.path.getsize(changed)
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+        print("=====================================")
+        print("||>>> test finished succesfully <<<||")
+        print("=====================================")
+
+
+class DecompressionTesting(object):
+    """
+    Compares BCO.tools.decompress.bz2Decompress() with bz2.decompress() for files with one and several streams.
+    """
+    def __init__(self):
+        print("==========================================")
+        print("||>>>Testing the parallel decompression   ")
+        print("==========================================")
+
+        import os
+        import bz2
+        import tempfile
+        from BCO.tools import decompress
+        from BCO.tools.decompress import bz2Decompress
+
+        rng = np.random.RandomState(0)
+        data = rng.normal(size=(400, 1000)).cumsum(axis=0).astype("f4").tobytes()  # 1.6 MB
+        streams = {"single": bz2.compress(data, 1),  # 100 kB blocks
+                   "multi": bz2.compress(data[:600000], 1) + bz2.compress(data[600000:], 9)}
+
+        for name, compressed in streams.items():
+            fd, path = tempfile.mkstemp(suffix=".bz2")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(compressed)
+                for workers in [1, 2, 4]:
+                    assert bz2Decompress(path, workers=workers) == bz2.decompress(compressed) == data, name
+            finally:
+                os.remove(path)
+
+        # the magic numbers are also found, if they cross the border of two search windows:
+        window = decompress._WINDOW
+        try:
+            for name, compressed in streams.items():
+                blocks = decompress._findBlocks(compressed)
+                assert len(blocks) > 2, name
+                for start, stop in blocks[:3] + blocks[-1:]:
+                    for border in [(start - 48) // 8 + 1, (start - 48) // 8 + 5, stop // 8 + 3]:
+                        decompress._WINDOW = border
+                        assert decompress._findBlocks(compressed) == blocks, (name, border)
+                    decompress._WINDOW = window
+        finally:
+            decompress._WINDOW = window
+
+        print("=====================================")
+        print("||>>> test finished succesfully <<<||")
+        print("=====================================")
+
+
+class CacheTesting(object):
+    """
+    Tests hits and evictions of BCO.tools.cache.FileCache.
+    """
+    def __init__(self):
+        print("==========================================")
+        print("||>>>Testing the cache of decompressed files")
+        print("==========================================")
+
+        import os
+        import bz2
+        import time
+        import shutil
+        import tempfile
+        from netCDF4 import Dataset
+        from BCO.tools.cache import FileCache
+        from BCO.tools.pool import DatasetPool
+
+        folder = tempfile.mkdtemp(prefix="bco_test_")
+        try:
+            files = []
+            for i in range(3):
+                path = os.path.join(folder, "file%i.nc" % i)
+                with Dataset(path, "w", format="NETCDF3_CLASSIC") as nc:
+                    nc.createDimension("time", 100)
+                    nc.createVariable("time", "f8", ("time",))[:] = np.arange(100.)
+                with open(path, "rb") as f, open(path + ".bz2", "wb") as g:
+                    g.write(bz2.compress(f.read()))
+                os.remove(path)
+                files.append(path + ".bz2")
+
+            cache = FileCache(os.path.join(folder, "cache"), maxsize=None)
+            copy = cache.get(files[0])
+            assert files[0] in cache
+            with Dataset(copy) as nc:
+                assert np.array_equal(nc.variables["time"][:], np.arange(100.))
+
+            # hits must not change the modification time, the DatasetPool would open the file again:
+            mtime = os.stat(copy).st_mtime_ns
+            pool = DatasetPool()
+            nc = pool.get(cache.get(files[0]))
+            assert cache.get(files[0]) == copy
+            assert os.stat(copy).st_mtime_ns == mtime
+            assert pool.get(cache.get(files[0])) is nc
+            pool.close()
+            del nc, pool, mtime
+
+            # the least recently used copy is evicted:
+            time.sleep(0.01)
+            cache.get(files[1])
+            time.sleep(0.01)
+            cache.get(files[0])  # hit, now more recent than files[1]
+            time.sleep(0.01)
+            cache.maxsize = 2 * os.path.getsize(copy)
+            cache.get(files[2])
+            assert files[0] in cache and files[2] in cache
+            assert files[1] not in cache
+            assert cache.size() == 2 * os.path.getsize(copy)
+
+            cache.clear()
+            assert cache.size() == 0
+            del cache, copy
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+        print("=====================================")
+        print("||>>> test finished succesfully <<<||")
+        print("=====================================")
+
+
+class StoreTesting(object):
+    """
+    Builds a store of synthetic CORAL files and compares the data read through the store with the files.
+    """
+    def __init__(self):
+        print("==========================================")
+        print("||>>>Testing the archive store            ")
+        print("==========================================")
+
+        import os
+        import shutil
+        import tempfile
+        import BCO
+        from BCO.Instruments import Radar
+        from BCO.tools.store import buildStore
+        from BCO._tests.FTPServer import _writeFile
+
+        folder = tempfile.mkdtemp(prefix="bco_test_")
+        settings = (BCO.USE_FTP_ACCESS, BCO.CATALOG, BCO.CACHE, BCO.config["CORAL"]["PATH"])
+        try:
+            BCO.USE_FTP_ACCESS, BCO.CATALOG, BCO.CACHE = False, None, None
+            BCO.config["CORAL"]["PATH"] = folder + "/"
+            os.makedirs(os.path.join(folder, "Version_2"))
+            for date in [dt(2018,3,1), dt(2018,3,2)]:
+                name = date.strftime(BCO.config["CORAL"]["NAME_SCHEME"]).replace("*", "")
+                _writeFile(os.path.join(folder, "Version_2", name), "CORAL", date)
+
+            # only some variables, the constructor still needs lat, lon, azi, ...:
+            buildStore(Radar(dt(2018,3,1), dt(2018,3,2,23,59)), os.path.join(folder, "store"),
+                       values=["Zf", "VEL"], verbose=False)
+
+            start, end = dt(2018,3,1,6), dt(2018,3,2,12)
+            radar = Radar(start, end)
+            stored = Radar(start, end, store=os.path.join(folder, "store"))
+            assert stored.lat == radar.lat
+            val1, val2 = radar.getVariables(["Zf", "VEL", "range"]), stored.getVariables(["Zf", "VEL", "range"])
+            for value in val1:
+                assert np.ma.allequal(val1[value], val2[value])
+                assert np.array_equal(np.ma.getmaskarray(val1[value]), np.ma.getmaskarray(val2[value]))
+            del val2
+
+            # with several workers, the options which need a copy are filled from the store:
+            for executor in ["thread", "process"]:
+                stored = Radar(start, end, store=os.path.join(folder, "store"), workers=2, executor=executor)
+                val2 = stored.getVariables(["VEL"], dtype=np.float64)["VEL"]
+                assert val2.dtype == np.float64
+                assert np.ma.allequal(val2, val1["VEL"])
+                assert np.array_equal(np.ma.getmaskarray(val2), np.ma.getmaskarray(val1["VEL"]))
+                val2 = stored.getVariables(["VEL"], fill="nan")["VEL"]
+                assert np.array_equal(np.isnan(val2), np.ma.getmaskarray(val1["VEL"]))
+                assert np.array_equal(val2[~np.isnan(val2)], val1["VEL"].compressed())
+                out = {"VEL": np.ma.zeros(val1["VEL"].shape, dtype=val1["VEL"].dtype)}
+                val2 = stored.getVariables(["VEL"], out=out)["VEL"]
+                assert val2 is out["VEL"]
+                assert np.ma.allequal(val2, val1["VEL"])
+                stored.close()
+            radar.close()
+            del radar, stored, val1, val2, out
+        finally:
+            BCO.USE_FTP_ACCESS, BCO.CATALOG, BCO.CACHE, BCO.config["CORAL"]["PATH"] = settings
+            shutil.rmtree(folder, ignore_errors=True)
+
+        print("=====================================")
+        print("||>>> test finished succesfully <<<||")
+        print("=====================================")
+
+
+class CatalogTesting(object):
+    """
+    Scans a temporary archive with a monthly instrument (Ceilometer) and a PATH with strftime-directives (CORAL)
+    and compares the catalog with the files.
+    """
+    def __init__(self):
+        print("==========================================")
+        print("||>>>Testing the archive catalog          ")
+        print("==========================================")
+
+        import os
+        import shutil
+        import calendar
+        import datetime
+        import tempfile
+        from concurrent.futures import ThreadPoolExecutor
+        import BCO
+        from BCO.Instruments import Radar
+        from BCO.tools.catalog import Catalog
+        from BCO._tests.FTPServer import _writeFile
+
+        folder = tempfile.mkdtemp(prefix="bco_test_")
+        settings = (BCO.USE_FTP_ACCESS, BCO.CATALOG, BCO.CACHE,
+                    BCO.config["CORAL"]["PATH"], BCO.config["CEILOMETER"]["PATH"])
+        catalog = None
+        try:
+            BCO.USE_FTP_ACCESS, BCO.CATALOG, BCO.CACHE = False, None, None
+            BCO.config["CORAL"]["PATH"] = folder + "/coral/%Y%m/"
+            BCO.config["CEILOMETER"]["PATH"] = folder + "/ceilo/"
+
+            coral = {}
+            for date, version in [(dt(2018,3,1), "Version_2"), (dt(2018,3,2), "Version_2"),
+                                  (dt(2018,4,1), "Version_2"), (dt(2018,3,1), "Version_1")]:
+                path = os.path.join(folder, "coral", date.strftime("%Y%m"), version)
+                if not os.path.isdir(path):
+                    os.makedirs(path)
+                name = date.strftime(BCO.config["CORAL"]["NAME_SCHEME"]).replace("*", "")
+                coral[date, version] = os.path.join(path, name)
+                _writeFile(coral[date, version], "CORAL", date)
+            # matches the glob-pattern, but not the date of the NAME_SCHEME:
+            open(os.path.join(folder, "coral", "201803", "Version_2", "MMCR__MBR__Spectral_Moments_old.nc"),
+                 "w").close()
+            os.makedirs(os.path.join(folder, "ceilo"))
+            ceilo = os.path.join(folder, "ceilo", dt(2018,3,1).strftime(BCO.config["CEILOMETER"]["NAME_SCHEME"]))
+            _writeFile(ceilo, "CEILOMETER", dt(2018,3,1))
+
+            # the patterns:
+            pattern, regex = Catalog._getPatterns("CORAL")
+            assert pattern == folder + "/coral/**/Version_*/MMCR__MBR*__Spectral_Moments****.nc"
+            match = regex.match(coral[dt(2018,4,1), "Version_2"])
+            assert Catalog._getDate(match) == datetime.date(2018,4,1)
+            assert Catalog._getVersion(match) == "Version_2/"
+            assert regex.match(folder + "/coral/201803/Version_2/MMCR__MBR__Spectral_Moments_old.nc") is None
+            pattern, regex = Catalog._getPatterns("CEILOMETER")
+            assert pattern == folder + "/ceilo/CEILO__*__**.nc"
+            match = regex.match(ceilo)
+            assert Catalog._getDate(match) == datetime.date(2018,3,1)
+            assert Catalog._getVersion(match) == "None"
+
+            # scanning, only new or changed files are read again:
+            catalog = Catalog(os.path.join(folder, "catalog.sqlite"))
+            assert catalog.scan(["CORAL", "CEILOMETER"], verbose=False) == 5
+            assert catalog.scan(["CORAL", "CEILOMETER"], verbose=False) == 0
+            stat = os.stat(coral[dt(2018,3,2), "Version_2"])
+            os.utime(coral[dt(2018,3,2), "Version_2"], (stat.st_atime, stat.st_mtime + 10))
+            assert catalog.scan("CORAL", verbose=False) == 1
+
+            # the lookup of daily and monthly files:
+            assert catalog.lookup("CORAL", dt(2018,3,2,12)) == coral[dt(2018,3,2), "Version_2"]
+            assert catalog.lookup("CORAL", datetime.date(2018,4,1)) == coral[dt(2018,4,1), "Version_2"]
+            assert catalog.lookup("CORAL", dt(2018,3,1), "Version_1/") == coral[dt(2018,3,1), "Version_1"]
+            assert catalog.lookup("CORAL", dt(2018,3,3)) is None
+            for day in [1, 17, 31]:
+                assert catalog.lookup("CEILOMETER", dt(2018,3,day)) == ceilo
+            assert catalog.lookup("CEILOMETER", dt(2018,4,1)) is None
+
+            # the entries of a timeframe with their coverage:
+            entries = catalog.files("CORAL", dt(2018,3,1), dt(2018,3,31))
+            assert [entry[:2] for entry in entries] == [("2018-03-01", coral[dt(2018,3,1), "Version_2"]),
+                                                        ("2018-03-02", coral[dt(2018,3,2), "Version_2"])]
+            for date, entry in zip([dt(2018,3,1), dt(2018,3,2)], entries):
+                assert entry[4] == calendar.timegm(date.timetuple())
+                assert entry[5] == calendar.timegm(date.timetuple()) + 86400 - 10
+                assert entry[6] == 8640
+            entries = catalog.files("CEILOMETER", dt(2018,3,1), dt(2018,3,31))
+            assert len(entries) == 1 and entries[0][1] == ceilo and entries[0][6] == 31 * 86400 // 15
+
+            # the connection is shared between threads:
+            dates = [dt(2018,3,1 + i % 2) for i in range(400)]
+            with ThreadPoolExecutor(8) as executor:
+                paths = list(executor.map(lambda date: catalog.lookup("CORAL", date), dates))
+            assert paths == [coral[date, "Version_2"] for date in dates]
+
+            # the instruments find their files through the catalog, although the PATH contains "%Y%m":
+            BCO.CATALOG = catalog
+            radar = Radar(dt(2018,3,1,12), dt(2018,3,2,12))
+            assert len(radar.getTime()) == 8640
+            radar.close()
+
+            # removed files are removed from the catalog:
+            os.remove(coral[dt(2018,4,1), "Version_2"])
+            assert catalog.scan("CORAL", verbose=False) == 0
+            assert catalog.lookup("CORAL", dt(2018,4,1)) is None
+        finally:
+            BCO.USE_FTP_ACCESS, BCO.CATALOG, BCO.CACHE, \
+                BCO.config["CORAL"]["PATH"], BCO.config["CEILOMETER"]["PATH"] = settings
+            if catalog is not None:
+                catalog.close()
+            shutil.rmtree(folder, ignore_errors=True)
+
+        print("=====================================")
+        print("||>>> test finished succesfully <<<||")
+        print("=====================================")
+
+
+class LazyTesting(object):
+    """
+    Compares the slices of a LazyArray with the same slices of the data read at once.
+    """
+    def __init__(self):
+        print("==========================================")
+        print("||>>>Testing the lazy arrays              ")
+        print("==========================================")
+
+        from BCO.Instruments import Radar
+
+        with _localArchive(["CORAL"], dt(2018,3,1), dt(2018,3,2)):
+            radar = Radar(dt(2018,3,1,6), dt(2018,3,2,12))
+            for height, gates in [(None, None), (None, slice(5, 40, 3)), ((300, 900), None)]:
+                lazy = radar.getReflectivity(lazy=True, height=height, gates=gates)
+                eager = radar.getReflectivity(height=height, gates=gates)
+                assert lazy.shape == eager.shape and len(lazy) == len(eager)
+                n = len(eager)
+                _assertSame(np.ma.asarray(lazy[:]), eager)
+
+                # 6480 timesteps are in the first file:
+                keys = [slice(None), slice(100, 200), slice(6000, 7000), slice(6000, 7000, 7), slice(-50, None),
+                        slice(None, None, -1), slice(7000, 6000, -3), slice(n + 10, n + 20), slice(20, 10),
+                        6479, 6480, -1, 0, Ellipsis,
+                        [5, 6479, 6480, -1, 0], [7000, 3, 7000, 10], np.array([], dtype=int),
+                        np.arange(n) % 3 == 0, np.zeros(n, dtype=bool),
+                        (slice(10, 20), 3), (slice(6470, 6490), slice(2, None, 4)), (slice(10, 20), [1, 4]),
+                        (Ellipsis, 0), ([6481, 2], slice(None, None, -2)), (slice(6470, 6490, -1), -1)]
+                for key in keys:
+                    _assertSame(lazy[key], eager[key])
+
+                for key in [n, -n - 1, [0, n], [-n - 1, 3], np.ones(n + 1, dtype=bool)]:
+                    try:
+                        lazy[key]
+                    except IndexError:
+                        pass
+                    else:
+                        raise AssertionError("no IndexError for %s" % str(key))
+            radar.close()
+
+        print("=====================================")
+        print("||>>> test finished succesfully <<<||")
+        print("=====================================")
+
+
+class ChunkTesting(object):
+    """
+    Compares the blocks of iterChunks() with the data read at once, also when the open files are closed while the
+    iteration waits at a yield.
+    """
+    def __init__(self):
+        print("==========================================")
+        print("||>>>Testing iterChunks()                 ")
+        print("==========================================")
+
+        from BCO.Instruments import Radar
+
+        with _localArchive(["CORAL"], dt(2018,3,1), dt(2018,3,3)):
+            radar = Radar(dt(2018,3,1,6,30), dt(2018,3,3,12))
+            time = radar.getTime(kind="epoch")
+            data = radar.getVariables(["Zf"], gates=slice(2, 30))["Zf"]
+            for chunk, seconds in [(None, None), ("1h", 3600), ("1d", 86400)]:
+                for evict in [False, True]:
+                    times, blocks = [], []
+                    for _time, block in radar.iterChunks("Zf", chunk=chunk, gates=slice(2, 30)):
+                        assert len(_time) == len(block)
+                        times.append(_time)
+                        blocks.append(block)
+                        if evict:
+                            radar._pool.close()  # as if other files pushed these out of the pool
+                    _assertSame(np.ma.concatenate(blocks), data)
+                    assert np.array_equal(np.concatenate(times), radar.getTime())
+
+                    # one block per file or per full hour or day:
+                    edges = np.cumsum([len(block) for block in blocks])[:-1]
+                    if seconds is None:
+                        assert len(blocks) == 3
+                    else:
+                        bins = np.split(np.floor_divide(time, seconds), edges)
+                        assert all(np.all(_bins == _bins[0]) for _bins in bins)
+                        assert len(blocks) == len(np.unique(np.floor_divide(time, seconds)))
+            radar.close()
+
+        print("=====================================")
+        print("||>>> test finished succesfully <<<||")
+        print("=====================================")
+
+
+class GateTesting(object):
+    """
+    Compares reads of some range-gates (getGates(), height= and gates=) with the same columns of the full read.
+    """
+    def __init__(self):
+        print("==========================================")
+        print("||>>>Testing the reads of range-gates     ")
+        print("==========================================")
+
+        from BCO.Instruments import Radar
+
+        with _localArchive(["CORAL"], dt(2018,3,1), dt(2018,3,2)):
+            radar = Radar(dt(2018,3,1,18), dt(2018,3,2,6))
+            _range = radar.getRange()
+            full = radar.getReflectivity()
+            assert len(_range) == full.shape[1] == 50
+
+            # the synthetic range-gates are at 155 m, 185 m, ..., 1625 m:
+            for height, columns in [((300, 900), slice(5, 25)), ((185, 215), slice(1, 3)), ((0, 1e5), slice(0, 50)),
+                                    ((-100, 155), slice(0, 1)), ((1625, 1e5), slice(49, 50)),
+                                    ((2000, 3000), slice(0, 0)), ((-500, 100), slice(0, 0)), ((160, 170), slice(0, 0))]:
+                gates = radar.getGates(height=height)
+                assert np.array_equal(np.arange(50)[gates], np.arange(50)[columns]), height
+                _assertSame(radar.getRange(height=height), _range[columns])
+                _assertSame(radar.getReflectivity(height=height), full[:, columns])
+                _assertSame(radar.getVariables(["Zf"], gates=gates)["Zf"], full[:, columns])
+            assert radar.getGates(gates=slice(3, 7)) == slice(3, 7)
+            assert radar.getGates() is None
+
+            # gates as slices with steps and as indices:
+            for gates in [slice(3, 30, 4), slice(None, 10), slice(40, None), slice(-5, None), [0, 7, 8, 49],
+                          np.arange(10, 20), np.array([2])]:
+                _assertSame(radar.getRange(gates=gates), _range[gates])
+                _assertSame(radar.getReflectivity(gates=gates), full[:, gates])
+                _assertSame(radar.getVelocity(gates=gates), radar.getVelocity()[:, gates])
+            _assertSame(radar.getReflectivity(gates=slice(5, 9)), radar.getReflectivity(gates=[5, 6, 7, 8]))
+            radar.close()
+
+        print("=====================================")
+        print("||>>> test finished succesfully <<<||")
+        print("=====================================")
+
+
+class ParallelTesting(object):
+    """
+    Compares the files read in parallel (workers=4) by threads and by processes with the files read one after the
+    other (workers=1).
+    """
+    def __init__(self):
+        print("==========================================")
+        print("||>>>Testing the parallel reads           ")
+        print("==========================================")
+
+        from BCO.Instruments import Radar, Windlidar
+
+        with _localArchive(["CORAL"], dt(2018,3,1), dt(2018,3,5)), \
+                _localArchive(["WINDLIDAR"], dt(2018,3,2), dt(2018,3,3)):  # .nc.bz2
+            for Device, values, start, end in [(Radar, ["Zf", "VEL", "MeltHei"], dt(2018,3,1,12), dt(2018,3,5,12)),
+                                               (Windlidar, ["dv", "beta"], dt(2018,3,2,20), dt(2018,3,3,4))]:
+                serial = Device(start, end)
+                for fill in ["mask", "nan"]:
+                    for gates in [None, slice(4, 40, 3)]:
+                        expected = serial.getVariables(values, gates=gates, fill=fill)
+                        for executor in ["thread", "process"]:
+                            parallel = Device(start, end, workers=4, executor=executor)
+                            val = parallel.getVariables(values, gates=gates, fill=fill)
+                            for value in values:
+                                assert val[value].dtype == expected[value].dtype
+                                if fill == "nan":
+                                    assert not np.ma.isMaskedArray(val[value])
+                                    assert np.array_equal(val[value], expected[value], equal_nan=True)
+                                else:
+                                    _assertSame(val[value], expected[value])
+                            parallel.close()
+                            del parallel, val
+                        del expected
+                serial.close()
+                del serial
+
+        print("=====================================")
+        print("||>>> test finished succesfully <<<||")
+        print("=====================================")
+
+
+class PrefetchTesting(object):
+    """
+    Compares the reads with files prepared in the background (prefetch=2) with the reads without (prefetch=0) and
+    checks that the errors of the background reach the caller.
+    """
+    def __init__(self):
+        print("==========================================")
+        print("||>>>Testing the prefetching              ")
+        print("==========================================")
+
+        import threading
+        from BCO.tools import tools
+        from BCO.Instruments import Radar
+
+        # tools.prefetch() yields every item in order, also if function or fetch fail for some of them:
+        calls, lock = [], threading.Lock()
+
+        def _fetch(item):
+            with lock:
+                calls.append(("fetch", item))
+            if item == 2:
+                raise ValueError("fetch %i" % item)
+
+        def _function(item):
+            with lock:
+                calls.append(("function", item))
+            if item == 4:
+                raise KeyError("function %i" % item)
+
+        for depth in [0, 1, 2, 10]:
+            del calls[:]
+            assert list(tools.prefetch(_function, range(6), depth, fetch=_fetch)) == list(range(6))
+            if depth:
+                assert sorted(calls) == sorted([("fetch", i) for i in range(6)] + [("function", i) for i in range(6)])
+                assert [item for kind, item in calls if kind == "function"] == list(range(6))  # in order
+            else:
+                assert calls == []
+        del calls
+
+        with _localArchive(["CORAL"], dt(2018,3,1), dt(2018,3,6)):
+            with open(tools.getFileName("CORAL", dt(2018,3,4), use_ftp=False), "wb") as f:
+                f.write(b"broken")  # a day which can not be read
+            start, end = dt(2018,3,1,12), dt(2018,3,6,12)
+            serial = Radar(start, end)
+            expected = serial.getVariables(["Zf", "VEL"], gates=slice(0, 20))
+            assert [_date.day for _date in serial.skipped] == [4]
+
+            prefetched = Radar(start, end, prefetch=2)
+            val = prefetched.getVariables(["Zf", "VEL"], gates=slice(0, 20))
+            assert prefetched.skipped == serial.skipped
+            for value in expected:
+                _assertSame(val[value], expected[value])
+            assert np.array_equal(prefetched.getTime(), serial.getTime())
+            for (time1, block1), (time2, block2) in zip(prefetched.iterChunks("Zf", chunk="6h"),
+                                                        serial.iterChunks("Zf", chunk="6h")):
+                assert np.array_equal(time1, time2)
+                _assertSame(block1, block2)
+            prefetched.close()
+            serial.close()
+            del serial, prefetched, val
+
+            # an error in the background is raised again, when the caller reaches the file:
+            for persistent in [True, False]:
+                radar = Radar(start, end, prefetch=2)
+                getFile, failed = radar._getFile, []
+
+                def _getFile(date, getFile=getFile, failed=failed, persistent=persistent):
+                    if date.day == 3 and (persistent or not failed):
+                        failed.append(threading.current_thread().name)
+                        raise RuntimeError("no access to %s" % date)
+                    return getFile(date)
+
+                radar._getFile = _getFile
+                try:
+                    val = radar.getVariables(["Zf", "VEL"], gates=slice(0, 20))
+                except RuntimeError as error:
+                    assert persistent and "no access" in str(error)
+                else:
+                    assert not persistent  # the caller opens the file again after a failure in the background
+                    for value in expected:
+                        _assertSame(val[value], expected[value])
+                assert failed[0] != threading.current_thread().name  # the first try was in the background
+                radar.close()
+                del radar, getFile, failed
+            del expected
+
+        print("=====================================")
+        print("||>>> test finished succesfully <<<||")
+        print("=====================================")
+
+
+class TimeTesting(object):
+    """
+    Compares the timeframes found by bisection (_searchTime(), _getStartEnd()) with a linear mask over all
+    time-stamps of the files.
+    """
+    def __init__(self):
+        print("==========================================")
+        print("||>>>Testing the search of the timeframe  ")
+        print("==========================================")
+
+        import calendar
+        from BCO.tools import convert
+        from BCO.Instruments import Radar, Ceilometer
+        from BCO.Instruments.Device_module import _searchTime
+
+        def _linear(time, value):
+            later = np.flatnonzero(time >= value)
+            return int(later[0]) if len(later) else len(time)
+
+        # sorted time-stamps (with repeated ones) by bisection, unsorted ones one by one:
+        rng = np.random.RandomState(0)
+        time = np.sort(rng.randint(0, 1000, 500)).astype(np.float64)
+        for value in np.append(rng.uniform(-10, 1010, 100), [time[0], time[17], time[-1], -1e9, 1e9]):
+            assert _searchTime(time, value) == _searchTime(time, value, ordered=False) == _linear(time, value)
+        shuffled = rng.permutation(time)
+        for value in [time[0], time[17], 500.5, 1e9]:
+            assert _searchTime(shuffled, value, ordered=False) == _linear(shuffled, value)
+
+        def _check(device):
+            start, end = device._getTimeBounds()
+            plan = device._getReadPlan()
+            assert [_date for _date, _start, _end in plan] == list(device._getDates())
+            time = np.concatenate([device._getTimeAxis(_date, device._getNc(_date))[0] for _date in
+                                   sorted(set(_date for _date, _start, _end in plan))])
+            mask = time >= start
+            if end is not None:
+                mask &= time < end
+            assert np.array_equal(device.getTime(kind="epoch"), time[mask])
+            device.close()
+            return time[mask]
+
+        def _count(start, end):  # number of time-stamps of the radar (every 10 s) in [start, end)
+            start, end = convert.time2num(start, utc=True), convert.time2num(end, utc=True)
+            return int(np.ceil(end / 10.) - np.ceil(start / 10.))
+
+        with _localArchive(["CORAL"], dt(2018,3,1), dt(2018,3,3)), \
+                _localArchive(["CEILOMETER"], dt(2018,2,1), dt(2018,3,1)):
+            for start, end in [(dt(2018,3,1,6,0,5), dt(2018,3,2,12,0,5)),  # inside of a file, between time-stamps
+                               (dt(2018,3,1,6), dt(2018,3,2,12)),  # exactly on a time-stamp
+                               (dt(2018,3,2,6,0,3), dt(2018,3,2,6,30)),  # in the same file
+                               (dt(2018,3,2,6), dt(2018,3,2,6,0,10))]:  # a single time-stamp
+                time = _check(Radar(start, end))
+                assert len(time) == _count(start, end)
+                assert time[0] >= convert.time2num(start, utc=True) > time[0] - 10
+                assert time[-1] < convert.time2num(end, utc=True) <= time[-1] + 10
+
+            # an end at midnight includes the whole day of the end:
+            radar = Radar(dt(2018,3,1,22), dt(2018,3,3))
+            assert radar._getTimeBounds()[1] is None
+            time = _check(radar)
+            assert time[0] == convert.time2num(dt(2018,3,1,22), utc=True)
+            assert time[-1] == calendar.timegm(dt(2018,3,3,23,59,50).timetuple())  # the last one of the file
+
+            # the monthly files of the Ceilometer, also over the turn of the month:
+            for start, end in [(dt(2018,2,10,6), dt(2018,2,20,12)), (dt(2018,2,27,6,0,7), dt(2018,3,2,12)),
+                               (dt(2018,3,1), dt(2018,3,1))]:
+                _check(Ceilometer(start, end))
+
         print("=====================================")
         print("||>>> test finished succesfully <<<||")
         print("=====================================")
 
+
+class ClassicTesting(object):
+    """
+    Compares BCO.tools.classic.ClassicDataset with netCDF4.Dataset on CDF-1, CDF-2 and CDF-5 files with record,
+    packed and char variables.
+    """
+    def __init__(self):
+        print("==========================================")
+        print("||>>>Testing the netCDF-3 reader          ")
+        print("==========================================")
+
+        import os
+        import shutil
+        import tempfile
+        from netCDF4 import Dataset
+        from BCO.tools.classic import ClassicDataset, isClassic
+
+        folder = tempfile.mkdtemp(prefix="bco_test_")
+        try:
+            for format in ["NETCDF3_CLASSIC", "NETCDF3_64BIT_OFFSET", "NETCDF3_64BIT_DATA"]:
+                path = os.path.join(folder, format + ".nc")
+                self.__createFile(path, format)
+                assert isClassic(path)
+
+                nc, classic = Dataset(path), ClassicDataset(path)
+                try:
+                    assert sorted(classic.ncattrs()) == sorted(nc.ncattrs())
+                    assert classic.title == nc.title
+                    assert sorted(classic.variables) == sorted(nc.variables)
+                    for value in nc.variables:
+                        for index in [slice(None), slice(3, 17), slice(-5, None)]:
+                            if nc.variables[value].ndim == 0 and index != slice(None):
+                                continue
+                            val1, val2 = nc.variables[value][index], classic.variables[value][index]
+                            mask = np.ma.getmaskarray(val1)
+                            assert np.array_equal(mask, np.ma.getmaskarray(val2)), (format, value)
+                            assert np.array_equal(np.asarray(np.ma.getdata(val1))[~mask],
+                                                  np.asarray(np.ma.getdata(val2))[~mask]), (format, value)
+                        assert classic.variables[value].dimensions == nc.variables[value].dimensions
+                    del val1, val2, mask
+                finally:
+                    nc.close()
+                    classic.close()
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+        print("=====================================")
+        print("||>>> test finished succesfully <<<||")
+        print("=====================================")
+
+    @staticmethod
+    def __createFile(path, format):
+        from netCDF4 import Dataset
+
+        rng = np.random.RandomState(0)
+        nc = Dataset(path, "w", format=format)
+        try:
+            nc.title = "classic test"
+            nc.createDimension("time", None)
+            nc.createDimension("range", 7)
+            nc.createDimension("string", 5)
+            nc.createVariable("time", "f8", ("time",))[:] = np.arange(40) * 10.
+            nc.createVariable("range", "f4", ("range",))[:] = np.arange(7) * 30.
+
+            data = rng.normal(size=(40, 7)).astype("f4")
+            data[::6, 2] = -999.
+            nc.createVariable("Zf", "f4", ("time", "range"), fill_value=-999.)[:] = data
+
+            packed = nc.createVariable("LWC", "i2", ("time", "range"), fill_value=-32767)
+            packed.scale_factor = 0.01
+            packed.add_offset = 5.
+            packed[:] = np.ma.masked_less(rng.uniform(-1, 10, size=(40, 7)), 0)
+
+            flags = nc.createVariable("flag", "i1", ("time",))  # padded records
+            flags.missing_value = np.int8(-1)
+            flags[:] = np.arange(40) % 3 - 1
+
+            names = nc.createVariable("name", "S1", ("time", "string"))
+            names[:] = np.array([list(("r%03i" % i).ljust(5)) for i in range(40)], dtype="S1")
+
+            nc.createVariable("lat", "f4")[:] = 13.16
+        finally:
+            nc.close()
@@ -1,2 +1,5 @@
 from .Classtests import ClassTesting
-from .Functiontests import ConverterTesting
\ No newline at end of file
+from .Functiontests import ConverterTesting, FTPTesting, MirrorTesting
+from .Functiontests import DecompressionTesting, CacheTesting, StoreTesting, CatalogTesting, LazyTesting, ChunkTesting, ClassicTesting
+from .Functiontests import GateTesting, ParallelTesting, PrefetchTesting, TimeTesting
+from .Benchmarks import DecompressionBenchmark, FTPBenchmark
@@ -18,7 +18,9 @@ if not on_local_machine:
 
 
 print("Importing Modules...")
-from BCO._tests import ClassTesting, ConverterTesting
+from BCO._tests import ClassTesting, ConverterTesting, FTPTesting, MirrorTesting
+from BCO._tests import DecompressionTesting, CacheTesting, StoreTesting, CatalogTesting, LazyTesting, ChunkTesting, ClassicTesting
+from BCO._tests import GateTesting, ParallelTesting, PrefetchTesting, TimeTesting
 from datetime import datetime as dt
 
 
@@ -31,6 +33,50 @@ clstst.testEverything()
 print("Running ConverterTesting()...")
 ConverterTesting()
 
+try:
+    import pyftpdlib
+except ImportError:
+    print("Skipping FTPTesting() and MirrorTesting(), pyftpdlib is not installed.")
+else:
+    print("Running FTPTesting()...")
+    FTPTesting()
+
+    print("Running MirrorTesting()...")
+    MirrorTesting()
+
+print("Running DecompressionTesting()...")
+DecompressionTesting()
+
+print("Running CacheTesting()...")
+CacheTesting()
+
+print("Running StoreTesting()...")
+StoreTesting()
+
+print("Running CatalogTesting()...")
+CatalogTesting()
+
+print("Running LazyTesting()...")
+LazyTesting()
+
+print("Running ChunkTesting()...")
+ChunkTesting()
+
+print("Running GateTesting()...")
+GateTesting()
+
+print("Running ParallelTesting()...")
+ParallelTesting()
+
+print("Running PrefetchTesting()...")
+PrefetchTesting()
+
+print("Running TimeTesting()...")
+TimeTesting()
+
+print("Running ClassicTesting()...")
+ClassicTesting()
+
 print("===========================================")
 print("$>>> Script runAll.py finished <<<$")
 print("===========================================")
\ No newline at end of file
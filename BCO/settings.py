@@ -71,6 +71,106 @@ def path_to_ftp_file(file_path,verbose=True):
     if verbose:
         print("Successfully loaded username and password")
 
+def set_catalog(catalog):
+    """
+    Sets the archive catalog which will be used for finding the files inside the mpi-network.
+    Instead of searching the filesystem for every day, the files are then looked up in the catalog.
+
+    Args:
+        catalog: BCO.tools.catalog.Catalog instance or path to the catalog file. None disables the catalog.
+
+    Example:
+        >>> from BCO import settings
+        >>> settings.set_catalog("/home/wherever/bco_catalog.sqlite")
+    """
+    if catalog is not None and not hasattr(catalog, "lookup"):
+        from BCO.tools.catalog import Catalog
+        catalog = Catalog(catalog)
+
+    BCO.CATALOG = catalog
+
+
+def set_cache(cache, maxsize=20e9):
+    """
+    Sets the cache for decompressed copies of the .nc.bz2 files. With a cache, every file only needs to be
+    decompressed once, even across several scripts or sessions.
+
+    Args:
+        cache: BCO.tools.cache.FileCache instance or the directory of the cache. None disables the cache.
+        maxsize: Maximum size of the cache in bytes, if a directory is given. Default is 20 GB.
+
+    Example:
+        >>> from BCO import settings
+        >>> settings.set_cache("/scratch/wherever/bco_cache")
+    """
+    if cache is not None and not hasattr(cache, "get"):
+        from BCO.tools.cache import FileCache
+        cache = FileCache(cache, maxsize=maxsize)
+
+    BCO.CACHE = cache
+
+
+def set_ftp_pool(pool):
+    """
+    Sets the pool of FTP-connections, which is shared by all file lookups and downloads of the process. By default
+    a pool of at most 4 connections is used. The connections of the old pool are closed.
+
+    Args:
+        pool: BCO.tools.pool.FTPPool instance or the maximum number of connections.
+
+    Example:
+        >>> from BCO import settings
+        >>> settings.set_ftp_pool(8)
+    """
+    if not hasattr(pool, "connection"):
+        from BCO.tools.pool import FTPPool
+        pool = FTPPool(maxsize=int(pool))
+
+    if BCO.FTP_POOL is not None and BCO.FTP_POOL is not pool:
+        BCO.FTP_POOL.close()
+    BCO.FTP_POOL = pool
+
+
+def set_ftp_listings(listings):
+    """
+    Sets the cache of the directory listings of the FTP-server. By default the listings are kept for 5 minutes.
+
+    Args:
+        listings: BCO.tools.listing.ListingCache instance or the number of seconds the listings are kept.
+
+    Example:
+        Finding files which were just uploaded to the server:
+
+        >>> from BCO import settings
+        >>> settings.set_ftp_listings(0)
+    """
+    if not hasattr(listings, "match"):
+        from BCO.tools.listing import ListingCache
+        listings = ListingCache(ttl=listings)
+
+    BCO.FTP_LISTINGS = listings
+
+
+def set_download_cache(cache, maxsize=20e9):
+    """
+    Sets the cache of the files downloaded from the FTP-server. By default they are kept in "~/.bco_downloads" up
+    to 20 GB. Processes which use the same directory share the downloads.
+
+    Args:
+        cache: BCO.tools.download.DownloadCache instance or the directory of the cache.
+        maxsize: Maximum size of the cache in bytes, if a directory is given. Default is 20 GB.
+
+    Example:
+        >>> from BCO import settings
+        >>> settings.set_download_cache("/scratch/wherever/bco_downloads", maxsize=50e9)
+    """
+    if not hasattr(cache, "fetch"):
+        from BCO.tools.download import DownloadCache
+        cache = DownloadCache(cache, maxsize=maxsize)
+
+    BCO.DOWNLOAD_CACHE = cache
+
+
 def setConfig(device,parameter,new_parameter_value):
 
     BCO.config[device][parameter] = new_parameter_value
\ No newline at end of file
@@ -1,3 +1,14 @@
 from BCO.tools import tools
+from BCO.tools import tzconvert
 from BCO.tools import convert
+from BCO.tools import catalog
+from BCO.tools import pool
+from BCO.tools import listing
+from BCO.tools import download
+from BCO.tools import mirror
+from BCO.tools import lazy
+from BCO.tools import decompress
+from BCO.tools import cache
+from BCO.tools import store
+from BCO.tools import classic
 from BCO import USE_FTP_ACCESS
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""
+This module contains a persistent cache for decompressed copies of the .nc.bz2 files, so they only need to be
+decompressed once.
+
+>>> from BCO.tools.cache import FileCache
+
+"""
+
+import os
+import time
+import hashlib
+import tempfile
+
+__all__ = [
+    'FileCache'
+]
+
+_ENCODINGS = ["raw", "zlib", "none"]
+
+
+class FileCache(object):
+    """
+    Directory with decompressed copies of compressed netCDF files. The first time a file is requested, it is
+    decompressed and stored in the cache. Afterwards the copy is used until the original file changes (the copies
+    are identified by path, size and modification time of the original).
+
+    The copies can be stored as they are ("raw") or re-encoded into netCDF4 files, which are faster to read
+    in small pieces: "zlib" stores the variables with chunks and light zlib-compression, "none" stores them
+    uncompressed.
+
+    If the cache grows larger than maxsize, the least recently used copies are removed. Several processes can use
+    the same cache at the same time, as copies are written to a temporary file first and then renamed.
+
+    Args:
+        directory: String: Directory of the cache. Default is "~/.bco_cache".
+        maxsize: Maximum size of the cache in bytes. Default is 20 GB. None means unlimited.
+        encoding: String: "raw", "zlib" or "none". Default is "raw".
+
+    Example:
+        Using a cache of at most 5 GB for all instruments:
+
+        >>> from BCO.tools.cache import FileCache
+        >>> from BCO import settings
+        >>> settings.set_cache(FileCache("/scratch/bco_cache", maxsize=5e9))
+
+        Or directly:
+
+        >>> cache = FileCache()
+        >>> nc = Dataset(cache.get("windlidar_testfile.nc.bz2"))
+    """
+
+    def __init__(self, directory=None, maxsize=20e9, encoding="raw"):
+        if directory is None:
+            directory = os.path.join(os.path.expanduser("~"), ".bco_cache")
+        if encoding not in _ENCODINGS:
+            raise ValueError("encoding needs to be one of %s, not %s." % (_ENCODINGS, encoding))
+
+        self.directory = directory
+        self.maxsize = maxsize
+        self.encoding = encoding
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, path):
+        """
+        Get the path of the decompressed copy of a file. If there is no copy yet, it will be created.
+
+        Args:
+            path: String: Path to the .nc.bz2 file.
+
+        Returns:
+            String with the path of the decompressed copy.
+        """
+        target = self._getTarget(path)
+
+        try:
+            stat = os.stat(target)
+            # mark as recently used by the access time. The modification time is kept, as it identifies the open
+            # Datasets in the BCO.tools.pool.DatasetPool:
+            os.utime(target, ns=(int(time.time() * 1e9), stat.st_mtime_ns))
+            return target
+        except OSError:  # not there yet or removed by another process in the meantime
+            pass
+
+        self._add(path, target)
+        self._evict(keep=target)
+        return target
+
+    def __contains__(self, path):
+        return os.path.isfile(self._getTarget(path))
+
+    def size(self):
+        """
+        Returns:
+            Size of all copies in the cache in bytes.
+        """
+        return sum(size for _file, size, used in self._entries())
+
+    def clear(self):
+        """
+        Removes all copies from the cache.
+        """
+        for _file, size, used in self._entries():
+            _remove(_file)
+
+    def _getTarget(self, path):
+        """
+        Get the path of the copy of a file in the cache.
+        """
+        stat = os.stat(path)
+        key = "%s|%i|%i|%s" % (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, self.encoding)
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".nc")
+
+    def _add(self, path, target):
+        """
+        Decompresses the file and writes the copy. The copy is written to a temporary file, which is renamed
+        when it is complete, so other processes never see incomplete copies.
+        """
+        from BCO.tools.decompress import bz2Decompress
+
+        memory = bz2Decompress(path)
+
+        fd, tmp_file = tempfile.mkstemp(prefix=".tmp_", suffix=".nc", dir=self.directory)
+        try:
+            if self.encoding == "raw":
+                with os.fdopen(fd, "wb") as f:
+                    f.write(memory)
+            else:
+                os.close(fd)
+                _transcode(path, memory, tmp_file, zlib=self.encoding == "zlib")
+            os.replace(tmp_file, target)
+        except BaseException:
+            _remove(tmp_file)
+            raise
+
+    def _evict(self, keep=None):
+        """
+        Removes the least recently used copies until the cache is smaller than maxsize.
+        """
+        if self.maxsize is None:
+            return
+
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _file, size, used in entries)
+        for _file, size, used in entries:
+            if total <= self.maxsize:
+                break
+            if _file == keep:
+                continue
+            _remove(_file)
+            total -= size
+
+    def _entries(self):
+        """
+        Returns:
+            List of tuples (path, size, last usage) of all copies in the cache.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith(".") or not name.endswith(".nc"):
+                continue
+            _file = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(_file)
+            except OSError:  # removed by another process in the meantime
+                continue
+            entries.append((_file, stat.st_size, max(stat.st_atime, stat.st_mtime)))
+        return entries
+
+
+def _transcode(path, memory, target, zlib):
+    """
+    Writes the netCDF file in memory into a new netCDF4 file, with or without zlib-compression.
+    """
+    from netCDF4 import Dataset
+    from BCO.tools import tools
+
+    with tools.netcdf_lock:
+        src = Dataset(path, memory=memory)
+        dst = Dataset(target, "w", format="NETCDF4")
+        try:
+            dst.setncatts(dict((key, src.getncattr(key)) for key in src.ncattrs()))
+            for name, dim in src.dimensions.items():
+                dst.createDimension(name, None if dim.isunlimited() else len(dim))
+
+            for name, var in src.variables.items():
+                attrs = dict((key, var.getncattr(key)) for key in var.ncattrs())
+                compress = zlib and var.dtype != str and len(var.dimensions) > 0
+                new = dst.createVariable(name, var.datatype, var.dimensions, zlib=compress, complevel=1,
+                                         shuffle=compress, fill_value=attrs.pop("_FillValue", None))
+                new.setncatts(attrs)
+
+                var.set_auto_maskandscale(False)
+                new.set_auto_maskandscale(False)
+                new[...] = var[...]
+        finally:
+            src.close()
+            dst.close()
+
+
+def _remove(path):
+    """
+    Removes a file, if it still exists. Open copies stay readable for the processes using them.
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,265 @@
+"""
+This module contains the archive catalog. The catalog is a small SQLite index of all files of the BCO archive, which
+can be used instead of searching the filesystem for every single day.
+
+>>> from BCO.tools.catalog import Catalog
+
+"""
+
+import os
+import re
+import glob
+import sqlite3
+import datetime
+import threading
+
+import BCO
+
+__all__ = [
+    'Catalog'
+]
+
+_DEVICES = ["CORAL", "KATRIN", "CEILOMETER", "RADIATION", "WEATHER", "WINDLIDAR"]
+
+# strftime-directives used in the settings.ini with the number of digits they produce:
+_DIRECTIVES = {"%Y": 4,
+               "%y": 2,
+               "%m": 2,
+               "%d": 2}
+
+
+class Catalog(object):
+    """
+    Index of the files in the archive with their path, size, modification time and time coverage.
+
+    The archive roots are taken from the settings.ini ('PATH', 'DATA_VERSION', 'PATH_ADDITION' and 'NAME_SCHEME'
+    of every device). Scanning the archive only needs to be done once. Running scan() again will only open files
+    which are new or have changed since the last scan.
+
+    Args:
+        path: String: Where to store the catalog. Default is "~/.bco_catalog.sqlite".
+
+    Example:
+        Building (or updating) the catalog for the CORAL:
+
+        >>> from BCO.tools.catalog import Catalog
+        >>> cat = Catalog()
+        >>> cat.scan("CORAL")
+
+        Afterwards the instrument classes can use it for finding their files:
+
+        >>> from BCO import settings
+        >>> settings.set_catalog(cat)
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(os.path.expanduser("~"), ".bco_catalog.sqlite")
+
+        self.path = path
+        # the connection is shared by all threads (prefetching, parallel reads), so every statement is
+        # run under this lock:
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._execute("CREATE TABLE IF NOT EXISTS files ("
+                      "instrument TEXT, date TEXT, version TEXT, path TEXT PRIMARY KEY, size INTEGER, "
+                      "mtime REAL, first_time REAL, last_time REAL, records INTEGER)")
+        self._execute("CREATE INDEX IF NOT EXISTS files_by_date ON files (instrument, version, date)", commit=True)
+
+    def scan(self, devices=None, verbose=True):
+        """
+        Scans the archive and adds all new or changed files to the catalog. Files which do not exist anymore
+        are removed from the catalog.
+
+        Args:
+            devices: String or list of strings: one or more of "CORAL", "KATRIN", "CEILOMETER", "RADIATION",
+                     "WEATHER", "WINDLIDAR". Default is all of them.
+            verbose: Boolean: print the number of new files per device.
+
+        Returns:
+            Number of files which were added or updated.
+        """
+        if devices is None:
+            devices = _DEVICES
+        elif not isinstance(devices, list):
+            devices = [devices]
+
+        updated = 0
+        for device in devices:
+            assert device in _DEVICES
+
+            known = dict((row[0], (row[1], row[2])) for row in
+                         self._execute("SELECT path, size, mtime FROM files WHERE instrument=?", (device,)))
+            pattern, regex = self._getPatterns(device)
+
+            found = set()
+            n_new = 0
+            for _file in glob.iglob(pattern):
+                match = regex.match(_file)
+                if not match:
+                    continue
+                found.add(_file)
+
+                stat = os.stat(_file)
+                if known.get(_file) == (stat.st_size, stat.st_mtime):
+                    continue
+
+                self._execute("INSERT OR REPLACE INTO files VALUES (?,?,?,?,?,?,?,?,?)",
+                              (device, self._getDate(match).strftime("%Y-%m-%d"), self._getVersion(match),
+                               _file, stat.st_size, stat.st_mtime) + self._getCoverage(_file))
+                n_new += 1
+
+            for _file in set(known) - found:
+                self._execute("DELETE FROM files WHERE path=?", (_file,))
+
+            with self._lock:
+                self._db.commit()
+            updated += n_new
+            if verbose:
+                print("%s: %i new or changed files, %i files in total." % (device, n_new, len(found)))
+
+        return updated
+
+    def lookup(self, device, date, version=None):
+        """
+        Get the path of the file of a device for one date.
+
+        Args:
+            device: String: one of "CORAL", "KATRIN", "CEILOMETER", "RADIATION", "WEATHER", "WINDLIDAR".
+            date: datetime.datetime or datetime.date object. For monthly files (Ceilometer) any day of the
+                  month can be used.
+            version: String: data version as in the settings.ini (e.g. "Version_2/"). Default is the
+                     one currently set in the settings.ini.
+
+        Returns:
+            String with the path of the file or None if the file is not in the catalog.
+        """
+        if version is None:
+            version = BCO.config[device]["DATA_VERSION"]
+
+        if "%d" not in BCO.config[device]["NAME_SCHEME"]:  # monthly files
+            date = date.replace(day=1)
+
+        rows = self._execute("SELECT path FROM files WHERE instrument=? AND version=? AND date=?",
+                             (device, version, date.strftime("%Y-%m-%d")))
+        if not rows:
+            return None
+        return rows[0][0]
+
+    def files(self, device, start, end, version=None):
+        """
+        Get all entries of a device for a timeframe.
+
+        Args:
+            device: String: one of "CORAL", "KATRIN", "CEILOMETER", "RADIATION", "WEATHER", "WINDLIDAR".
+            start: datetime.datetime or datetime.date object.
+            end: datetime.datetime or datetime.date object.
+            version: String: data version as in the settings.ini. Default is the one currently set.
+
+        Returns:
+            List of tuples (date, path, size, mtime, first_time, last_time, records) sorted by date.
+            first_time and last_time are in seconds since 1970.
+        """
+        if version is None:
+            version = BCO.config[device]["DATA_VERSION"]
+
+        return self._execute("SELECT date, path, size, mtime, first_time, last_time, records FROM files "
+                             "WHERE instrument=? AND version=? AND date>=? AND date<=? ORDER BY date",
+                             (device, version, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")))
+
+    def close(self):
+        """
+        Closes the connection to the catalog.
+        """
+        with self._lock:
+            self._db.close()
+
+    def _execute(self, statement, parameters=(), commit=False):
+        """
+        Runs one SQL statement on the shared connection while holding the lock.
+
+        Args:
+            statement: String: the SQL statement.
+            parameters: Tuple with the parameters of the statement.
+            commit: Boolean: commit the transaction afterwards.
+
+        Returns:
+            List with all rows of the result.
+        """
+        with self._lock:
+            rows = self._db.execute(statement, parameters).fetchall()
+            if commit:
+                self._db.commit()
+        return rows
+
+    @staticmethod
+    def _getPatterns(device):
+        """
+        Builds the glob-pattern and the regular expression for all files of a device from the settings.ini.
+
+        Returns:
+            Tuple (glob-pattern, compiled regular expression).
+        """
+        tmp_path = BCO.config[device]["PATH"]
+        if BCO.config[device]["DATA_VERSION"] != "None":
+            tmp_path += "<VERSION>"
+        if BCO.config[device]["PATH_ADDITION"] != "None":
+            tmp_path += BCO.config[device]["PATH_ADDITION"]
+        tmp_path += BCO.config[device]["NAME_SCHEME"]
+
+        pattern = tmp_path.replace("<VERSION>", "Version_*/")
+        regex = re.escape(tmp_path).replace(re.escape("<VERSION>"), r"(?P<version>Version_\d+/)")
+        regex = regex.replace(r"\*", "[^/]*")
+        for directive, digits in _DIRECTIVES.items():
+            pattern = pattern.replace(directive, "*")
+            # the same directive can appear in the path and the name, only the first one is a named group:
+            regex = regex.replace(re.escape(directive), r"(?P<%s>\d{%i})" % (directive[1], digits), 1)
+            regex = regex.replace(re.escape(directive), r"\d{%i}" % digits)
+
+        return pattern, re.compile(regex + "$")
+
+    @staticmethod
+    def _getDate(match):
+        """
+        Get the date from the match of the regular expression of _getPatterns().
+        """
+        groups = match.groupdict()
+        year = int(groups["Y"]) if groups.get("Y") else 2000 + int(groups["y"])
+        day = int(groups["d"]) if groups.get("d") else 1
+        return datetime.date(year, int(groups["m"]), day)
+
+    @staticmethod
+    def _getVersion(match):
+        """
+        Get the data version from the match of the regular expression of _getPatterns().
+        """
+        return match.groupdict().get("version") or "None"
+
+    @staticmethod
+    def _getCoverage(_file):
+        """
+        Reads the first and last timestamp and the number of records from the file.
+
+        Returns:
+            Tuple (first_time, last_time, records). All are None if the file could not be read.
+        """
+        from netCDF4 import Dataset
+        from BCO.tools import tools
+
+        try:
+            if "bz2" in _file[-5:]:
+                nc = tools.bz2Dataset(_file)
+            else:
+                nc = Dataset(_file)
+        except (IOError, OSError):
+            return None, None, None
+
+        try:
+            time = nc.variables["time"][:]
+            if len(time) == 0:
+                return None, None, 0
+            return float(time[0]), float(time[-1]), len(time)
+        except KeyError:
+            return None, None, None
+        finally:
+            nc.close()
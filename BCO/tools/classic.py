@@ -0,0 +1,340 @@
+"""
+This module contains a reader for netCDF-3 files (the "classic" data model) which only needs numpy. The variables
+are memory-mapped, so reading a timeframe is just slicing a view into the file.
+
+>>> from BCO.tools.classic import ClassicDataset
+
+"""
+
+import struct
+
+import numpy as np
+
+__all__ = [
+    'ClassicDataset',
+    'isClassic'
+]
+
+# netCDF-3 data types (big-endian) with their default fill values:
+_TYPES = {1: ("i1", -127),
+          2: ("S1", b"\x00"),
+          3: (">i2", -32767),
+          4: (">i4", -2147483647),
+          5: (">f4", 9.9692099683868690e+36),
+          6: (">f8", 9.9692099683868690e+36),
+          7: ("u1", 255),
+          8: (">u2", 65535),
+          9: (">u4", 4294967295),
+          10: (">i8", -9223372036854775806),
+          11: (">u8", 18446744073709551614)}
+
+_NC_DIMENSION = 10
+_NC_VARIABLE = 11
+_NC_ATTRIBUTE = 12
+_STREAMING = 0xFFFFFFFF
+
+
+def isClassic(path):
+    """
+    Checks if a file is a netCDF-3 file (CDF-1, CDF-2 or CDF-5).
+
+    Args:
+        path: String: Path to the file.
+
+    Returns:
+        Boolean
+    """
+    try:
+        with open(path, "rb") as f:
+            magic = f.read(4)
+    except (IOError, OSError):
+        return False
+    return magic in [b"CDF\x01", b"CDF\x02", b"CDF\x05"]
+
+
+class ClassicDataset(object):
+    """
+    Read-only netCDF-3 Dataset. It offers the parts of the netCDF4.Dataset interface which are used by the
+    instruments (variables, dimensions and attributes). Masking and scaling of the values is done like in netCDF4.
+
+    Slicing a variable returns a view into the file, so no data is read until it is used. Views of variables
+    without scale_factor/add_offset keep the big-endian byte order of the file. As no netCDF-library is involved,
+    several threads can read from ClassicDatasets at the same time.
+
+    Args:
+        path: String: Path to the .nc file.
+        memory: Optional bytes of the file (e.g. a decompressed .nc.bz2 file). Then path is only used as name.
+
+    Example:
+        >>> nc = ClassicDataset("mrr_testfile.nc")
+        >>> lwc = nc.variables["LWC"][100:200]
+    """
+
+    def __init__(self, path, memory=None):
+        self.filepath = path
+        if memory is None:
+            self._buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        else:
+            self._buffer = np.frombuffer(memory, dtype=np.uint8)
+
+        header = _Header(self._buffer)
+        self.data_model = header.data_model
+        self.dimensions = header.dimensions
+        self._attributes = header.attributes
+        self.variables = header.variables
+
+    def ncattrs(self):
+        return list(self._attributes)
+
+    def getncattr(self, key):
+        return self._attributes[key]
+
+    def __getattr__(self, key):
+        if key.startswith("_"):
+            raise AttributeError(key)
+        try:
+            return self._attributes[key]
+        except KeyError:
+            raise AttributeError(key)
+
+    def close(self):
+        self.variables = {}
+        self._buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __str__(self):
+        lines = ["<class 'BCO.tools.classic.ClassicDataset'>",
+                 "root group (%s data model, file format NETCDF3):" % self.data_model]
+        lines += ["    %s: %s" % (key, value) for key, value in self._attributes.items()]
+        lines.append("    dimensions(sizes): %s" % ", ".join("%s(%i)" % (dim, len(size))
+                                                           for dim, size in self.dimensions.items()))
+        lines.append("    variables(dimensions): %s" % ", ".join(
+            "%s %s(%s)" % (var.dtype, name, ",".join(var.dimensions)) for name, var in self.variables.items()))
+        return "\n".join(lines)
+
+
+class ClassicVariable(object):
+    """
+    One variable of a ClassicDataset. Slicing returns a masked array with a view into the file as data.
+    """
+
+    def __init__(self, name, dimensions, shape, dtype, fill, attributes, view):
+        self.name = name
+        self.dimensions = dimensions
+        self.shape = shape
+        self.ndim = len(shape)
+        self.dtype = np.dtype(dtype).newbyteorder("=")
+        self._attributes = attributes
+        self._view = view
+        self._fill = fill  # default fill value of the type
+        self._auto_mask = True
+
+    def __len__(self):
+        return self.shape[0]
+
+    def ncattrs(self):
+        return list(self._attributes)
+
+    def getncattr(self, key):
+        return self._attributes[key]
+
+    def __getattr__(self, key):
+        if key.startswith("_"):
+            raise AttributeError(key)
+        try:
+            return self._attributes[key]
+        except KeyError:
+            raise AttributeError(key)
+
+    def set_auto_mask(self, mask):
+        """
+        Turns the masking of missing values on or off (like netCDF4.Variable.set_auto_mask).
+        """
+        self._auto_mask = bool(mask)
+
+    def __getitem__(self, key):
+        if self.ndim == 0 and key in [slice(None), Ellipsis, ()]:  # scalar variables, like nc.variables["lat"][:]
+            key = ()
+        data = self._view[key]
+        if np.ndim(data) == 0:
+            data = np.asarray(data)
+
+        mask = self._getMask(data) if self._auto_mask else np.ma.nomask
+        if "scale_factor" in self._attributes:
+            data = data * self._attributes["scale_factor"]
+        if "add_offset" in self._attributes:
+            data = data + self._attributes["add_offset"]
+
+        if not self._auto_mask:
+            return data[()] if data.ndim == 0 else data
+
+        array = np.ma.MaskedArray(data, mask=mask, copy=False)
+        if array.ndim == 0:
+            return array[()]
+        return array
+
+    def _getMask(self, data):
+        """
+        Masks missing values, fill values and values outside of the valid range, like netCDF4 does.
+        """
+        if data.dtype.kind == "S":
+            return np.ma.nomask
+
+        mask = np.zeros(data.shape, dtype=bool)
+        for value in np.atleast_1d(self._attributes.get("missing_value", [])):
+            mask |= data == value
+
+        mask |= data == self._attributes.get("_FillValue", self._fill)
+
+        valid_min = self._attributes.get("valid_min")
+        valid_max = self._attributes.get("valid_max")
+        if "valid_range" in self._attributes:
+            valid_min, valid_max = self._attributes["valid_range"][:2]
+        if valid_min is not None:
+            mask |= data < valid_min
+        if valid_max is not None:
+            mask |= data > valid_max
+
+        if data.dtype.kind == "f":
+            mask |= np.isnan(data)
+
+        if not mask.any():
+            return np.ma.nomask
+        return mask
+
+
+class _Header(object):
+    """
+    Parser of the header of a netCDF-3 file.
+    """
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        self._pos = 4
+
+        magic = buffer[:4].tobytes()
+        if magic[:3] != b"CDF" or magic[3] not in [1, 2, 5]:
+            raise IOError("Not a netCDF-3 file.")
+        self._version = magic[3]
+        self.data_model = {1: "NETCDF3_CLASSIC", 2: "NETCDF3_64BIT_OFFSET", 5: "NETCDF3_64BIT_DATA"}[self._version]
+
+        self._size = ">q" if self._version == 5 else ">i"  # sizes and counts
+        self._offset = ">i" if self._version == 1 else ">q"  # offsets of the variables
+
+        numrecs = self._read(self._size)
+        dims = self._readDimensions()
+        self.dimensions = dict((name, range(size)) for name, size in dims)
+        self.attributes = self._readAttributes()
+        variables = self._readVariables(dims)
+
+        record_vars = [var for var in variables if var["record"]]
+        if len(record_vars) == 1:  # a single record variable is not padded
+            recsize = record_vars[0]["slab"]
+        else:
+            recsize = sum(var["vsize"] for var in record_vars)
+
+        if numrecs == _STREAMING or (self._version != 5 and numrecs == -1):
+            numrecs = 0
+            if record_vars and recsize > 0:
+                numrecs = (len(buffer) - min(var["begin"] for var in record_vars)) // recsize
+
+        for name, size in dims:
+            if size == 0:
+                self.dimensions[name] = range(numrecs)
+
+        self.variables = {}
+        for var in variables:
+            shape = tuple(numrecs if var["record"] and i == 0 else size for i, size in enumerate(var["shape"]))
+            self.variables[var["name"]] = ClassicVariable(var["name"], var["dimensions"], shape, var["dtype"],
+                                                          var["fill"], var["attributes"],
+                                                          self._getView(var, shape, recsize))
+
+    def _getView(self, var, shape, recsize):
+        """
+        Creates the numpy view of a variable into the buffer. Record variables are interleaved, so their first
+        dimension has the stride of a whole record.
+        """
+        dtype = np.dtype(var["dtype"])
+        strides = [dtype.itemsize] * len(shape)
+        for i in range(len(shape) - 2, -1, -1):
+            strides[i] = strides[i + 1] * shape[i + 1]
+        if var["record"]:
+            strides[0] = recsize
+        if 0 in shape:
+            return np.zeros(shape, dtype=dtype)
+
+        return np.ndarray(shape=shape, dtype=dtype, buffer=self._buffer, offset=var["begin"],
+                          strides=tuple(strides))
+
+    def _read(self, fmt):
+        size = struct.calcsize(fmt)
+        value = struct.unpack(fmt, self._buffer[self._pos:self._pos + size].tobytes())[0]
+        self._pos += size
+        return value
+
+    def _readName(self):
+        n = self._read(self._size)
+        name = self._buffer[self._pos:self._pos + n].tobytes().decode("utf-8")
+        self._pos += n + (-n % 4)
+        return name
+
+    def _readList(self, tag):
+        """
+        Reads the tag and the number of elements of a list. Absent lists are stored as two zeros.
+        """
+        found = self._read(">i")
+        n = self._read(self._size)
+        if found not in [tag, 0]:
+            raise IOError("Corrupt netCDF-3 header at byte %i." % self._pos)
+        return n
+
+    def _readDimensions(self):
+        return [(self._readName(), self._read(self._size)) for i in range(self._readList(_NC_DIMENSION))]
+
+    def _readAttributes(self):
+        attributes = {}
+        for i in range(self._readList(_NC_ATTRIBUTE)):
+            name = self._readName()
+            code, fill = _TYPES[self._read(">i")]
+            n = self._read(self._size)
+            dtype = np.dtype(code)
+            values = self._buffer[self._pos:self._pos + n * dtype.itemsize].view(dtype)
+            self._pos += n * dtype.itemsize + (-(n * dtype.itemsize) % 4)
+
+            if dtype.kind == "S":
+                attributes[name] = values.tobytes().decode("utf-8", "replace")
+            elif n == 1:
+                attributes[name] = values.astype(dtype.newbyteorder("="))[0]
+            else:
+                attributes[name] = values.astype(dtype.newbyteorder("="))
+        return attributes
+
+    def _readVariables(self, dims):
+        variables = []
+        for i in range(self._readList(_NC_VARIABLE)):
+            name = self._readName()
+            dimids = [self._read(self._size) for j in range(self._read(self._size))]
+            attributes = self._readAttributes()
+            code, fill = _TYPES[self._read(">i")]
+            vsize = self._read(self._size)
+            begin = self._read(self._offset)
+
+            shape = tuple(dims[dimid][1] for dimid in dimids)
+            record = len(shape) > 0 and shape[0] == 0
+            slab = np.dtype(code).itemsize * int(np.prod(shape[1:] if record else shape, dtype=np.int64))
+            variables.append({"name": name,
+                              "dimensions": tuple(dims[dimid][0] for dimid in dimids),
+                              "shape": shape,
+                              "dtype": code,
+                              "fill": fill,
+                              "attributes": attributes,
+                              "record": record,
+                              "vsize": vsize if vsize != -1 and vsize != _STREAMING else slab + (-slab % 4),
+                              "slab": slab,
+                              "begin": begin})
+        return variables
@@ -7,11 +7,14 @@ This module contains functions to convert units.
 """
 from datetime import datetime as dt
 from datetime import timedelta
-import collections
 import numpy as np
 import time as time_module
 import sys
 
+from BCO.tools import tzconvert
+
+_UTC_SHIFT_TZ = "Europe/Berlin"  # timezone of the time-stamps, which are converted with utc=True
+
 
 def Celsius2Kelvin(value):
     """
@@ -42,24 +45,29 @@ def Kelvin2Celsius(value):
 def num2time(num,utc=False):
     """
     Converts seconds since 1970 to datetime objects.
-    If input is a numpy array, ouput will be a numpy array as well.
+    If input is a numpy array, ouput will be a numpy array as well. Arrays are converted at once with the UTC-offsets
+    of the local timezone (see BCO.tools.tzconvert).
 
     Args:
         num: float/ndarray.  seconds since 1970
+        utc: If True, the offset of German time (Europe/Berlin, including summertime) is subtracted.
 
     Returns:
         datetime.datetime object
     """
 
-    if isinstance(num,collections.Iterable):
-        f = np.vectorize(dt.fromtimestamp)
-        date = f(num)
+    if _isIterable(num):
+        num = np.ma.filled(np.ma.asarray(num, dtype=np.float64), np.nan)
+        date = tzconvert.num2datetime(num, tz=None)
     else:
         date = dt.fromtimestamp(num)
 
     if utc:
-        f = np.vectorize(lambda x,y: x-y)
-        date = f(date,timedelta(hours=1))
+        offset = tzconvert.utcoffset(num, tz=_UTC_SHIFT_TZ)
+        if _isIterable(num):
+            date = date - offset.astype("timedelta64[s]").astype(object)
+        else:
+            date = date - timedelta(seconds=int(offset))
 
     return date
 
@@ -71,12 +79,15 @@ def time2num(time,utc=False):
 
     Args:
         time: datetime.datetime object / ndarray of datetime.datetime objects.
+        utc: If True, time is converted from German time (Europe/Berlin, including summertime) to UTC.
 
     Returns:
         Float of seconds since 1970 / ndarray of floats.
     """
-    if sys.version_info >= (3,0):
-        if isinstance(time,collections.Iterable):
+    if isinstance(time, np.ndarray) and time.dtype.kind == "M":
+        date = datetime642num(time)
+    elif sys.version_info >= (3,0):
+        if _isIterable(time):
             epo = lambda x: x.timestamp()
 
             date = np.asarray(list(map(epo, time)))
@@ -85,7 +96,7 @@ def time2num(time,utc=False):
 
     else:
 
-        if isinstance(time, collections.Iterable):
+        if _isIterable(time):
             epo = lambda x: dt.fromtimestamp(x)
             date = np.asarray(list(map(epo, time)))
             date = time_module.mktime(date.timetuple())
@@ -94,5 +105,73 @@ def time2num(time,utc=False):
             date = time_module.mktime(time.timetuple())
 
     if utc:
-        date = np.subtract(date,timedelta(hours=1).seconds)
-    return date
\ No newline at end of file
+        date = tzconvert.local2utc(date, tz=_UTC_SHIFT_TZ)
+        if not _isIterable(time):
+            date = float(date)
+    return date
+
+
+def num2datetime64(num):
+    """
+    Converts seconds since 1970 to numpy datetime64 values (UTC, in nanoseconds). Fully vectorized, so it is much
+    faster than num2time() and needs much less memory than datetime.datetime objects.
+    Masked values and nan become NaT.
+
+    Args:
+        num: float/ndarray.  seconds since 1970
+
+    Returns:
+        numpy.datetime64 / ndarray of dtype datetime64[ns].
+
+    Example:
+        >>> num2datetime64(np.array([1514764800.0, 1514764810.5]))
+        array(['2018-01-01T00:00:00.000000000', '2018-01-01T00:00:10.500000000'], dtype='datetime64[ns]')
+    """
+    num = np.ma.filled(np.ma.asarray(num, dtype=np.float64), np.nan)
+    scalar = num.ndim == 0
+    num = np.atleast_1d(num)
+    invalid = ~np.isfinite(num)
+    num = np.where(invalid, 0, num)
+
+    seconds = np.floor(num)
+    nanoseconds = seconds.astype(np.int64) * 1000000000 + np.round((num - seconds) * 1e9).astype(np.int64)
+    date = nanoseconds.astype("datetime64[ns]")
+    date[invalid] = np.datetime64("NaT")
+
+    if scalar:
+        return date[0]
+    return date
+
+
+def datetime642num(time):
+    """
+    Converts numpy datetime64 values to seconds since 1970 as float. Fully vectorized. NaT becomes nan.
+
+    Args:
+        time: numpy.datetime64 / ndarray of datetime64 (or anything np.asarray can convert to datetime64).
+
+    Returns:
+        Float of seconds since 1970 / ndarray of floats.
+
+    Example:
+        >>> datetime642num(np.array(["2018-01-01T00:00:10.5"], dtype="datetime64[ns]"))
+        array([1.5147648105e+09])
+    """
+    time = np.asarray(time, dtype="datetime64[ns]")
+    date = time.astype(np.int64) / 1e9
+    date = np.where(np.isnat(time), np.nan, date)
+
+    if date.ndim == 0:
+        return float(date)
+    return date
+
+
+def _isIterable(value):
+    """
+    Checks if value is a list, array or any other iterable (but not a string).
+    """
+    try:
+        iter(value)
+    except TypeError:
+        return False
+    return not isinstance(value, str)
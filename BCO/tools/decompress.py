@@ -0,0 +1,165 @@
+"""
+This module contains a multi-core decompressor for .bz2 files. It is used by BCO.tools.tools.bz2Dataset().
+
+>>> from BCO.tools.decompress import bz2Decompress
+
+"""
+
+import os
+import bz2
+import bisect
+
+import numpy as np
+
+__all__ = [
+    'bz2Decompress'
+]
+
+# 48 bit magic numbers of the bzip2 format. Both are not aligned to bytes:
+_BLOCK_MAGIC = 0x314159265359  # start of a compressed block
+_EOS_MAGIC = 0x177245385090  # end of a stream
+
+_WINDOW = 1 << 20  # bytes which are searched at once for the magic numbers at the other bit offsets
+
+
+def bz2Decompress(bz2file, workers=None):
+    """
+    Decompresses a .bz2 file using several cores.
+
+    bzip2 compresses the data in independent blocks of up to 900 kB. The blocks are searched in the compressed
+    data, every block is wrapped into a stream of its own and the blocks are decompressed by parallel threads.
+    The checksum of every block is verified by the decompression. If the file has only one block or if anything
+    does not fit, the file is decompressed the usual way on one core.
+
+    Args:
+        bz2file: String: Path to the .bz2 file.
+        workers: Integer: Number of threads. Default is the number of cores.
+
+    Returns:
+        Bytes of the decompressed file.
+
+    Example:
+        >>> memory = bz2Decompress("radar_testfile.nc.bz2")
+        >>> nc = Dataset("radar_testfile.nc", memory=memory)
+
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    with open(bz2file, "rb") as f:
+        data = f.read()
+
+    if workers > 1:
+        blocks = _findBlocks(data)
+        if len(blocks) > 1:
+            try:
+                return _decompressBlocks(data, blocks, workers)
+            except (IOError, OSError, ValueError, EOFError):
+                pass  # e.g. a magic number which was found by chance inside of a block
+
+    return bz2.decompress(data)
+
+
+def _findBlocks(data):
+    """
+    Searches the magic numbers of the blocks and of the ends of the streams in the compressed data.
+
+    Returns:
+        List of tuples (first bit, last bit + 1) of all blocks. The bits of a block start after its magic number.
+    """
+    array = np.frombuffer(data, dtype=np.uint8)
+    if len(array) < 16:
+        return []
+
+    block_magic = _BLOCK_MAGIC.to_bytes(6, "big")
+    eos_magic = _EOS_MAGIC.to_bytes(6, "big")
+
+    starts, ends = [], []
+    for magic, positions in [(block_magic, starts), (eos_magic, ends)]:
+        positions.extend(i * 8 for i in _findAll(data, magic, len(data)))
+
+    # the other 7 bit offsets are searched in windows, so only one window at a time is shifted. The windows overlap
+    # by the length of the magic numbers, so magic numbers across the border of two windows are found as well:
+    overlap = len(block_magic) + 1
+    for offset in range(0, len(array) - 1, _WINDOW):
+        window = array[offset:offset + _WINDOW + overlap]
+        for shift in range(1, 8):  # bit number 'shift' of the data becomes the first bit of a byte:
+            shifted = ((window[:-1] << shift) | (window[1:] >> (8 - shift))).tobytes()
+            for magic, positions in [(block_magic, starts), (eos_magic, ends)]:
+                positions.extend((offset + i) * 8 + shift for i in _findAll(shifted, magic, _WINDOW))
+
+    starts.sort()
+    bounds = sorted(starts + ends)
+    blocks = []
+    for start in starts:
+        i = bisect.bisect_right(bounds, start)
+        if i == len(bounds):
+            return []  # the data is truncated
+        blocks.append((start + 48, bounds[i]))
+    return blocks
+
+
+def _findAll(data, magic, limit):
+    """
+    Yields all positions of magic in data, which are smaller than limit.
+    """
+    i = data.find(magic)
+    while 0 <= i < limit:
+        yield i
+        i = data.find(magic, i + 1)
+
+
+def _blockStream(array, start, stop):
+    """
+    Wraps the bits [start, stop) of a block into a complete bzip2 stream of one block. The checksum of the stream
+    is then the checksum of the block, which is stored in the first 32 bits after the magic number.
+
+    Returns:
+        Bytes of the stream.
+    """
+    first = start - 48  # including the magic number
+    n_bits = stop - first
+    n_bytes, rest = divmod(n_bits, 8)
+
+    chunk = array[first // 8:first // 8 + n_bytes + 2]
+    if len(chunk) < n_bytes + 2:
+        chunk = np.concatenate([chunk, np.zeros(n_bytes + 2 - len(chunk), dtype=np.uint8)])
+    shift = first % 8
+    if shift:
+        chunk = (chunk[:-1] << shift) | (chunk[1:] >> (8 - shift))
+
+    crc = int.from_bytes(chunk[6:10].tobytes(), "big")
+    last = int(chunk[n_bytes]) >> (8 - rest) if rest else 0
+
+    tail_bits = rest + 48 + 32
+    padding = -tail_bits % 8
+    tail = ((((last << 48) | _EOS_MAGIC) << 32) | crc) << padding
+
+    return b"BZh9" + chunk[:n_bytes].tobytes() + tail.to_bytes((tail_bits + padding) // 8, "big")
+
+
+def _decompressBlock(array, start, stop):
+    """
+    Decompresses a single block. Raises an error if the block is not a complete stream.
+    """
+    decompressor = bz2.BZ2Decompressor()
+    memory = decompressor.decompress(_blockStream(array, start, stop))
+    if not decompressor.eof or decompressor.unused_data:
+        raise ValueError("The block from bit %i to %i is not complete." % (start, stop))
+    return memory
+
+
+def _decompressBlocks(data, blocks, workers):
+    """
+    Decompresses the blocks by parallel threads. The bz2-module releases the GIL while decompressing.
+
+    Returns:
+        Bytes of the decompressed data.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    array = np.frombuffer(data, dtype=np.uint8)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pieces = list(pool.map(lambda block: _decompressBlock(array, *block), blocks))
+
+    return b"".join(pieces)
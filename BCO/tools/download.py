@@ -0,0 +1,553 @@
+"""
+This module contains a download manager, which fetches files from the FTP-server over several connections at once.
+
+>>> from BCO.tools.download import DownloadManager
+
+"""
+
+import os
+import json
+import time
+import zlib
+import errno
+import ftplib
+import threading
+import contextlib
+import collections
+
+try:
+    import fcntl
+except ImportError:  # Windows: the locks only work within one process
+    fcntl = None
+
+__all__ = [
+    'DownloadManager',
+    'DownloadCache'
+]
+
+_INDEX = "index.json"
+_LOCK_SLOTS = 64
+
+
+class DownloadManager(object):
+    """
+    Downloads files from the FTP-server over several parallel connections. The connections are borrowed from the
+    shared pool of FTP-connections (see BCO.tools.tools.getFTPPool()), so at most as many connections as the pool
+    allows are used, even if several downloads run at the same time.
+
+    A file which fails to download is tried again up to `retries` times, continuing where the transfer stopped.
+    Files which already exist completely in the output folder are not downloaded again. After all files are done,
+    the number of files, their size and the throughput are printed.
+
+    Args:
+        connections: Integer: Number of files which are downloaded at the same time. Default is the maximum size of
+                     the pool of FTP-connections.
+        retries: Integer: Number of retries of a file after an error. Default is 3.
+        verbose: Boolean: Print a line per file and the throughput report. Default is True.
+        bandwidth: Maximum download rate of all connections together in bytes per second. Default is None (no
+                   limit).
+
+    Example:
+        Downloading the Windlidar files of January 2018 over 4 connections:
+
+        >>> from BCO.tools.download import DownloadManager
+        >>> manager = DownloadManager(connections=4)
+        >>> files = ["/L_Vertical_velocity/Version1.01/WindLidar__Deebles_Point__201801%02i.nc.bz2" % day
+        >>>          for day in range(1, 32)]
+        >>> paths = manager.download(files, "/scratch/wherever/")
+    """
+
+    def __init__(self, connections=None, retries=3, verbose=True, bandwidth=None):
+        if connections is not None and connections < 1:
+            raise ValueError("connections needs to be at least 1, not %s." % connections)
+        if bandwidth is not None and bandwidth <= 0:
+            raise ValueError("bandwidth needs to be positive, not %s." % bandwidth)
+
+        self.connections = connections
+        self.retries = retries
+        self.verbose = verbose
+        self.bandwidth = bandwidth
+        self.bytes = 0  # statistics of the last download
+        self.seconds = 0.
+        self._lock = threading.Lock()
+        self._throttle = _Throttle(bandwidth) if bandwidth else None
+
+    def download(self, files, output_folder):
+        """
+        Downloads files into a folder.
+
+        Args:
+            files: List of the paths of the files on the FTP-server. The names are allowed to contain wildcards,
+                   then the first matching file of the directory listing (see BCO.tools.listing) is downloaded.
+                   Duplicates are downloaded only once.
+            output_folder: String: Where to store the downloaded files, or a list with one folder per file.
+
+        Returns:
+            List with the local paths of the files, in the order of the input (without duplicates).
+
+        Raises:
+            IOError: if some files could not be downloaded, after all other files are done.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from BCO.tools import tools
+
+        files = list(files)
+        if isinstance(output_folder, str):
+            output_folder = [output_folder] * len(files)
+        if len(output_folder) != len(files):
+            raise ValueError("Got %i output folders for %i files." % (len(output_folder), len(files)))
+        jobs = list(_unique(zip(files, output_folder)))
+        files = [file for file, folder in jobs]
+
+        pool = tools.getFTPPool()
+        connections = self.connections or pool.maxsize
+
+        self.bytes = 0
+        t0 = time.time()
+        if connections == 1 or len(jobs) < 2:
+            results = [self._tryDownload(pool, file, folder) for file, folder in jobs]
+        else:
+            with ThreadPoolExecutor(max_workers=min(connections, len(jobs))) as executor:
+                results = list(executor.map(lambda job: self._tryDownload(pool, *job), jobs))
+        self.seconds = time.time() - t0
+
+        if self.verbose and self.bytes > 0:
+            print("Downloaded %i files (%.1f MB) in %.1f s (%.2f MB/s)" %
+                  (sum(1 for path, size, error in results if size), self.bytes / 1e6, self.seconds,
+                   self.bytes / 1e6 / max(self.seconds, 1e-6)))
+
+        failed = [(file, error) for file, (path, size, error) in zip(files, results) if error is not None]
+        if failed:
+            raise IOError("Downloading %i files failed:\n%s" %
+                          (len(failed), "\n".join("%s: %s" % (file, error) for file, error in failed)))
+
+        return [path for path, size, error in results]
+
+    def _tryDownload(self, pool, file, output_folder):
+        """
+        Downloads a file, with retries.
+
+        Returns:
+            Tuple (local path, downloaded bytes, None) or (None, 0, error) if all tries failed.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                with pool.connection() as ftp:
+                    path, size = self._download(ftp, file, output_folder)
+                return path, size, None
+            except ftplib.all_errors as error:
+                if isinstance(error, ftplib.error_perm) or attempt == self.retries:
+                    return None, 0, error  # e.g. "550 No such file", retrying will not help
+                if self.verbose:
+                    print("Retrying %s after: %s" % (file, error))
+
+    def _download(self, ftp, file, output_folder):
+        """
+        Downloads a single file over a connection, if there is no complete copy in the output folder yet.
+
+        The file is written to "<name>.part" first. If a transfer is interrupted, the next try continues at the end
+        of the .part file (REST), as long as the file on the server did not change in the meantime. The size of the
+        download is verified against the server and the modification time of the server is set, before the file is
+        renamed to its final name. Existing files count as complete if their size matches and they are not older
+        than the file on the server.
+
+        Returns:
+            Tuple (local path, downloaded bytes).
+        """
+        from BCO.tools import tools
+
+        file_to_retrieve = file
+        if any(char in file for char in "*?["):
+            matches = tools.getFTPListings().match(ftp, file)
+            if not matches:
+                raise ftplib.error_perm("550 No file matches %s" % file)
+            file_to_retrieve = matches[0]
+
+        path = os.path.join(output_folder, os.path.split(file_to_retrieve)[-1])
+        size, mtime = _remoteStat(ftp, file_to_retrieve)
+        if _isComplete(path, size, mtime):
+            return path, 0
+
+        part = path + ".part"
+        offset = 0
+        if os.path.isfile(part):
+            stat = os.stat(part)
+            if (size is None or stat.st_size > size or
+                    (mtime is not None and stat.st_mtime < mtime)):  # the file on the server changed
+                _remove(part)
+            else:
+                offset = stat.st_size
+
+        if self.verbose:
+            if offset:
+                print("Resuming %s at %.1f MB" % (os.path.split(path)[-1], offset / 1e6))
+            else:
+                print("Downloading %s" % os.path.split(path)[-1])
+
+        try:
+            with open(part, "ab" if offset else "wb") as f:
+                ftp.retrbinary("RETR " + file_to_retrieve, self._writer(f), rest=offset or None)
+        except ftplib.error_perm as error:
+            if not offset or str(error).startswith("550"):
+                raise
+            _remove(part)  # the server does not support REST, start again from zero
+            offset = 0
+            with open(part, "wb") as f:
+                ftp.retrbinary("RETR " + file_to_retrieve, self._writer(f))
+
+        downloaded = os.path.getsize(part)
+        if size is not None and downloaded != size:
+            # the listing can be older than the file, ask the server again. If it does not tell the size (no SIZE
+            # command), the completed transfer is trusted:
+            size, mtime = _remoteStat(ftp, file_to_retrieve, cached=False)
+            if size is not None and downloaded != size:
+                if downloaded > size:
+                    _remove(part)
+                raise ftplib.error_temp("451 Incomplete download of %s: %i of %i bytes"
+                                        % (file_to_retrieve, downloaded, size))
+
+        if mtime is not None:
+            os.utime(part, (time.time(), mtime))
+        os.replace(part, path)  # other processes never see incomplete files
+
+        with self._lock:
+            self.bytes += downloaded - offset
+        return path, downloaded - offset
+
+    def _writer(self, f):
+        """
+        Returns the callback for the blocks of a download, which keeps the bandwidth limit if there is one.
+        """
+        if self._throttle is None:
+            return f.write
+
+        def write(block):
+            f.write(block)
+            self._throttle.wait(len(block))
+        return write
+
+
+class DownloadCache(object):
+    """
+    Persistent directory for the files downloaded from the FTP-server, which is shared by all processes of a
+    computer. Every file on the server is downloaded only once, later requests use the local copy as long as the
+    file on the server does not change. The copies keep the path of the server below the directory of the cache.
+
+    An index (index.json in the directory) keeps size, last usage and the users of every copy. fetch() adds a
+    reference for the calling process, release() removes it, and copies of processes which ended count as
+    released. If the cache grows larger than maxsize, the least recently used copies without references are
+    removed.
+
+    The index and the downloads are protected by file locks, so processes which need the same file at the same
+    time wait for one download instead of downloading it twice. The directory should be on a local disk of the
+    computer. Without fcntl (Windows) the cache is only locked within one process.
+
+    Args:
+        directory: String: Directory of the cache. Default is "~/.bco_downloads".
+        maxsize: Maximum size of the cache in bytes. Default is 20 GB. None means unlimited.
+        verbose: Boolean: Print the downloads. Default is True.
+
+    Example:
+        Using a cache of at most 50 GB on the scratch disk of a batch node for all instruments:
+
+        >>> from BCO import settings
+        >>> settings.set_download_cache("/scratch/bco_downloads", maxsize=50e9)
+
+        Or directly:
+
+        >>> from BCO.tools.download import DownloadCache
+        >>> cache = DownloadCache()
+        >>> paths = cache.fetch(["/A_Cloud_base_heights/CEILO__B__201803.nc"])
+        >>> cache.release(paths)
+    """
+
+    def __init__(self, directory=None, maxsize=20e9, verbose=True):
+        if directory is None:
+            directory = os.path.join(os.path.expanduser("~"), ".bco_downloads")
+
+        self.directory = directory
+        self.maxsize = maxsize
+        self.verbose = verbose
+        os.makedirs(os.path.join(directory, ".locks"), exist_ok=True)
+
+    def fetch(self, files):
+        """
+        Get local copies of files on the FTP-server. Files which are not in the cache yet (or changed on the server)
+        are downloaded with the DownloadManager. Every copy gets a reference of this process until release().
+
+        Args:
+            files: List of the paths of the files on the FTP-server. Wildcards are matched in the directory listing
+                   (see BCO.tools.listing). Duplicates are fetched only once.
+
+        Returns:
+            List with the local paths of the files, in the order of the input (without duplicates).
+
+        Raises:
+            IOError: if some files could not be downloaded.
+        """
+        files = list(_unique(self._resolve(files)))
+        paths = [self._localPath(file) for file in files]
+        if not files:
+            return []
+
+        pid = str(os.getpid())
+        with self._index() as index:
+            now = time.time()
+            for file in files:
+                entry = index.setdefault(file, {"size": None, "used": now, "refs": {}})
+                entry["used"] = now
+                entry["refs"][pid] = entry["refs"].get(pid, 0) + 1  # protects the file from eviction
+
+        folders = [os.path.dirname(path) for path in paths]
+        try:
+            for folder in set(folders):
+                os.makedirs(folder, exist_ok=True)
+            with self._locked(files):  # other processes wait until the files are complete
+                DownloadManager(verbose=self.verbose).download(files, folders)
+        except BaseException:
+            self.release(paths)
+            raise
+
+        with self._index() as index:
+            for file, path in zip(files, paths):
+                if file in index and os.path.isfile(path):
+                    index[file]["size"] = os.path.getsize(path)
+            self._evict(index)
+
+        return paths
+
+    def release(self, paths):
+        """
+        Removes one reference of this process from every copy, so they can be evicted.
+
+        Args:
+            paths: List of local paths, as returned by fetch(). Duplicates remove several references.
+        """
+        counts = collections.Counter(paths)
+        pid = str(os.getpid())
+        with self._index() as index:
+            for file, entry in index.items():
+                count = counts.get(self._localPath(file), 0)
+                if count and pid in entry["refs"]:
+                    entry["refs"][pid] -= count
+                    if entry["refs"][pid] <= 0:
+                        del entry["refs"][pid]
+            self._evict(index)
+
+    def __contains__(self, file):
+        return os.path.isfile(self._localPath(file))
+
+    def size(self):
+        """
+        Returns:
+            Size of all copies in the cache in bytes.
+        """
+        with self._index() as index:
+            return sum(entry["size"] or 0 for entry in index.values())
+
+    def clear(self):
+        """
+        Removes all copies from the cache, which are not referenced by a running process.
+        """
+        with self._index() as index:
+            for file in [file for file, entry in index.items() if not _liveRefs(entry)]:
+                _remove(self._localPath(file))
+                del index[file]
+
+    def _resolve(self, files):
+        """
+        Replaces names with wildcards by the first matching file of the directory listing.
+        """
+        from BCO.tools import tools
+
+        for file in files:
+            if any(char in file for char in "*?["):
+                with tools.getFTPPool().connection() as ftp:
+                    matches = tools.getFTPListings().match(ftp, file)
+                if not matches:
+                    raise IOError("No file on the FTP-server matches %s" % file)
+                file = matches[0]
+            yield file
+
+    def _localPath(self, file):
+        return os.path.join(self.directory, *file.strip("/").split("/"))
+
+    @contextlib.contextmanager
+    def _index(self):
+        """
+        Loads the index under its lock and writes it back atomically after the block.
+        """
+        path = os.path.join(self.directory, _INDEX)
+        with _lock(os.path.join(self.directory, ".locks", "index")):
+            try:
+                with open(path, "r") as f:
+                    index = json.load(f)
+            except (IOError, OSError, ValueError):
+                index = {}
+            yield index
+            with open(path + ".part", "w") as f:
+                json.dump(index, f)
+            os.replace(path + ".part", path)
+
+    @contextlib.contextmanager
+    def _locked(self, files):
+        """
+        Locks the downloads of files. The files are spread over a fixed number of lock files, which are always
+        locked in the same order, so two processes can not wait for each other.
+        """
+        slots = sorted(set(zlib.crc32(file.encode("utf8")) % _LOCK_SLOTS for file in files))
+        with contextlib.ExitStack() as stack:
+            for slot in slots:
+                stack.enter_context(_lock(os.path.join(self.directory, ".locks", str(slot))))
+            yield
+
+    def _evict(self, index):
+        """
+        Removes the least recently used copies without references, until the cache is smaller than maxsize.
+        References of processes which ended and entries of copies which were removed from the disk are dropped.
+        """
+        for entry in index.values():
+            entry["refs"] = dict((pid, count) for pid, count in entry["refs"].items() if _isLive(pid, count))
+
+        for file in [file for file, entry in index.items()
+                     if not _liveRefs(entry) and not os.path.isfile(self._localPath(file))]:
+            del index[file]
+
+        if self.maxsize is None:
+            return
+
+        total = sum(entry["size"] or 0 for entry in index.values())
+        for file, entry in sorted(index.items(), key=lambda item: item[1]["used"]):
+            if total <= self.maxsize:
+                break
+            if _liveRefs(entry):
+                continue
+            _remove(self._localPath(file))
+            total -= entry["size"] or 0
+            del index[file]
+
+
+_thread_locks = collections.defaultdict(threading.Lock)
+_thread_locks_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _lock(path):
+    """
+    Exclusive lock on a file, which is held by one thread of one process at a time.
+    """
+    with _thread_locks_lock:
+        thread_lock = _thread_locks[path]
+
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(path, "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _liveRefs(entry):
+    """
+    Checks if a copy is referenced by a process which is still running. References of other processes are only
+    checked on POSIX systems.
+    """
+    return any(_isLive(pid, count) for pid, count in entry["refs"].items())
+
+
+def _isLive(pid, count):
+    return count > 0 and (int(pid) == os.getpid() or _isRunning(int(pid)))
+
+
+def _isRunning(pid):
+    if os.name != "posix":
+        return False
+    try:
+        os.kill(pid, 0)
+    except OSError as error:
+        return error.errno == errno.EPERM
+    return True
+
+
+class _Throttle(object):
+    """
+    Limits the rate of the downloads of several threads together. Every block books its transfer time at the given
+    rate, and the thread sleeps until the booked time is reached.
+    """
+
+    def __init__(self, rate):
+        self.rate = float(rate)
+        self._next = time.time()
+        self._lock = threading.Lock()
+
+    def wait(self, size):
+        with self._lock:
+            now = time.time()
+            self._next = max(self._next, now) + size / self.rate
+            delay = self._next - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _remoteStat(ftp, file, cached=True):
+    """
+    Get size and modification time of a file on the server. They are taken from the directory listing, if it
+    contains them, or asked from the server with SIZE and MDTM.
+
+    Returns:
+        Tuple (size, mtime), both can be None if the server does not tell.
+    """
+    from BCO.tools import tools
+    from BCO.tools.listing import _parseTime
+
+    size, mtime = None, None
+    if cached:
+        size, mtime = tools.getFTPListings().stat(ftp, file) or (None, None)
+
+    if size is None:
+        try:
+            ftp.voidcmd("TYPE I")
+            size = ftp.size(file)
+        except ftplib.error_perm:
+            pass
+    if mtime is None:
+        try:
+            mtime = _parseTime(ftp.sendcmd("MDTM " + file)[4:].strip())
+        except (ftplib.error_perm, ValueError):
+            pass
+    return size, mtime
+
+
+def _isComplete(path, size, mtime):
+    """
+    Checks if a local file is a complete copy of the file on the server.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if size is not None and stat.st_size != size:
+        return False
+    return mtime is None or stat.st_mtime >= mtime - 1
+
+
+def _unique(items):
+    """
+    Yields the items without duplicates, keeping their order.
+    """
+    seen = set()
+    for item in items:
+        if item not in seen:
+            seen.add(item)
+            yield item
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
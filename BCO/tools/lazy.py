@@ -0,0 +1,185 @@
+"""
+This module contains the LazyArray, an array-like object which only reads data from the netCDF files when it is
+sliced.
+
+>>> from BCO.tools.lazy import LazyArray
+
+"""
+
+import numpy as np
+
+__all__ = [
+    'LazyArray'
+]
+
+
+class LazyArray(object):
+    """
+    Array-like view of one variable over the whole timeframe of an instrument instance. No data is read until the
+    LazyArray is sliced. Slicing reads only the files and the parts of them which are needed.
+
+    Usually you get a LazyArray from a getter of an instrument with lazy=True.
+
+    Args:
+        device: An initiated instrument object, e.g. BCO.Instruments.Radar.
+        value: String which is a valid key for the Dataset.variables[key].
+        gates: Optional slice of the range-gates. The LazyArray then only contains these range-gates.
+
+    Attributes:
+        shape: Tuple: shape of the whole variable over the timeframe.
+        dtype: numpy dtype of the variable.
+        ndim: Integer: Number of dimensions.
+
+    Example:
+        Reading just the first 100 timesteps of the lowest 120 range-gates of a month of reflectivity:
+
+        >>> coral = Radar(start="20170101", end="20170131", device="CORAL")
+        >>> ref = coral.getReflectivity(lazy=True)
+        >>> ref.shape
+        (267840, 600)
+        >>> ref[:100, :120]
+        array([[...]], dtype=float32)
+    """
+
+    def __init__(self, device, value, gates=None):
+        self._device = device
+        self._value = value
+        self._gates = gates
+        self._plan = device._getReadPlan()
+        self._offsets = np.cumsum([0] + [_end - _start for _date, _start, _end in self._plan])
+
+        var = device._getNc(self._plan[0][0]).variables[value]
+        if var.dimensions[:1] != ("time",):
+            raise ValueError("%s has no time-dimension. Use the getter without lazy=True." % value)
+
+        self._dimensions = var.dimensions
+        self._sizes = var.shape
+        self.dtype = var[0:0].dtype
+        self.shape = (int(self._offsets[-1]),) + tuple(
+            len(range(n)[gates]) if dim == "range" and gates is not None else n
+            for dim, n in zip(var.dimensions[1:], var.shape[1:]))
+        self.ndim = len(self.shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return "LazyArray(%s, shape=%s, dtype=%s)" % (self._value, self.shape, self.dtype)
+
+    def __array__(self, dtype=None, copy=None):
+        data = self[:]
+        if dtype is not None:
+            data = data.astype(dtype)
+        return np.asarray(data)
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        time_key, rest = key[0], key[1:]
+
+        if time_key is Ellipsis:
+            time_key, rest = slice(None), (Ellipsis,) + rest
+
+        if isinstance(time_key, (int, np.integer)):
+            if time_key < 0:
+                time_key += self.shape[0]
+            if not 0 <= time_key < self.shape[0]:
+                raise IndexError("index %i is out of bounds for axis 0 with size %i" % (time_key, self.shape[0]))
+            i_file = np.searchsorted(self._offsets, time_key, side="right") - 1
+            return self._read(i_file, time_key - self._offsets[i_file], rest)
+
+        if isinstance(time_key, slice):
+            _start, _stop, _step = time_key.indices(self.shape[0])
+            if _step < 0:  # read forwards and turn around afterwards
+                indices = np.arange(_start, _stop, _step)
+                if len(indices) == 0:
+                    return self._empty(rest)
+                return self[(slice(indices[-1], indices[0] + 1, -_step),) + rest][::-1]
+            indices = None
+        else:
+            indices = np.asarray(time_key)
+            if indices.dtype == bool:
+                if indices.shape != (self.shape[0],):
+                    raise IndexError("boolean index of shape %s does not match axis 0 with size %i"
+                                     % (indices.shape, self.shape[0]))
+                indices = np.nonzero(indices)[0]
+            indices = np.where(indices < 0, indices + self.shape[0], indices)
+            outside = (indices < 0) | (indices >= self.shape[0])
+            if np.any(outside):
+                raise IndexError("index %i is out of bounds for axis 0 with size %i"
+                                 % (np.asarray(time_key)[outside][0], self.shape[0]))
+            order = np.argsort(indices, kind="stable")
+            indices = indices[order]  # the files are read in order
+
+        pieces = []
+        for i_file in range(len(self._plan)):
+            file_start, file_stop = self._offsets[i_file], self._offsets[i_file + 1]
+
+            if indices is None:
+                first = max(_start, file_start)
+                first += (_start - first) % _step  # the first index of the slice inside this file
+                last = min(_stop, file_stop)
+                if first >= last:
+                    continue
+                local_key = slice(first - file_start, last - file_start, _step)
+            else:
+                local_key = indices[(indices >= file_start) & (indices < file_stop)] - file_start
+                if len(local_key) == 0:
+                    continue
+
+            pieces.append(self._read(i_file, local_key, rest))
+
+        if not pieces:
+            return self._empty(rest)
+        if indices is not None and np.any(np.diff(order) < 0):
+            # bring the data back into the order of the indices:
+            return np.ma.concatenate(pieces)[np.argsort(order)]
+        return np.ma.concatenate(pieces)
+
+    def _read(self, i_file, local_key, rest):
+        """
+        Reads a hyperslab from one file. local_key is the index along the time-dimension relative to the start of
+        the timeframe in that file.
+        """
+        _date, _start, _end = self._plan[i_file]
+        if isinstance(local_key, slice):
+            local_key = slice(local_key.start + _start, local_key.stop + _start, local_key.step)
+        else:
+            local_key = local_key + _start
+
+        var = self._device._getNc(_date).variables[self._value]
+        return var[(local_key,) + self._getRest(rest)]
+
+    def _getRest(self, rest):
+        """
+        Builds the index of the dimensions after the time-dimension. If only some range-gates are used, the index
+        of the range-dimension is translated to the range-gates of the file.
+        """
+        rest = tuple(rest)
+        if self._gates is None:
+            return rest
+
+        if Ellipsis in rest:
+            i = rest.index(Ellipsis)
+            rest = rest[:i] + (slice(None),) * (self.ndim - len(rest)) + rest[i + 1:]
+        rest = rest + (slice(None),) * (self.ndim - 1 - len(rest))
+
+        index = []
+        for dim, n, key in zip(self._dimensions[1:], self._sizes[1:], rest):
+            if dim == "range":
+                gated = range(n)[self._gates]
+                if isinstance(key, slice):
+                    gated = gated[key]
+                    key = slice(gated.start, gated.stop if gated.stop >= 0 else None, gated.step)
+                elif isinstance(key, (int, np.integer)):
+                    key = gated[key]
+                else:
+                    key = np.asarray(gated)[key]
+            index.append(key)
+        return tuple(index)
+
+    def _empty(self, rest):
+        """
+        Returns an empty selection with the right trailing dimensions.
+        """
+        return self._read(0, slice(0, 0, 1), rest)
@@ -0,0 +1,169 @@
+"""
+This module contains a cache of the directory listings of the FTP-server, so the files of a timeframe can be found
+without asking the server for every single file.
+
+>>> from BCO.tools.listing import ListingCache
+
+"""
+
+import time
+import ftplib
+import fnmatch
+import calendar
+import posixpath
+import threading
+
+__all__ = [
+    'ListingCache'
+]
+
+
+class ListingCache(object):
+    """
+    Cache of the directory listings of the FTP-server. Every directory is listed once with MLSD (or NLST, if the
+    server does not support MLSD), including the sizes and modification times of the files. File names with
+    wildcards are then matched locally with fnmatch. The listings expire after ttl seconds, so new files on the
+    server are found again.
+
+    Args:
+        ttl: Seconds after which a listing is fetched again. Default is 300. None means never.
+
+    Example:
+        >>> from BCO.tools.listing import ListingCache
+        >>> listings = ListingCache(ttl=600)
+        >>> with getFTPPool().connection() as ftp:
+        >>>     listings.match(ftp, "/B_Reflectivity/Version_2/MMCR__MBR*__Spectral_Moments*180123.nc")
+        ['/B_Reflectivity/Version_2/MMCR__MBR__Spectral_Moments__10s__155m-25km__180123.nc']
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.requests = 0  # number of listings fetched from the server
+        self._listings = {}  # directory -> (time of the listing, {name: (size, mtime)}, [subdirectories])
+        self._lock = threading.Lock()
+
+    def listdir(self, ftp, directory):
+        """
+        Get the files of a directory on the server.
+
+        Args:
+            ftp: ftplib.FTP object, used if the listing needs to be fetched.
+            directory: String: Path of the directory on the server.
+
+        Returns:
+            Dictionary with the names of the files as keys and tuples (size in bytes, modification time in seconds
+            since 1970) as values. Both are None if the server did not provide them. Missing directories are empty.
+        """
+        return self._getListing(ftp, directory)[0]
+
+    def listdirs(self, ftp, directory):
+        """
+        Get the subdirectories of a directory on the server. They are only known if the server supports MLSD.
+
+        Args:
+            ftp: ftplib.FTP object, used if the listing needs to be fetched.
+            directory: String: Path of the directory on the server.
+
+        Returns:
+            Sorted list of the names of the subdirectories.
+        """
+        return self._getListing(ftp, directory)[1]
+
+    def match(self, ftp, pattern):
+        """
+        Get the paths of all files matching a pattern. Only the file name may contain wildcards.
+
+        Args:
+            ftp: ftplib.FTP object, used if the listing needs to be fetched.
+            pattern: String: Path of the file(s) on the server, like ftplib.FTP.nlst() takes it.
+
+        Returns:
+            Sorted list of the paths on the server.
+        """
+        directory, name = posixpath.split(pattern)
+        if any(char in directory for char in "*?["):  # can not be answered from one listing
+            return sorted(ftp.nlst(pattern))
+
+        files = self.listdir(ftp, directory)
+        return [posixpath.join(directory, _name) for _name in sorted(fnmatch.filter(files, name))]
+
+    def stat(self, ftp, path):
+        """
+        Get the size and modification time of a file from the listing of its directory.
+
+        Returns:
+            Tuple (size, mtime) or None, if the file does not exist.
+        """
+        directory, name = posixpath.split(path)
+        return self.listdir(ftp, directory).get(name)
+
+    def _getListing(self, ftp, directory):
+        """
+        Returns:
+            Tuple ({name: (size, mtime)}, [subdirectories]) of a directory, fetched if it is not cached or expired.
+        """
+        directory = _normalize(directory)
+        with self._lock:
+            entry = self._listings.get(directory)
+        if entry is not None and (self.ttl is None or time.time() - entry[0] < self.ttl):
+            return entry[1:]
+
+        files, directories = _fetch(ftp, directory)
+        with self._lock:
+            self.requests += 1
+            self._listings[directory] = (time.time(), files, directories)
+        return files, directories
+
+    def clear(self):
+        """
+        Removes all listings, so they are fetched again.
+        """
+        with self._lock:
+            self._listings = {}
+
+
+def _normalize(directory):
+    return directory.rstrip("/") or "/"
+
+
+def _fetch(ftp, directory):
+    """
+    Lists a directory with MLSD, or with NLST if the server does not support MLSD.
+
+    Returns:
+        Tuple ({name: (size, mtime)}, [subdirectories]). With NLST, all entries are taken as files.
+    """
+    files, directories = {}, []
+    try:
+        for name, facts in ftp.mlsd(directory, facts=["type", "size", "modify"]):
+            kind = facts.get("type", "file")
+            if kind == "dir":
+                directories.append(name)
+            if kind != "file":
+                continue
+            size = int(facts["size"]) if "size" in facts else None
+            files[name] = (size, _parseTime(facts.get("modify")))
+        return files, sorted(directories)
+    except ftplib.error_perm as error:
+        if str(error).startswith("550"):  # the directory does not exist
+            return files, directories
+        # 500/502: MLSD is not supported by the server
+
+    try:
+        for path in ftp.nlst(directory):
+            files[posixpath.basename(path)] = (None, None)
+    except ftplib.error_perm:
+        pass
+    return files, directories
+
+
+def _parseTime(value):
+    """
+    Converts a time-stamp of MLSD (YYYYMMDDHHMMSS[.sss], UTC) to seconds since 1970.
+    """
+    if not value:
+        return None
+    seconds = calendar.timegm(time.strptime(value[:14], "%Y%m%d%H%M%S"))
+    if len(value) > 15:
+        seconds += float("0" + value[14:])
+    return float(seconds)
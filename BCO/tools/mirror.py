@@ -0,0 +1,264 @@
+"""
+This module contains an incremental mirror of the FTP-server: the directory trees of the instruments are copied to
+a local folder, and later runs only transfer the files which are new or changed. It is installed as the command
+bco-mirror.
+
+>>> from BCO.tools.mirror import mirror
+
+"""
+
+import os
+import sys
+import json
+import time
+import ftplib
+import argparse
+import posixpath
+
+import BCO
+
+__all__ = [
+    'mirror',
+    'getRoots',
+    'main'
+]
+
+MANIFEST = ".bco-mirror.json"
+
+_UNITS = {"K": 1e3, "M": 1e6, "G": 1e9}
+
+
+def getRoots(devices=None):
+    """
+    Get the directories on the FTP-server which hold the files of instruments. They are the FTP_PATH entries of
+    settings.ini, cut before the first part with a date (like %Y%m/). Directories inside of other ones are dropped.
+
+    Args:
+        devices: List of the names of the sections in settings.ini (e.g. ["WINDLIDAR", "CEILOMETER"]). Default is
+                 all sections with a FTP_PATH.
+
+    Returns:
+        Sorted list of the directories.
+
+    Example:
+        >>> getRoots(["WINDLIDAR", "CORAL"])
+        ['/B_Reflectivity/Ka-Band/10s/', '/L_Vertical_velocity/Version1.01/']
+    """
+    if devices is None:
+        devices = [section for section in BCO.config.sections() if "FTP_PATH" in BCO.config[section]]
+
+    roots = []
+    for device in devices:
+        section = device.upper()
+        if section not in BCO.config or "FTP_PATH" not in BCO.config[section]:
+            raise ValueError("%s has no FTP_PATH in settings.ini." % device)
+        parts = BCO.config[section]["FTP_PATH"].split("/")
+        while parts and "%" in "/".join(parts):
+            parts = parts[:-1]
+        root = posixpath.normpath("/".join(parts)).strip("/")
+        roots.append("/" + root + "/" if root not in ["", "."] else "/")
+
+    result = []
+    for root in sorted(set(roots)):
+        if not any(root.startswith(other) for other in result):
+            result.append(root)
+    return result
+
+
+def mirror(output_folder, devices=None, connections=None, bandwidth=None, manifest=None, verify=False,
+           dry_run=False, verbose=True):
+    """
+    Mirrors the directories of instruments from the FTP-server into a local folder. The files keep their path of
+    the server below the output folder.
+
+    The directory trees are listed over several connections at once (one MLSD per directory). A file is transferred
+    if its size or modification time on the server differ from the local copy. The state of the last run is kept in
+    a manifest (a json file in the output folder), so files which did not change are recognized without looking at
+    the local copies. With verify=True the local copies are checked anyway. Files are downloaded in parallel with
+    the BCO.tools.download.DownloadManager, so interrupted files are resumed by the next run.
+
+    Args:
+        output_folder: String: Local folder of the mirror.
+        devices: List of the names of the sections in settings.ini. Default is all instruments (see getRoots()).
+        connections: Integer: Number of parallel connections. Default is the size of the pool of FTP-connections.
+        bandwidth: Maximum download rate in bytes per second. Default is None (no limit).
+        manifest: String: Path of the manifest. Default is ".bco-mirror.json" in the output folder.
+        verify: Boolean: Compare the local copies with the server even if the manifest says they are up to date.
+        dry_run: Boolean: Only print which files would be transferred.
+        verbose: Boolean: Print the progress.
+
+    Returns:
+        List of the local paths of the transferred files (of the files to transfer for dry_run).
+
+    Raises:
+        IOError: if some files could not be downloaded. The manifest is saved before, so the next run only
+                 transfers the missing files.
+
+    Example:
+        >>> from BCO import settings
+        >>> from BCO.tools.mirror import mirror
+        >>> settings.path_to_ftp_file("/home/wherever/myinfos.txt")
+        >>> mirror("/scratch/wherever/BCO/", devices=["WINDLIDAR", "CEILOMETER"], bandwidth=10e6)
+    """
+    from BCO.tools.download import DownloadManager, _isComplete
+
+    manifest = manifest or os.path.join(output_folder, MANIFEST)
+    known = _loadManifest(manifest)
+
+    t0 = time.time()
+    remote = _walk(getRoots(devices), connections)
+
+    state, files, folders = {}, [], []
+    for path, (size, mtime) in sorted(remote.items()):
+        local = _localPath(output_folder, path)
+        entry = [size, mtime]
+        unchanged = not verify and None not in entry and known.get(path) == entry
+        if unchanged or _isComplete(local, size, mtime):
+            state[path] = entry
+        else:
+            files.append(path)
+            folders.append(os.path.dirname(local))
+
+    if verbose:
+        print("Listed %i files in %.1f s, %i of them are new or changed" %
+              (len(remote), time.time() - t0, len(files)))
+
+    if dry_run:
+        for path in files:
+            print(path)
+        return [_localPath(output_folder, path) for path in files]
+
+    if not files:
+        _saveManifest(manifest, state)
+        return []
+
+    for folder in set(folders):
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+
+    manager = DownloadManager(connections=connections, verbose=verbose, bandwidth=bandwidth)
+    try:
+        manager.download(files, folders)
+    finally:
+        for path in files:
+            size, mtime = remote[path]
+            if _isComplete(_localPath(output_folder, path), size, mtime):
+                state[path] = [size, mtime]
+        _saveManifest(manifest, state)
+
+    return [_localPath(output_folder, path) for path in files]
+
+
+def main(args=None):
+    """
+    Entry point of the command bco-mirror. See "bco-mirror --help".
+    """
+    parser = argparse.ArgumentParser(prog="bco-mirror",
+                                     description="Mirror the BCO data from the FTP-server into a local folder. Only "
+                                                 "new or changed files are transferred.")
+    parser.add_argument("output_folder", help="local folder of the mirror")
+    parser.add_argument("devices", nargs="*", metavar="INSTRUMENT",
+                        help="sections of settings.ini to mirror, e.g. WINDLIDAR (default: all)")
+    parser.add_argument("-f", "--ftp-file", help="file with the username and password (see "
+                                                 "BCO.settings.path_to_ftp_file)")
+    parser.add_argument("-c", "--connections", type=int, help="number of parallel connections")
+    parser.add_argument("-b", "--bandwidth", type=_parseRate,
+                        help="maximum download rate in bytes per second, with K, M or G as suffix, e.g. 5M")
+    parser.add_argument("-m", "--manifest", help="path of the manifest (default: OUTPUT_FOLDER/%s)" % MANIFEST)
+    parser.add_argument("--verify", action="store_true", help="check all local copies, not just the manifest")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="only print the files to transfer")
+    parser.add_argument("-q", "--quiet", action="store_true", help="print nothing but errors")
+    args = getattr(parser, "parse_intermixed_args", parser.parse_args)(args)  # options between the instruments
+
+    if args.ftp_file:
+        BCO.settings.path_to_ftp_file(args.ftp_file, verbose=not args.quiet)
+    if BCO.FTP_USER is None or BCO.FTP_PASSWD is None:
+        parser.error("no username and password for the FTP-server, please provide them with --ftp-file.")
+
+    if args.connections is not None:
+        BCO.settings.set_ftp_pool(max(args.connections, 1))
+
+    try:
+        mirror(args.output_folder, devices=args.devices or None, connections=args.connections,
+               bandwidth=args.bandwidth, manifest=args.manifest, verify=args.verify, dry_run=args.dry_run,
+               verbose=not args.quiet)
+    except (IOError, ftplib.Error, ValueError) as error:
+        print(error, file=sys.stderr)
+        return 1
+    return 0
+
+
+def _walk(roots, connections=None):
+    """
+    Lists the directory trees below the roots. Every level of the trees is listed over parallel connections.
+
+    Returns:
+        Dictionary with the paths of the files as keys and tuples (size, mtime) as values.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from BCO.tools import tools
+
+    pool = tools.getFTPPool()
+    listings = tools.getFTPListings()
+
+    def _list(directory):
+        with pool.connection() as ftp:
+            return directory, listings.listdir(ftp, directory), listings.listdirs(ftp, directory)
+
+    files, pending = {}, list(roots)
+    with ThreadPoolExecutor(max_workers=connections or pool.maxsize) as executor:
+        while pending:
+            level, pending = pending, []
+            for directory, names, directories in executor.map(_list, level):
+                for name, stat in names.items():
+                    files[posixpath.join(directory, name)] = stat
+                pending += [posixpath.join(directory, name) for name in directories]
+    return files
+
+
+def _localPath(output_folder, path):
+    return os.path.join(output_folder, *path.strip("/").split("/"))
+
+
+def _loadManifest(path):
+    """
+    Returns:
+        Dictionary {path on the server: [size, mtime]} of the last run. Empty if there is no (readable) manifest.
+    """
+    try:
+        with open(path, "r") as f:
+            return json.load(f).get("files", {})
+    except (IOError, OSError, ValueError, AttributeError):
+        return {}
+
+
+def _saveManifest(path, files):
+    """
+    Writes the manifest atomically, so an interrupted run never leaves a broken one.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    with open(path + ".part", "w") as f:
+        json.dump({"server": BCO.FTP_SERVER, "updated": time.time(), "files": files}, f, indent=0, sort_keys=True)
+    os.replace(path + ".part", path)
+
+
+def _parseRate(value):
+    """
+    Converts a rate like "500K" or "2.5M" to bytes per second.
+    """
+    text, factor = value.strip().upper(), 1
+    if text[-1:] in _UNITS:
+        text, factor = text[:-1], _UNITS[text[-1]]
+    try:
+        rate = float(text) * factor
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid rate: %s" % value)
+    if rate <= 0:
+        raise argparse.ArgumentTypeError("the rate needs to be positive: %s" % value)
+    return rate
+
+
+if __name__ == "__main__":
+    sys.exit(main())
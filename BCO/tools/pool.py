@@ -0,0 +1,296 @@
+"""
+This module contains pools for reusing open resources, like netCDF Datasets and FTP-connections.
+
+>>> from BCO.tools.pool import DatasetPool, FTPPool
+
+"""
+
+import os
+import time
+import socket
+import ftplib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+__all__ = [
+    'DatasetPool',
+    'FTPPool'
+]
+
+
+# Errors after which the state of a FTP-connection is unknown. Error replies of the server (e.g. "550 No such file")
+# leave the connection usable.
+_BROKEN = (OSError, EOFError, ftplib.error_reply, ftplib.error_proto, KeyboardInterrupt)
+
+
+class DatasetPool(object):
+    """
+    A bounded pool of open netCDF Datasets. The Datasets are identified by their path and modification time,
+    so a file which changed on disk will be opened again. If the pool is full, the least recently used Dataset
+    will be closed.
+
+    Datasets from the pool must not be closed by the user, this is done by the pool.
+
+    Args:
+        maxsize: Integer: Maximum number of open Datasets.
+
+    Example:
+        >>> pool = DatasetPool(maxsize=4)
+        >>> nc = pool.get("radar_testfile.nc.bz2")
+        >>> reflectivity = nc.variables["Zf"][:]
+        >>> pool.close()
+    """
+
+    def __init__(self, maxsize=4):
+        self.maxsize = maxsize
+        self._datasets = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, path):
+        """
+        Get the open Dataset of a file. If it is not open yet, it will be opened.
+
+        Args:
+            path: String: Path to the .nc or .nc.bz2 file.
+
+        Returns:
+            netCDF4.Dataset of the file.
+        """
+        key = (path, os.path.getmtime(path))
+
+        with self._lock:
+            if key in self._datasets:
+                nc = self._datasets.pop(key)
+                self._datasets[key] = nc  # move to the end (most recently used)
+                return nc
+
+            # the file changed on disk:
+            closing = [self._datasets.pop(old_key) for old_key in [k for k in self._datasets if k[0] == path]]
+        _closeAll(closing)
+
+        nc = self._open(path)  # without the lock, other threads can use the pool during the decompression
+
+        closing = []
+        with self._lock:
+            if key in self._datasets:  # opened by another thread in the meantime
+                closing.append(nc)
+                nc = self._datasets.pop(key)
+            self._datasets[key] = nc
+            while len(self._datasets) > self.maxsize:
+                closing.append(self._datasets.popitem(last=False)[1])
+        _closeAll(closing)
+
+        return nc
+
+    def close(self):
+        """
+        Closes all Datasets of the pool.
+        """
+        with self._lock:
+            closing = list(self._datasets.values())
+            self._datasets.clear()
+        _closeAll(closing)
+
+    def __len__(self):
+        return len(self._datasets)
+
+    @staticmethod
+    def _open(path, workers=None):
+        """
+        Opens the file as netCDF4.Dataset. netCDF-3 files are opened as BCO.tools.classic.ClassicDataset.
+        workers is the number of threads for the decompression of .bz2 files (see BCO.tools.tools.bz2Dataset()).
+        """
+        from netCDF4 import Dataset
+        from BCO.tools import tools
+        from BCO.tools.classic import ClassicDataset, isClassic
+
+        if "bz2" in path[-5:]:
+            return tools.bz2Dataset(path, workers=workers)
+        if isClassic(path):
+            return ClassicDataset(path)
+        with tools.netcdf_lock:
+            return Dataset(path)
+
+
+class FTPPool(object):
+    """
+    A bounded pool of logged-in connections to the FTP-server. Logging in takes a while, so the connections are
+    reused by all file lookups and downloads of the process instead of logging in every time.
+
+    Connections which were idle for more than keepalive seconds are checked with a NOOP before they are handed out
+    and replaced if the server closed them. Connections which broke during their use are not put back. At most
+    maxsize connections are open at the same time, further threads wait until a connection is returned. A thread
+    which already borrowed a connection gets the same one again, so nested calls do not need a second connection.
+
+    Server and login are taken from BCO.FTP_SERVER, BCO.FTP_USER and BCO.FTP_PASSWD when a connection is opened.
+    If they change, the old connections are closed.
+
+    Args:
+        maxsize: Integer: Maximum number of open connections. Default is 4.
+        keepalive: Seconds after which idle connections are checked before they are used. Default is 30.
+        timeout: Timeout of the connections in seconds. Default is 600.
+
+    Example:
+        >>> pool = FTPPool(maxsize=2)
+        >>> with pool.connection() as ftp:
+        >>>     files = ftp.nlst("/B_Reflectivity/Version_2/")
+        >>> pool.close()
+    """
+
+    def __init__(self, maxsize=4, keepalive=30, timeout=600):
+        self.maxsize = maxsize
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self.logins = 0  # number of logins, i.e. of opened connections
+        self._idle = []  # tuples (connection, login, time of the last use)
+        self._borrowed = 0
+        self._condition = threading.Condition()
+        self._local = threading.local()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrows a connection from the pool and returns it afterwards.
+
+        Yields:
+            ftplib.FTP object, which is logged in.
+        """
+        held = getattr(self._local, "held", None)
+        if held is not None:
+            yield held[0]
+            return
+
+        ftp, login = self._acquire()
+        self._local.held = (ftp, login)
+        broken = False
+        try:
+            yield ftp
+        except _BROKEN:
+            broken = True
+            raise
+        finally:
+            self._local.held = None
+            self._release(ftp, login, broken)
+
+    def close(self):
+        """
+        Closes all idle connections of the pool. Borrowed connections are closed when they are returned.
+        """
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for ftp, login, used in idle:
+            _quit(ftp)
+
+    def __len__(self):
+        return self._borrowed + len(self._idle)
+
+    def _acquire(self):
+        """
+        Takes an idle connection or opens a new one, waiting if maxsize connections are in use.
+        """
+        import BCO
+
+        login = (BCO.FTP_SERVER, BCO.FTP_USER, BCO.FTP_PASSWD)
+        with self._condition:
+            while True:
+                entry = None
+                while self._idle:
+                    entry = self._idle.pop()  # the most recently used connection
+                    if entry[1] == login:
+                        break
+                    entry[0].close()  # login changed
+                    entry = None
+
+                if entry is not None or self._borrowed < self.maxsize:
+                    self._borrowed += 1
+                    break
+                self._condition.wait()
+
+        try:
+            ftp = None
+            if entry is not None:
+                ftp = entry[0]
+                if time.time() - entry[2] > self.keepalive and not _isAlive(ftp):
+                    ftp.close()
+                    ftp = None
+            if ftp is None:
+                ftp = self._connect(login)
+        except BaseException:
+            with self._condition:
+                self._borrowed -= 1
+                self._condition.notify()
+            raise
+
+        return ftp, login
+
+    def _release(self, ftp, login, broken=False):
+        with self._condition:
+            self._borrowed -= 1
+            if broken:
+                ftp.close()
+            else:
+                self._idle.append((ftp, login, time.time()))
+            self._condition.notify()
+
+    def _connect(self, login):
+        """
+        Opens and logs in a new connection. TCP keepalive is switched on, so idle connections are not dropped by
+        firewalls.
+        """
+        server, user, passwd = login
+        if not user:
+            print("User and password need to be provided via the BCO.settings.set_ftp() function or by using \n"
+                  "the BCO.settings.path_to_ftp_file() function.")
+        assert user
+        assert passwd
+
+        from BCO.tools.tools import _splitServer
+
+        ftp = ftplib.FTP(timeout=self.timeout)
+        try:
+            ftp.connect(*_splitServer(server))
+            ftp.login(user=user, passwd=passwd)
+            ftp.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        except BaseException:
+            ftp.close()
+            raise
+        self.logins += 1
+        return ftp
+
+
+def _closeAll(datasets):
+    """
+    Closes Datasets. The netCDF-library is not thread-safe, so netCDF4 Datasets are closed under
+    BCO.tools.tools.netcdf_lock, while other threads may read other Datasets under that lock.
+    """
+    from BCO.tools import tools
+    from BCO.tools.classic import ClassicDataset
+
+    for nc in datasets:
+        if isinstance(nc, ClassicDataset):
+            nc.close()
+        else:
+            with tools.netcdf_lock:
+                nc.close()
+
+
+def _isAlive(ftp):
+    """
+    Checks if the server still answers on a connection.
+    """
+    try:
+        ftp.voidcmd("NOOP")
+        return True
+    except ftplib.all_errors:
+        return False
+
+
+def _quit(ftp):
+    """
+    Closes a connection politely, or just closes it, if the server does not answer.
+    """
+    try:
+        ftp.quit()
+    except ftplib.all_errors:
+        ftp.close()
@@ -0,0 +1,428 @@
+"""
+This module contains the archive store: the files of an instrument compacted into one raw binary file per variable,
+which can be memory-mapped. Reading from a store needs no decompression, no decoding and no copying.
+
+>>> from BCO.tools.store import Store, buildStore
+
+"""
+
+import os
+import json
+
+import numpy as np
+
+import BCO
+
+__all__ = [
+    'Store',
+    'buildStore'
+]
+
+_HEADER = "header.json"
+
+
+def buildStore(device, directory, values=None, verbose=True):
+    """
+    Writes all files of the timeframe of an instrument into a store. The whole files are written, not just the
+    timeframe, so the store can be used for any timeframe in between.
+
+    Every variable is stored time-contiguous in "<variable>.dat" (and its mask in "<variable>.mask", if it has
+    masked values). The header "header.json" holds the shapes, dtypes, dimensions and attributes of the variables,
+    the global attributes and where the data of every file starts.
+
+    Args:
+        device: An initiated instrument object, e.g. BCO.Instruments.Radar. Its timeframe determines the files.
+        directory: String: Directory of the store. An existing store in this directory is overwritten.
+        values: List of the variables to store. Default is all variables. "time" and the variables without
+                time-dimension (e.g. "range", "lat", "lon"), which are read by the constructors of the instruments,
+                are always stored.
+        verbose: Boolean: print the progress.
+
+    Returns:
+        BCO.tools.store.Store of the new store.
+
+    Example:
+        Building a store of the CORAL reflectivity and velocity of 2017:
+
+        >>> from BCO.tools.store import buildStore
+        >>> coral = Radar("20170101", "20171231", device="CORAL")
+        >>> buildStore(coral, "/scratch/wherever/coral_2017", values=["Zf", "VEL"])
+
+        Afterwards the store can be used by the instrument:
+
+        >>> coral = Radar("20170301", "20170310", device="CORAL", store="/scratch/wherever/coral_2017")
+        >>> ref = coral.getReflectivity()  # np.memmap-view into the store
+    """
+    os.makedirs(directory, exist_ok=True)
+    if os.path.isfile(os.path.join(directory, _HEADER)):
+        os.remove(os.path.join(directory, _HEADER))  # the store is invalid until it is complete
+
+    header = {"instrument": device._instrument,
+              "data_version": BCO.config[device._instrument]["DATA_VERSION"],
+              "attributes": {},
+              "files": [],
+              "variables": {}}
+    handles = {}
+    n_time = 0
+
+    try:
+        for _date in device._getDates():
+            try:
+                nc = device._getNc(_date)
+            except (IOError, IndexError):
+                if verbose:
+                    print("No file for %s" % _date)
+                continue
+
+            if not header["variables"]:
+                header["attributes"] = _toJson(dict((key, nc.getncattr(key)) for key in nc.ncattrs()))
+                stored = list(values or nc.variables.keys())
+                stored += [value for value, var in nc.variables.items()
+                           if (value == "time" or var.dimensions[:1] != ("time",)) and value not in stored]
+                for value in stored:
+                    _addVariable(header, handles, directory, value, nc.variables[value])
+
+            n = len(nc.dimensions["time"])
+            for value, info in header["variables"].items():
+                if info["dimensions"][:1] == ["time"]:
+                    _appendData(header, handles, directory, value, nc.variables[value][:], n_time)
+
+            header["files"].append([_date.strftime("%Y-%m-%d"), n_time, n])
+            n_time += n
+            if verbose:
+                print("Stored %s (%i timesteps)" % (_date, n))
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+    for info in header["variables"].values():
+        if info["dimensions"][:1] == ["time"]:
+            info["shape"][0] = n_time
+
+    tmp_header = os.path.join(directory, _HEADER + ".tmp")
+    with open(tmp_header, "w") as f:
+        json.dump(header, f, indent=1)
+    os.replace(tmp_header, os.path.join(directory, _HEADER))
+
+    return Store(directory)
+
+
+class Store(object):
+    """
+    Read access to a store written by buildStore(). The variables are memory-mapped, so only the pages which are
+    actually used are read from disk.
+
+    Usually a store is not used directly, but by passing it to an instrument (store=...). The getters of the
+    instrument then return views into the store, which are read-only. Use .copy() to get an array which can
+    be modified.
+
+    Args:
+        directory: String: Directory of the store.
+
+    Attributes:
+        instrument: String: Instrument of the store as in the settings.ini.
+        data_version: String: Data version of the files of the store.
+        attributes: Dictionary with the global attributes of the first file.
+
+    Example:
+        >>> from BCO.tools.store import Store
+        >>> store = Store("/scratch/wherever/coral_2017")
+        >>> store.getArray("Zf").shape
+        (3153600, 600)
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+        try:
+            with open(os.path.join(directory, _HEADER)) as f:
+                header = json.load(f)
+        except (IOError, OSError):
+            raise IOError("%s is not a complete store." % directory)
+
+        self.instrument = header["instrument"]
+        self.data_version = header["data_version"]
+        self.attributes = header["attributes"]
+        self._variables = header["variables"]
+        self._files = dict((_date, (i, offset, n)) for i, (_date, offset, n) in enumerate(header["files"]))
+        self._arrays = {}
+
+    def __contains__(self, date):
+        return self._key(date) in self._files
+
+    def dates(self):
+        """
+        Returns:
+            List of the dates (as strings) of all files in the store.
+        """
+        return sorted(self._files)
+
+    def getArray(self, value):
+        """
+        Get a variable over the whole store.
+
+        Args:
+            value: String: Name of the variable.
+
+        Returns:
+            Read-only masked array with np.memmap as data (and mask).
+        """
+        if value not in self._arrays:
+            if value not in self._variables:
+                raise KeyError("%s is not in the store." % value)
+
+            info = self._variables[value]
+            shape = tuple(info["shape"])
+            path = os.path.join(self.directory, value)
+            data = _memmap(path + ".dat", info["dtype"], shape)
+            mask = _memmap(path + ".mask", bool, shape) if info["masked"] else np.ma.nomask
+            self._arrays[value] = np.ma.MaskedArray(data, mask=mask, copy=False)
+
+        return self._arrays[value]
+
+    def dataset(self, date):
+        """
+        Get a Dataset-like view of the file of one date, which can be used instead of a netCDF4.Dataset.
+
+        Args:
+            date: datetime.date object.
+
+        Returns:
+            StoreDataset
+
+        Raises:
+            IOError: if the file of that date is not in the store.
+        """
+        key = self._key(date)
+        if key not in self._files:
+            raise IOError("There is no file for %s in the store %s." % (key, self.directory))
+
+        i, offset, n = self._files[key]
+        return StoreDataset(self, offset, n)
+
+    def getVariables(self, values, plan, gates=None):
+        """
+        Get the timeframe of a read plan (see __Device._getReadPlan) as views into the store. If the files of the
+        plan follow each other in the store, no data is copied.
+
+        Args:
+            values: List of variable names.
+            plan: List of tuples (date, start, stop).
+            gates: Optional slice of the range-gates.
+
+        Returns:
+            Dictionary with the variable names as keys and masked arrays as values.
+        """
+        pieces = []
+        for _date, _start, _end in plan:
+            i, offset, n = self._files[self._key(_date)]
+            if pieces and pieces[-1][0] + 1 == i and pieces[-1][2] == offset + _start:
+                pieces[-1] = (i, pieces[-1][1], offset + _end)  # continues the previous piece
+            else:
+                pieces.append((i, offset + _start, offset + _end))
+
+        variables = {}
+        for value in values:
+            dimensions = self._variables[value]["dimensions"]
+            array = self.getArray(value)
+
+            if dimensions[:1] != ["time"]:
+                variables[value] = array[_getIndex(dimensions, None, gates)]
+            elif len(pieces) == 1:
+                variables[value] = array[_getIndex(dimensions, slice(pieces[0][1], pieces[0][2]), gates)]
+            else:
+                variables[value] = np.ma.concatenate([array[_getIndex(dimensions, slice(first, last), gates)]
+                                                      for i, first, last in pieces])
+        return variables
+
+    def _key(self, date):
+        """
+        Get the key of the file of a date. For monthly files, this is the first day of the month.
+        """
+        if "%d" not in BCO.config[self.instrument]["NAME_SCHEME"]:
+            date = date.replace(day=1)
+        return date.strftime("%Y-%m-%d")
+
+
+class StoreDataset(object):
+    """
+    The part of a store which belongs to one file. It offers the parts of the netCDF4.Dataset interface which are
+    used by the instruments (variables, dimensions and attributes), so it can be used instead of the Dataset.
+    """
+
+    def __init__(self, store, offset, n):
+        self._store = store
+        self.variables = _StoreVariables((value, StoreVariable(store, value, offset, n)) for value in store._variables)
+        self.variables.directory = store.directory
+        self.dimensions = {}
+        for var in self.variables.values():
+            for dim, size in zip(var.dimensions, var.shape):
+                self.dimensions[dim] = range(size)
+
+    def ncattrs(self):
+        return list(self._store.attributes)
+
+    def getncattr(self, key):
+        return self._store.attributes[key]
+
+    def __getattr__(self, key):
+        if key.startswith("_"):
+            raise AttributeError(key)
+        try:
+            return self._store.attributes[key]
+        except KeyError:
+            raise AttributeError(key)
+
+    def close(self):
+        pass
+
+    def __str__(self):
+        lines = ["<class 'BCO.tools.store.StoreDataset'>", "store: %s" % self._store.directory]
+        lines += ["    %s: %s" % (key, value) for key, value in self._store.attributes.items()]
+        lines.append("    dimensions(sizes): %s" % ", ".join("%s(%i)" % (dim, len(size))
+                                                           for dim, size in self.dimensions.items()))
+        lines.append("    variables: %s" % ", ".join(self.variables))
+        return "\n".join(lines)
+
+
+class _StoreVariables(dict):
+    """
+    The variables of a StoreDataset. Variables which were not stored raise a KeyError which names the store.
+    """
+    directory = None
+
+    def __missing__(self, key):
+        raise KeyError("%s is not in the store %s." % (key, self.directory))
+
+
+class StoreVariable(object):
+    """
+    One variable of a StoreDataset. Slicing it returns a read-only view into the store.
+    """
+
+    def __init__(self, store, value, offset, n):
+        self._store = store
+        self._value = value
+        self._info = store._variables[value]
+        self.dimensions = tuple(self._info["dimensions"])
+        self.dtype = np.dtype(self._info["dtype"])
+        self.shape = tuple(self._info["shape"])
+        self._time = None
+        if self.dimensions[:1] == ("time",):
+            self._time = slice(offset, offset + n)
+            self.shape = (n,) + self.shape[1:]
+        self.ndim = len(self.shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        array = self._store.getArray(self._value)
+        if self._time is not None:
+            array = array[self._time]
+        if array.ndim == 0 and key in [slice(None), Ellipsis, ()]:  # scalar variables, like nc.variables["lat"][:]
+            return array[()]
+        return array[key]
+
+    def ncattrs(self):
+        return list(self._info["attributes"])
+
+    def getncattr(self, key):
+        return self._info["attributes"][key]
+
+    def __getattr__(self, key):
+        if key.startswith("_"):
+            raise AttributeError(key)
+        try:
+            return self._info["attributes"][key]
+        except KeyError:
+            raise AttributeError(key)
+
+
+def _addVariable(header, handles, directory, value, var):
+    """
+    Adds a variable to the header. Variables without time-dimension are written directly.
+    """
+    data = var[0:0] if var.dimensions[:1] == ("time",) else var[:]
+    info = {"dtype": np.ma.getdata(data).dtype.str,
+            "shape": list(var.shape),
+            "dimensions": list(var.dimensions),
+            "attributes": _toJson(dict((key, var.getncattr(key)) for key in var.ncattrs())),
+            "masked": False}
+    header["variables"][value] = info
+
+    path = os.path.join(directory, value)
+    _remove(path + ".mask")
+    if info["dimensions"][:1] == ["time"]:
+        handles[value] = open(path + ".dat", "wb")
+        return
+
+    info["masked"] = bool(np.any(np.ma.getmaskarray(data)))
+    np.ascontiguousarray(np.ma.getdata(data)).tofile(path + ".dat")
+    if info["masked"]:
+        np.ascontiguousarray(np.ma.getmaskarray(data)).tofile(path + ".mask")
+
+
+def _appendData(header, handles, directory, value, data, offset):
+    """
+    Appends the data of one file to a variable. The mask is only written once the first masked value appears.
+    """
+    info = header["variables"][value]
+    if list(data.shape[1:]) != info["shape"][1:]:
+        raise ValueError("The shape of %s changes from %s to %s between the files." % (
+            value, info["shape"][1:], list(data.shape[1:])))
+
+    np.ascontiguousarray(np.ma.getdata(data), dtype=info["dtype"]).tofile(handles[value])
+
+    mask = np.ma.getmaskarray(data)
+    if not info["masked"] and mask.any():
+        info["masked"] = True
+        handles[value + ".mask"] = open(os.path.join(directory, value + ".mask"), "wb")
+        # everything before was not masked:
+        np.zeros((offset,) + mask.shape[1:], dtype=bool).tofile(handles[value + ".mask"])
+    if info["masked"]:
+        np.ascontiguousarray(mask).tofile(handles[value + ".mask"])
+
+
+def _getIndex(dimensions, time_key, gates):
+    """
+    Builds the index of a variable with the time_key along the time-dimension and the gates along the
+    range-dimension.
+    """
+    return tuple(time_key if dim == "time" else gates if dim == "range" and gates is not None else slice(None)
+                 for dim in dimensions)
+
+
+def _memmap(path, dtype, shape):
+    """
+    Maps a file of the store read-only into memory. Empty variables can not be mapped.
+    """
+    if 0 in shape:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+
+def _toJson(attributes):
+    """
+    Converts netCDF-attributes into types which can be stored as json.
+    """
+    converted = {}
+    for key, value in attributes.items():
+        if isinstance(value, np.ndarray):
+            value = value.tolist()
+        elif isinstance(value, np.generic):
+            value = value.item()
+        elif isinstance(value, bytes):
+            value = value.decode("utf-8", "replace")
+        converted[key] = value
+    return converted
+
+
+def _remove(path):
+    """
+    Removes a file, if it still exists.
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
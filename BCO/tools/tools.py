@@ -14,15 +14,28 @@ import os
 from ftplib import FTP
 import BCO
 import glob
+import re
+import threading
+
+# The netCDF-library is not thread-safe. Threads must hold this lock while calling it:
+netcdf_lock = threading.RLock()
+
+# Protects the creation of the shared pool of FTP-connections and of the listings (see getFTPPool()):
+_ftp_pool_lock = threading.Lock()
 
 
 __all__ = [
     'daterange',
     'datestr',
+    'chunk2seconds',
+    'prefetch',
     'bz2Dataset',
     'download_from_zmaw_ftp',
     'getFileName',
-    'getFTPClient'
+    'getFTPClient',
+    'getFTPPool',
+    'getFTPListings',
+    'getDownloadCache'
 
 ]
 
@@ -88,12 +101,104 @@ def datestr(dt_obj):
     return dt_obj.strftime("%y%m%d")
 
 
-def bz2Dataset(bz2file):
+def chunk2seconds(chunk):
+    """
+    Converts the length of a chunk to seconds.
+
+    Args:
+        chunk: String like "10s", "30min", "1h" or "2d", a datetime.timedelta or None.
+
+    Returns:
+        Length of the chunk in seconds or None if chunk is None.
+
+    Example:
+        >>> chunk2seconds("30min")
+        1800
+    """
+    if chunk is None:
+        return None
+
+    if isinstance(chunk, timedelta):
+        return chunk.total_seconds()
+
+    units = {"s": 1, "min": 60, "h": 3600, "d": 86400}
+    match = re.match(r"^\s*(\d+)\s*(s|min|h|d)\s*$", chunk)
+    if not match:
+        raise ValueError("%s is not a valid chunk. Use e.g. '10s', '30min', '1h' or '1d'." % chunk)
+
+    return int(match.group(1)) * units[match.group(2)]
+
+
+def prefetch(function, items, depth=1, fetch=None):
+    """
+    Iterates over items, while function is called for the next items in a background thread. This way e.g. the next
+    files can be decompressed while the current one is read. function is called for every item in order, at most
+    depth items ahead of the consumer, and an item is only yielded after function is done with it.
+
+    With fetch, the items pass two stages: fetch (e.g. a download) runs for the next items in parallel threads and
+    function runs for an item as soon as its fetch is done. So fetching, preparing and consuming overlap, and the
+    whole iteration takes about as long as the slowest of them instead of their sum.
+
+    Errors of function and fetch are not raised here, the consumer runs into them again when it uses the item.
+
+    Args:
+        function: Callable which takes one item. Its return value is not used.
+        items: Iterable of the items.
+        depth: Integer: Number of items which are prepared ahead. With 0, the items are yielded without calling
+               function or fetch.
+        fetch: Optional callable which takes one item and is called before function.
+
+    Yields:
+        The items in their order.
+
+    Example:
+        Opening the next two files into a pool of Datasets, while the current one is read:
+
+        >>> for path in prefetch(pool.get, paths, depth=2):
+        >>>     data = pool.get(path).variables["Zf"][:]
+    """
+    items = list(items)
+    if depth < 1 or len(items) < 2:
+        for item in items:
+            yield item
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    def _prepare(item, fetched):
+        if fetched is not None:
+            fetched.exception()  # waits until the item is fetched
+        function(item)
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    fetcher = ThreadPoolExecutor(max_workers=depth) if fetch is not None else None
+    futures = []
+    try:
+        for i, item in enumerate(items):
+            while len(futures) < min(i + depth + 1, len(items)):
+                _item = items[len(futures)]
+                fetched = fetcher.submit(fetch, _item) if fetcher is not None else None
+                futures.append((executor.submit(_prepare, _item, fetched), fetched))
+            futures[i][0].exception()  # waits until the item is prepared
+            yield item
+    finally:
+        for prepared, fetched in futures:
+            prepared.cancel()
+            if fetched is not None:
+                fetched.cancel()
+        executor.shutdown(wait=True)
+        if fetcher is not None:
+            fetcher.shutdown(wait=True)
+
+
+def bz2Dataset(bz2file, workers=None):
     """
     Generates a netCDF Dataset from a .nc.bz2 file. It therefore needs the "dummy_nc_file.nc".
+    The file is decompressed on several cores (see BCO.tools.decompress.bz2Decompress).
 
     Args:
         bz2file: String: Path to the .nc.bz2 file.
+        workers: Integer: Number of threads for the decompression. Default is the number of cores.
 
     Returns:
         netCDF4.Dataset of the .nc.bz2 file.
@@ -109,34 +214,45 @@ def bz2Dataset(bz2file):
 
     """
     from netCDF4 import Dataset
-    import bz2
+    from BCO.tools.decompress import bz2Decompress
+    from BCO.tools.classic import ClassicDataset
 
     package_directory = os.path.dirname(os.path.abspath(__file__))
 
 
-    bz2Obj = bz2.BZ2File(bz2file)
-    try:
-        dummy_nc_file = package_directory + "/dummy_nc_file.nc"
-        nc = Dataset(dummy_nc_file,memory=bz2Obj.read())
-    except: # does not yet work:
-        print("This function only works with netCDF-4 Datasets.")
-        print("If the datamodel of your netcdf file is e.g 'classic' instead of" +
-              " 'netCDF-4' it will break.")
-        dummy_nc_file = package_directory + "/MRR__CIMH__LWC__60s_100m__20180520.nc"
-        nc = Dataset(filename=dummy_nc_file,mode="r", memory=bz2Obj.read())
+    memory = bz2Decompress(bz2file, workers=workers)
+    if memory[:3] == b"CDF":  # netCDF-3 files do not need the netCDF-library
+        return ClassicDataset(bz2file, memory=memory)
+
+    with netcdf_lock:
+        try:
+            dummy_nc_file = package_directory + "/dummy_nc_file.nc"
+            nc = Dataset(dummy_nc_file,memory=memory)
+        except: # does not yet work:
+            print("This function only works with netCDF-4 Datasets.")
+            print("If the datamodel of your netcdf file is e.g 'classic' instead of" +
+                  " 'netCDF-4' it will break.")
+            dummy_nc_file = package_directory + "/MRR__CIMH__LWC__60s_100m__20180520.nc"
+            nc = Dataset(filename=dummy_nc_file,mode="r", memory=memory)
     return nc
 
 
-def download_from_zmaw_ftp(device,start,end,output_folder="./",ftp_client=None):
+def download_from_zmaw_ftp(device,start,end,output_folder="./",ftp_client=None,connections=None,retries=3):
     """
     This function can be used to download data from the bco ftp-server
-    to store it on your local machine.
+    to store it on your local machine. The files are downloaded over several
+    connections at once (see BCO.tools.download.DownloadManager). Files which
+    are already complete in the output folder are skipped, interrupted downloads
+    are resumed.
 
     Args:
         device: str: one of: "CORAL","KATRIN","CEILOMETER","RADIATION","WEATHER","WINDLIDAR".
         start: datetime.datetime object: start of the timeframe of which data will be downloaded.
         end:  datetime.datetime object: end of the timeframe of which data will be downloaded.
         output_folder: str: Where to store the downloaded data.
+        ftp_client: Not used anymore, the connections are taken from the pool of FTP-connections.
+        connections: int: Number of files which are downloaded at the same time. Default is the size of the pool.
+        retries: int: Number of retries of a file after an error.
 
     Returns:
 
@@ -151,47 +267,25 @@ def download_from_zmaw_ftp(device,start,end,output_folder="./",ftp_client=None):
 
     files = []
 
-    _path_addition = BCO.config[device]["PATH_ADDITION"]
     _instrument = BCO.config[device]["INSTRUMENT"]
 
-    for _date in daterange(start.date(), end.date()):
-        if not _path_addition:
-            _nameStr = getFileName(_instrument, _date,use_ftp=True).split("/")
-        else:
-            _nameStr = "/".join(getFileName(_instrument, _date,use_ftp=True).split("/"))
-
-        files.append(_nameStr)
-
-    # download the file:
-    _close_ftp_client = False
-    if ftp_client == None:
-        ftp_client = FTP(BCO.FTP_SERVER)
-        ftp_client.login(user=BCO.FTP_USER, passwd=BCO.FTP_PASSWD)
-        _close_ftp_client = True
+    with getFTPPool().connection() as ftp_client:
+        for _date in daterange(start.date(), end.date()):
+            files.append(getFileName(_instrument, _date,use_ftp=True,ftp_client=ftp_client))
 
-    for file in files:
-        file_to_retrieve = ftp_client.nlst(file)[0]
-        try:
-            __save_file = file_to_retrieve.split("/")[-1]
-        except:
-            __save_file = file_to_retrieve
-
-        if not os.path.isfile(output_folder + __save_file): # check if the file is already there:
-            print("Downloading %s"%__save_file)
-            os.system("touch %s"%output_folder+__save_file)
-            ftp_client.retrbinary('RETR ' + file_to_retrieve, open(output_folder + __save_file, 'wb').write)
-        else:
-            print("File already in provided output folder. No need to download it again.")
+    # download the files:
+    from BCO.tools.download import DownloadManager
 
-    if _close_ftp_client:
-        ftp_client.close()
+    manager = DownloadManager(connections=connections, retries=retries)
+    manager.download(files, output_folder)
 
 
 def getFileName(instrument, date, use_ftp, filelist=[], ftp_client=None):
     """
     This function can be used to get the full path and name of the file as on
     the server. The path will vary if you are switching between the ftp-server or
-    beeing inside the mpi-network.
+    beeing inside the mpi-network. Inside the mpi-network the file is looked up in
+    the archive catalog, if one was set with BCO.settings.set_catalog().
 
     Examples:
         If you for example want to now  the name of the file holding the reflectivities
@@ -219,6 +313,12 @@ def getFileName(instrument, date, use_ftp, filelist=[], ftp_client=None):
     assert type(date) in [dt, datetime.date]
 
 
+    # look the file up in the catalog, if there is one:
+    if not use_ftp and BCO.CATALOG is not None:
+        name = BCO.CATALOG.lookup(instrument, date)
+        if name is not None:
+            return name
+
     # get the right variable from settings.ini
     if not use_ftp:
         tmp_path = BCO.config[instrument]["PATH"]
@@ -247,14 +347,13 @@ def getFileName(instrument, date, use_ftp, filelist=[], ftp_client=None):
 
     else:
         if len(filelist) == 0:
+            # the directory is listed once and the name is matched locally:
             if ftp_client == None:
-                ftp_client = FTP(BCO.FTP_SERVER, timeout=600) # timeout in seconds
-                ftp_client.login(user=BCO.FTP_USER, passwd=BCO.FTP_PASSWD)
-                name = ftp_client.nlst(tmp_path)
-                ftp_client.close()
+                with getFTPPool().connection() as ftp_client:
+                    name = getFTPListings().match(ftp_client, tmp_path)
 
             else:
-                name = ftp_client.nlst(tmp_path)
+                name = getFTPListings().match(ftp_client, tmp_path)
 
         else:
             for fl in filelist:
@@ -309,6 +408,77 @@ def getFTPClient(user=None,passwd=None):
     assert user
     assert passwd
 
-    ftp = FTP(BCO.FTP_SERVER)
+    ftp = FTP()
+    ftp.connect(*_splitServer(BCO.FTP_SERVER))
     ftp.login(user=user, passwd=passwd)
     return ftp
+
+
+def _splitServer(server):
+    """
+    Splits the address of the FTP-server into host and port. The port is optional ("host" or "host:port").
+
+    Returns:
+        Tuple (host, port).
+    """
+    host, _, port = server.partition(":")
+    return host, int(port) if port else 21
+
+
+def getFTPPool():
+    """
+    Get the pool of FTP-connections, which is shared by all file lookups and downloads of the process.
+    It is created on first use and can be replaced with BCO.settings.set_ftp_pool().
+
+    Examples:
+        >>> from BCO.tools.tools import getFTPPool
+        >>> with getFTPPool().connection() as ftp:
+        >>>     ftp.dir()
+
+    Returns:
+        BCO.tools.pool.FTPPool object.
+    """
+    with _ftp_pool_lock:
+        if BCO.FTP_POOL is None:
+            from BCO.tools.pool import FTPPool
+            BCO.FTP_POOL = FTPPool()
+        return BCO.FTP_POOL
+
+
+def getFTPListings():
+    """
+    Get the cache of the directory listings of the FTP-server, which is shared by all file lookups of the process.
+    It is created on first use and can be replaced with BCO.settings.set_ftp_listings().
+
+    Examples:
+        >>> from BCO.tools.tools import getFTPListings, getFTPPool
+        >>> with getFTPPool().connection() as ftp:
+        >>>     print(getFTPListings().listdir(ftp, "/A_Cloud_base_heights/"))
+
+    Returns:
+        BCO.tools.listing.ListingCache object.
+    """
+    with _ftp_pool_lock:
+        if BCO.FTP_LISTINGS is None:
+            from BCO.tools.listing import ListingCache
+            BCO.FTP_LISTINGS = ListingCache()
+        return BCO.FTP_LISTINGS
+
+
+def getDownloadCache():
+    """
+    Get the cache of the files downloaded from the FTP-server, which is shared by all instruments (and all processes
+    using the same directory). It is created on first use and can be replaced with BCO.settings.set_download_cache().
+
+    Examples:
+        >>> from BCO.tools.tools import getDownloadCache
+        >>> print(getDownloadCache().size() / 1e9, "GB")
+
+    Returns:
+        BCO.tools.download.DownloadCache object.
+    """
+    with _ftp_pool_lock:
+        if BCO.DOWNLOAD_CACHE is None:
+            from BCO.tools.download import DownloadCache
+            BCO.DOWNLOAD_CACHE = DownloadCache()
+        return BCO.DOWNLOAD_CACHE
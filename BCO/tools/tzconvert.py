@@ -0,0 +1,320 @@
+"""
+This module contains a vectorized timezone conversion. The UTC-offsets of a timezone are looked up once for the
+timeframe and are then applied to whole arrays of seconds since 1970 with numpy.searchsorted, instead of converting
+every time-stamp on its own.
+
+>>> from BCO.tools.tzconvert import OffsetTable
+
+"""
+
+import sys
+import time as time_module
+from datetime import datetime as dt
+from datetime import timedelta
+
+import numpy as np
+from pytz import timezone
+
+__all__ = [
+    'OffsetTable',
+    'utcoffset',
+    'utc2local',
+    'local2utc',
+    'num2datetime'
+]
+
+_EPOCH = dt(1970, 1, 1)
+_PROBE_STEP = 86400  # the offsets of the timezones are probed once a day
+
+
+class OffsetTable(object):
+    """
+    The UTC-offsets of a timezone for a timeframe: the times of the transitions (e.g. the switches between summer-
+    and wintertime) and the offsets in between. The transitions are probed with the public interface of the
+    timezone (tzinfo.fromutc()), for the local timezone of the computer (tz=None) with time.localtime().
+
+    Converting time-stamps is then a single numpy.searchsorted over the transitions, so even millions of time-stamps
+    take only milliseconds. If time-stamps outside of the timeframe are converted, the table is extended.
+
+    Args:
+        tz: Name of the timezone (e.g. "Europe/Berlin"), a pytz timezone or None for the local timezone of the
+            computer. Default is "Europe/Berlin".
+        start: Seconds since 1970 of the beginning of the timeframe. None means no limit.
+        end: Seconds since 1970 of the end of the timeframe. None means no limit.
+
+    Example:
+        Around the switch to summertime on 25 March 2018, 01:00 UTC:
+
+        >>> table = OffsetTable("Europe/Berlin", start=1521936000, end=1522022400)
+        >>> table.utcoffset(np.array([1521937800.0, 1521941400.0]))
+        array([3600, 7200])
+        >>> local = table.utc2local(np.array([1521937800.0, 1521941400.0]))
+    """
+
+    def __init__(self, tz="Europe/Berlin", start=None, end=None):
+        if tz is not None and not hasattr(tz, "utcoffset"):
+            tz = timezone(tz)
+        self.tz = tz
+        self.start = start
+        self.end = end
+
+        # the first offset is valid for everything before the timeframe as well, the last one for everything after:
+        self.transitions, self.offsets, self._tzinfos = _probe(tz, start, end)
+
+    def utcoffset(self, num):
+        """
+        Get the UTC-offsets of time-stamps.
+
+        Args:
+            num: float/ndarray. seconds since 1970 (UTC)
+
+        Returns:
+            Integer array of the offsets in seconds (local time - UTC).
+        """
+        return self.offsets[self._getPeriods(num)]
+
+    def utc2local(self, num):
+        """
+        Converts seconds since 1970 to the local time of the timezone, also counted in seconds since 1970.
+
+        Args:
+            num: float/ndarray. seconds since 1970 (UTC)
+
+        Returns:
+            Float array of the local times.
+        """
+        num = _asFloat(num)
+        return num + self.offsets[self._getPeriods(num)]
+
+    def local2utc(self, local):
+        """
+        Converts local times of the timezone, counted in seconds since 1970, to seconds since 1970 (UTC).
+        Like pytz with is_dst=False, times which occur twice (when switching to wintertime) and times which do not
+        exist (when switching to summertime) are converted with the offset of the wintertime.
+
+        Args:
+            local: float/ndarray. local time in seconds since 1970
+
+        Returns:
+            Float array of seconds since 1970 (UTC).
+        """
+        local = _asFloat(local)
+        self._extend(local - self.offsets.max(), local - self.offsets.min())
+        starts = self.transitions + self.offsets  # beginnings of the periods in local time
+        periods = np.clip(np.searchsorted(starts, local, side="right") - 1, 0, None)
+        return local - self.offsets[periods]
+
+    def toDatetime(self, num, aware=True):
+        """
+        Converts seconds since 1970 to datetime.datetime objects in the timezone. For a pytz timezone they are
+        timezone aware, for the local timezone of the computer they are naive (like datetime.fromtimestamp()).
+        Masked values and nan become None.
+
+        The naive datetime objects are built at once by numpy. Attaching the tzinfo needs a python call per
+        time-stamp, so use aware=False if the wall-clock time is enough.
+
+        Args:
+            num: float/ndarray. seconds since 1970 (UTC)
+            aware: Boolean: attach the tzinfo of the timezone. If False, naive datetime objects of the wall-clock
+                   time are returned. Default is True.
+
+        Returns:
+            Numpy array of datetime.datetime objects.
+        """
+        num = _asFloat(num)
+        periods = self._getPeriods(num)
+        date = _wall2datetime(num, self.offsets[periods])
+
+        if self.tz is not None and not aware:
+            return date
+        if self.tz is None:
+            if sys.version_info < (3, 6):
+                return date
+            # times which occur twice, when the clocks are turned back, are marked like datetime.fromtimestamp() does
+            previous = np.clip(periods - 1, 0, None)
+            repeated = (periods > 0) & (num < self.transitions[periods] +
+                                        self.offsets[previous] - self.offsets[periods])
+            for i in np.flatnonzero(repeated):
+                date.flat[i] = date.flat[i].replace(fold=1)
+            return date
+
+        if len(self._tzinfos) == 1:
+            tzinfo = self._tzinfos[0]
+            date.ravel()[:] = [None if x is None else x.replace(tzinfo=tzinfo) for x in date.ravel()]
+            return date
+        tzinfos = np.array(self._tzinfos, dtype=object)[periods.ravel()]
+        date.ravel()[:] = [None if x is None else x.replace(tzinfo=tz) for x, tz in zip(date.ravel(), tzinfos)]
+        return date
+
+    def _getPeriods(self, num):
+        """
+        Get the index of the period of every time-stamp, i.e. the last transition before it.
+        """
+        num = _asFloat(num)
+        self._extend(num, num)
+        return np.clip(np.searchsorted(self.transitions, num, side="right") - 1, 0, None)
+
+    def _extend(self, low, high):
+        """
+        Reads the transitions again, if some of the time-stamps are outside of the timeframe.
+        """
+        low, high = _getBounds(low), _getBounds(high)
+        if low is None:
+            return
+        low, high = low[0], high[1]
+        start = None if self.start is None else min(self.start, low)
+        end = None if self.end is None else max(self.end, high)
+        if start != self.start or end != self.end:
+            self.__init__(self.tz, start, end)
+
+
+def utcoffset(num, tz="Europe/Berlin"):
+    """
+    Get the UTC-offsets of time-stamps in a timezone (see OffsetTable.utcoffset()).
+
+    Args:
+        num: float/ndarray. seconds since 1970 (UTC)
+        tz: Name of the timezone, a pytz timezone or None for the local timezone of the computer.
+
+    Returns:
+        Integer array of the offsets in seconds.
+    """
+    return _forTimes(tz, num).utcoffset(num)
+
+
+def utc2local(num, tz="Europe/Berlin"):
+    """
+    Converts seconds since 1970 to the local time of a timezone (see OffsetTable.utc2local()).
+
+    Args:
+        num: float/ndarray. seconds since 1970 (UTC)
+        tz: Name of the timezone, a pytz timezone or None for the local timezone of the computer.
+
+    Returns:
+        Float array of the local times in seconds since 1970.
+    """
+    return _forTimes(tz, num).utc2local(num)
+
+
+def local2utc(local, tz="Europe/Berlin"):
+    """
+    Converts local times of a timezone to seconds since 1970 (see OffsetTable.local2utc()).
+
+    Args:
+        local: float/ndarray. local time in seconds since 1970
+        tz: Name of the timezone, a pytz timezone or None for the local timezone of the computer.
+
+    Returns:
+        Float array of seconds since 1970 (UTC).
+    """
+    return _forTimes(tz, local).local2utc(local)
+
+
+def num2datetime(num, tz="UTC", aware=True):
+    """
+    Converts seconds since 1970 to datetime.datetime objects in a timezone (see OffsetTable.toDatetime()).
+
+    Args:
+        num: float/ndarray. seconds since 1970 (UTC)
+        tz: Name of the timezone, a pytz timezone or None for the local timezone of the computer. Default is "UTC".
+        aware: Boolean: attach the tzinfo of the timezone. If False, naive datetime objects are returned, which is
+               much faster. Default is True.
+
+    Returns:
+        Numpy array of datetime.datetime objects.
+
+    Example:
+        >>> num2datetime(np.array([1514764800.0]))
+        array([datetime.datetime(2018, 1, 1, 0, 0, tzinfo=<UTC>)], dtype=object)
+    """
+    return _forTimes(tz, num).toDatetime(num, aware=aware)
+
+
+def _forTimes(tz, num):
+    """
+    Creates the OffsetTable for the timeframe of the time-stamps (with a day of margin for local times).
+    """
+    bounds = _getBounds(num)
+    if bounds is None:
+        return OffsetTable(tz, 0, 0)
+    return OffsetTable(tz, bounds[0] - 86400, bounds[1] + 86400)
+
+
+def _getBounds(num):
+    """
+    Returns:
+        Tuple (min, max) of the finite time-stamps or None, if there are none.
+    """
+    num = _asFloat(num)
+    num = num[np.isfinite(num)]
+    if num.size == 0:
+        return None
+    return float(num.min()), float(num.max())
+
+
+def _asFloat(num):
+    """
+    Converts time-stamps to a float array. Masked values become nan.
+    """
+    return np.ma.filled(np.ma.asarray(num, dtype=np.float64), np.nan)
+
+
+def _wall2datetime(num, offsets):
+    """
+    Converts seconds since 1970 and UTC-offsets to naive datetime.datetime objects of the wall-clock time. The
+    fractions of the seconds are rounded to microseconds like datetime.fromtimestamp() does it.
+    """
+    invalid = ~np.isfinite(num)
+    num = np.where(invalid, 0, num)
+    seconds = np.floor(num)
+    microseconds = np.round((num - seconds) * 1e6).astype(np.int64)
+    microseconds += (seconds.astype(np.int64) + offsets) * 1000000
+    date = microseconds.astype("datetime64[us]").astype(object)
+    date[invalid] = None
+    return date
+
+
+def _probe(tz, start, end):
+    """
+    Probes the transitions of a timezone between start and end. The offset is checked once a day and every change
+    is searched to the second by bisection. For a timezone the offsets are taken from tzinfo.fromutc(), for the
+    local timezone of the computer (tz=None) from time.localtime().
+
+    Returns:
+        Tuple (transitions, offsets, tzinfos) with the transitions in seconds since 1970 (the first one is -inf), the
+        offsets in seconds and the tzinfo-objects of the periods (None for the local timezone).
+    """
+    start = 0 if start is None else int(np.floor(start))
+    end = 2 ** 31 - 1 if end is None else int(np.ceil(end))
+
+    if tz is None:
+        def _period(t):
+            local = time_module.localtime(t)
+            return (local.tm_gmtoff, local.tm_isdst), None
+    else:
+        def _period(t):
+            local = tz.fromutc((_EPOCH + timedelta(seconds=t)).replace(tzinfo=tz))
+            return (local.utcoffset(), local.dst(), local.tzname()), local.tzinfo
+
+    key, tzinfo = _period(start)
+    transitions, keys, tzinfos = [-np.inf], [key], [tzinfo]
+    probes = list(range(start, end, _PROBE_STEP)) + [end]
+    for low, high in zip(probes[:-1], probes[1:]):
+        if _period(high)[0] == keys[-1]:
+            continue
+        while high - low > 1:
+            middle = (low + high) // 2
+            if _period(middle)[0] == keys[-1]:
+                low = middle
+            else:
+                high = middle
+        key, tzinfo = _period(high)
+        transitions.append(float(high))
+        keys.append(key)
+        tzinfos.append(tzinfo)
+
+    if tz is None:
+        offsets = [key[0] for key in keys]
+    else:
+        offsets = [int(key[0].total_seconds()) for key in keys]
+    return np.array(transitions), np.array(offsets, dtype=np.int64), tzinfos
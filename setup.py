@@ -69,8 +69,20 @@ setup(name='BCO',
           'pytz'
       ],
 
+      # Optional dependencies, e.g. pip install BCO[test]:
+      extras_require={
+          'test': ['pyftpdlib'],
+      },
+
       include_package_data=True,
 
+      # Command line tools:
+      entry_points={
+          'console_scripts': [
+              'bco-mirror=BCO.tools.mirror:main',
+          ],
+      },
+
       project_urls={
           'Documentation': 'http://bcoweb.mpimet.mpg.de/systems/BCO_python_doc/index.html',
           'BCO Blog': 'https://barbados.mpimet.mpg.de/',